@@ -1,11 +1,12 @@
 import base64
 import json
+import logging
 import os
+import re
 import time
 import uuid
 import asyncio
 
-from common.client import A2ACardResolver
 from common.types import (
     AgentCard,
     DataPart,
@@ -22,7 +23,27 @@ from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.tools.tool_context import ToolContext
 from google.genai import types
 
-from .remote_agent_connection import RemoteAgentConnections, TaskUpdateCallback
+from ..conversation_host.card_cache import AgentCardCache
+from ..conversation_host.conversation_log import ConversationLogWriter
+from ..conversation_host.interests import InterestProfile, KeywordMatcher, load_interest_table
+from ..conversation_host.push_receiver import PushNotificationReceiver
+from ..conversation_host.remote_agent_connection import (
+    RemoteAgentConnections,
+    TaskUpdateCallback,
+)
+from ..conversation_host.replies import response_text
+from ..conversation_host.scheduler import PRIORITY_KEY, ConversationToolContext
+
+
+logger = logging.getLogger(__name__)
+
+# Transcripts are shared with the other agents through the project's logs directory
+DEFAULT_CONVERSATION_LOG_DIR = os.getenv(
+    'CONVERSATION_LOG_DIR',
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '../../logs')),
+)
+# Seconds each target of broadcast_message has to answer
+BROADCAST_DEADLINE = float(os.getenv('BROADCAST_DEADLINE', '60'))
 
 
 class AnaAgent:
@@ -35,24 +56,87 @@ class AnaAgent:
     She cares so much about her work and her family friends and people that enter her close circle.
     """
 
+    # What keywords in the partner's messages reveal, from the shared interests file
+    INTEREST_TABLE = load_interest_table('ana')
+    # Topics we avoid bringing up again if we mentioned them recently
+    RECENT_TOPIC_MATCHER = KeywordMatcher([
+        'turkish', 'business', 'motorcycle', 'travel', 'music', 'reading', 'fitness', 'environment',
+    ])
+
+    # Interests used to rank remote agents for the prompt
+    PERSONA_TERMS = frozenset({
+        'animal', 'rights', 'welfare', 'law', 'lawyer', 'legal', 'yoga',
+        'hiking', 'outdoors', 'nature', 'mexico', 'mexican', 'reading',
+        'books', 'environment', 'sustainability',
+    })
+
     def __init__(
         self,
         remote_agent_addresses: list[str],
         task_callback: TaskUpdateCallback | None = None,
+        prompt_agent_limit: int | None = None,
+        prompt_token_budget: int | None = None,
+        conversation_log_dir: str | None = None,
+        card_cache: AgentCardCache | None = None,
+        push_receiver: PushNotificationReceiver | None = None,
     ):
+        """
+        Args:
+          remote_agent_addresses: Base urls of agents to register at startup.
+          task_callback: Called with every task update from remote agents.
+          prompt_agent_limit: Include at most this many agents in the prompt.
+          prompt_token_budget: Approximate token budget for the prompt's agent list.
+            When neither limit is set the prompt lists every agent.
+          conversation_log_dir: Where conversation transcripts are written.
+            Defaults to $CONVERSATION_LOG_DIR or the project's logs directory.
+          card_cache: Resolves and caches the cards of `remote_agent_addresses`.
+            Cached cards are registered right away; call
+            `refresh_remote_agents` to fetch the current ones.
+          push_receiver: When set, agents that support push notifications
+            deliver their task updates to it instead of over SSE.
+        """
         self.task_callback = task_callback
+        self.push_receiver = push_receiver
+        self.prompt_agent_limit = prompt_agent_limit
+        self.prompt_token_budget = prompt_token_budget
+        self.conversation_log = ConversationLogWriter(
+            conversation_log_dir or DEFAULT_CONVERSATION_LOG_DIR, 'ana'
+        )
         self.remote_agent_connections: dict[str, RemoteAgentConnections] = {}
         self.cards: dict[str, AgentCard] = {}
-        for address in remote_agent_addresses:
-            card_resolver = A2ACardResolver(address)
-            card = card_resolver.get_agent_card()
-            remote_connection = RemoteAgentConnections(card)
-            self.remote_agent_connections[card.name] = remote_connection
-            self.cards[card.name] = card
-        agent_info = []
-        for ra in self.list_remote_agents():
-            agent_info.append(json.dumps(ra))
-        self.agents = '\n'.join(agent_info)
+        # Bumped whenever an agent is added or removed
+        self.directory_version = 0
+        # Serialized directory entry per agent, in registration order
+        self._agent_entries: dict[str, str] = {}
+        self._agents_text: str | None = ''
+        # Overlap of each agent's tags and skills with PERSONA_TERMS
+        self._relevance: dict[str, int] = {}
+        # What each partner has talked about so far
+        self._interest_profiles: dict[str, InterestProfile] = {}
+        self._ranked_names: list[str] | None = []
+        self.remote_agent_addresses = list(remote_agent_addresses)
+        self.card_cache = card_cache or AgentCardCache(None)
+        for card in self.card_cache.cached(self.remote_agent_addresses):
+            self.register_agent_card(card)
+
+    async def refresh_remote_agents(self, interval: float | None = None):
+        """Resolve the cards of the startup addresses concurrently.
+
+        With an `interval`, keeps refreshing them every `interval` seconds.
+        """
+        while True:
+            for card in await self.card_cache.resolve_all(self.remote_agent_addresses):
+                self.register_agent_card(card)
+            if interval is None:
+                return
+            await asyncio.sleep(interval)
+
+    @property
+    def agents(self) -> str:
+        """The agent directory as newline separated JSON entries."""
+        if self._agents_text is None:
+            self._agents_text = '\n'.join(self._agent_entries.values())
+        return self._agents_text
 
     def _initialize_host(self):
         self._host_agent.create_agent()
@@ -67,13 +151,94 @@ class AnaAgent:
     #     self._initialize_host()
 
     def register_agent_card(self, card: AgentCard):
-        remote_connection = RemoteAgentConnections(card)
-        self.remote_agent_connections[card.name] = remote_connection
+        """Add or update a remote agent, touching only its own directory entry.
+
+        The connection is kept when the card's url and version are unchanged.
+        """
+        previous = self.cards.get(card.name)
+        remote_connection = self.remote_agent_connections.get(card.name)
+        if (
+            remote_connection is None
+            or previous is None
+            or previous.url != card.url
+            or previous.version != card.version
+        ):
+            self.remote_agent_connections[card.name] = RemoteAgentConnections(
+                card, push_receiver=self.push_receiver
+            )
+        else:
+            remote_connection.card = card
+        if card.name not in self.cards:
+            self.directory_version += 1
         self.cards[card.name] = card
-        agent_info = []
-        for ra in self.list_remote_agents():
-            agent_info.append(json.dumps(ra))
-        self.agents = '\n'.join(agent_info)
+
+        entry = json.dumps(self._directory_entry(card))
+        if self._agent_entries.get(card.name) != entry:
+            self._agent_entries[card.name] = entry
+            self._agents_text = None
+
+        relevance = len(self._card_terms(card) & self.PERSONA_TERMS)
+        if card.name not in self._relevance or self._relevance[card.name] != relevance:
+            self._relevance[card.name] = relevance
+            self._ranked_names = None
+
+    def remove_agent_card(self, agent_name: str):
+        """Forget a remote agent that is no longer available."""
+        self.remote_agent_connections.pop(agent_name, None)
+        if self.cards.pop(agent_name, None) is not None:
+            self.directory_version += 1
+        if self._agent_entries.pop(agent_name, None) is not None:
+            self._agents_text = None
+        if self._relevance.pop(agent_name, None) is not None:
+            self._ranked_names = None
+        self._interest_profiles.pop(agent_name, None)
+
+    @staticmethod
+    def _card_terms(card: AgentCard) -> set[str]:
+        text = ' '.join(
+            ' '.join([skill.name, *(skill.tags or [])]) for skill in card.skills
+        )
+        return set(re.findall(r'[a-z]+', text.lower()))
+
+    def prompt_agents(self, active_agent: str | None = None) -> str:
+        """The agent directory for the prompt, trimmed to the configured limits.
+
+        The active agent comes first, then the agents whose tags and skills
+        overlap most with this persona's interests. Entries are added until
+        `prompt_agent_limit` or `prompt_token_budget` (estimated at four
+        characters per token) is reached.
+        """
+        if self.prompt_agent_limit is None and self.prompt_token_budget is None:
+            return self.agents
+
+        if self._ranked_names is None:
+            self._ranked_names = sorted(
+                self._relevance, key=self._relevance.__getitem__, reverse=True
+            )
+        names = self._ranked_names
+        if active_agent in self._agent_entries:
+            names = [active_agent, *(n for n in names if n != active_agent)]
+
+        limit = self.prompt_agent_limit or len(names)
+        budget = self.prompt_token_budget
+        selected = []
+        for name in names:
+            if len(selected) >= limit:
+                break
+            entry = self._agent_entries[name]
+            cost = len(entry) // 4 + 1
+            if budget is not None:
+                if cost > budget and selected:
+                    break
+                budget -= cost
+            selected.append(entry)
+
+        omitted = len(names) - len(selected)
+        if omitted:
+            selected.append(
+                f'({omitted} more agents are available through `list_remote_agents`)'
+            )
+        return '\n'.join(selected)
 
     def create_agent(self) -> Agent:
         return Agent(
@@ -87,8 +252,10 @@ class AnaAgent:
             ),
             tools=[
                 self.list_remote_agents,
+                self.check_pending_task_states,
                 self.send_task,
                 self.send_message,
+                self.broadcast_message,
                 self.reply_message,
                 # self.register_agent_by_url,
             ],
@@ -110,6 +277,9 @@ Discovery:
 Send message:
 - You can use `send_message` to send your profile to the remote agent you want to have a conversation with. Then wait for the remote agent to respond.
 
+Broadcast message:
+- You can use `broadcast_message` to send the same message to several remote agents at once. You get back the responses that arrived in time and which agents did not answer.
+
 Reply message:
 - You can use `reply_message` to reply to the conversation from the remote agent you want to have a conversation with. Then wait for the remote agent to respond.
 
@@ -126,7 +296,7 @@ If there is an active agent, send the request to that agent with the update task
 Remember you are just the bridge between the user and the remote agents so always reply the remote agent response without adding or summarizing anything.
 
 Agents:
-{self.agents}
+{self.prompt_agents(current_agent['active_agent'])}
 
 Current agent: {current_agent['active_agent']}
 """
@@ -158,11 +328,21 @@ Current agent: {current_agent['active_agent']}
 
         remote_agent_info = []
         for card in self.cards.values():
-            remote_agent_info.append(
-                {'name': card.name, 'description': card.description}
-            )
+            remote_agent_info.append(self._directory_entry(card))
         return remote_agent_info
 
+    def check_pending_task_states(self):
+        """List the tasks still waiting for a response from each remote agent."""
+        return {
+            name: connection.outstanding()
+            for name, connection in self.remote_agent_connections.items()
+            if connection.pending_tasks
+        }
+
+    @staticmethod
+    def _directory_entry(card: AgentCard) -> dict:
+        return {'name': card.name, 'description': card.description}
+
     async def send_message(self, agent_name: str, message: str, tool_context: ToolContext):
         """Send a message to another agent to start a new conversation.
         
@@ -211,6 +391,8 @@ Current agent: {current_agent['active_agent']}
             acceptedOutputModes=['text', 'text/plain'],
             metadata={'conversation_id': sessionId}
         )
+        if PRIORITY_KEY in state:
+            request.metadata[PRIORITY_KEY] = state[PRIORITY_KEY]
         
         # Log the outgoing message
         self._log_conversation(agent_name, "Ana", message)
@@ -250,12 +432,16 @@ Current agent: {current_agent['active_agent']}
         if not client:
             raise ValueError(f'Client not available for {agent_name}')
         
-        # Check if we have an existing task and session ID
-        if 'task_id' not in state or 'session_id' not in state:
-            raise ValueError(f'No existing conversation found with {agent_name}. Use send_message to start a new conversation.')
+        # Conversations started by broadcast_message are kept per agent
+        conversation = (state.get('conversations') or {}).get(agent_name)
+        if conversation is None:
+            # Check if we have an existing task and session ID
+            if 'task_id' not in state or 'session_id' not in state:
+                raise ValueError(f'No existing conversation found with {agent_name}. Use send_message to start a new conversation.')
+            conversation = {'task_id': state['task_id'], 'session_id': state['session_id']}
         
-        taskId = state['task_id']
-        sessionId = state['session_id']
+        taskId = conversation['task_id']
+        sessionId = conversation['session_id']
         
         # Save conversation partner for logging if not already saved
         if 'conversation_partner' not in state:
@@ -276,6 +462,8 @@ Current agent: {current_agent['active_agent']}
             acceptedOutputModes=['text', 'text/plain'],
             metadata={'conversation_id': sessionId}
         )
+        if PRIORITY_KEY in state:
+            request.metadata[PRIORITY_KEY] = state[PRIORITY_KEY]
         
         # Log the outgoing message
         self._log_conversation(agent_name, "Ana", message)
@@ -291,6 +479,71 @@ Current agent: {current_agent['active_agent']}
         # Return the response
         return response
 
+    async def iter_broadcast(
+        self,
+        agent_names: list[str],
+        message: str,
+        deadline: float = BROADCAST_DEADLINE,
+    ):
+        """Send `message` to all of `agent_names` concurrently, yielding results as they complete.
+
+        Every target starts a new conversation with its own state and has
+        `deadline` seconds to answer. Each result is a dict with the `agent`,
+        a `status` of `replied`, `failed` or `timed_out`, the `response` text
+        or `error`, and the conversation `state`.
+        """
+        async def send_one(agent_name: str) -> dict:
+            context = ConversationToolContext()
+            result = {'agent': agent_name, 'state': context.state}
+            try:
+                response = await asyncio.wait_for(
+                    self.send_message(agent_name, message, context), timeout=deadline
+                )
+            except asyncio.TimeoutError:
+                result['status'] = 'timed_out'
+            except Exception as e:
+                result['status'] = 'failed'
+                result['error'] = str(e)
+            else:
+                result['status'] = 'replied'
+                result['response'] = self._extract_response_text(response)
+            return result
+
+        tasks = [asyncio.create_task(send_one(name)) for name in dict.fromkeys(agent_names)]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def broadcast_message(self, agent_names: list[str], message: str, tool_context: ToolContext):
+        """Send the same message to several agents at once to start conversations with all of them.
+        
+        Args:
+            agent_names: The names of the agents to send the message to
+            message: The text message to send
+            tool_context: The tool context
+            
+        Returns:
+            How many agents replied, failed or timed out, and the responses in the order they arrived
+        """
+        summary = {'sent': 0, 'replied': 0, 'failed': 0, 'timed_out': 0, 'results': []}
+        conversations = dict(tool_context.state.get('conversations') or {})
+        async for result in self.iter_broadcast(agent_names, message):
+            summary['sent'] += 1
+            summary[result['status']] += 1
+            state = result.pop('state')
+            if 'task_id' in state:
+                # Lets reply_message continue each of these conversations
+                conversations[result['agent']] = {
+                    'task_id': state['task_id'],
+                    'session_id': state['session_id'],
+                }
+            summary['results'].append(result)
+        tool_context.state['conversations'] = conversations
+        return summary
+
     def _extract_response_text(self, response):
         """Extract text from a response object.
         
@@ -301,13 +554,9 @@ Current agent: {current_agent['active_agent']}
             The extracted text or None if not found
         """
         try:
-            if hasattr(response, 'status') and hasattr(response.status, 'message'):
-                for part in response.status.message.parts:
-                    if hasattr(part, 'text') and part.text:
-                        return part.text
-            return None
-        except Exception as e:
-            print(f"Error extracting response text: {e}")
+            return response_text(response)
+        except Exception:
+            logger.exception("Error extracting response text")
             return None
 
     def _log_conversation(self, partner_name, speaker, message):
@@ -318,37 +567,10 @@ Current agent: {current_agent['active_agent']}
             speaker: Who is speaking (Ana or partner name)
             message: The message text
         """
-        try:
-            # Use the shared logs directory at the project level
-            logs_dir = "/Users/flaura-macbook/_projects/xoxo/src/xoxo/logs"
-            os.makedirs(logs_dir, exist_ok=True)
-            
-            # Get the short names for both agents
-            my_short_name = "maria"
-            partner_short_name = partner_name.lower().split(' ')[0]
-            
-            # Sort the names alphabetically to ensure consistent naming regardless of who logs
-            names = sorted([my_short_name, partner_short_name])
-            
-            # Format the log filename: name1_name2_conversation.txt
-            log_filename = f"{logs_dir}/{names[0]}_{names[1]}_conversation.txt"
-            
-            # Get current timestamp
-            timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Ensure the speaker is correctly identified (always use "Ana" for this agent)
-            if speaker == "Ana" or speaker == my_short_name:
-                speaker = "Ana"
-            
-            # Format the log entry
-            log_entry = f"[{timestamp}] {speaker}: {message}\n\n"
-            
-            # Append to the log file
-            with open(log_filename, 'a') as log_file:
-                log_file.write(log_entry)
-                
-        except Exception as e:
-            print(f"Error logging conversation: {e}")
+        # Ensure the speaker is correctly identified (always use "Ana" for this agent)
+        if speaker == "Ana" or speaker == self.conversation_log.short_name:
+            speaker = "Ana"
+        self.conversation_log.write(partner_name, speaker, message)
             
     async def invoke_streaming(self, query: str, session_id: str):
         """Process a query and return streaming responses.
@@ -372,48 +594,36 @@ Current agent: {current_agent['active_agent']}
         # Yield a final chunk to mark the end of the response
         yield {"response": "", "final": True}
         
-    async def generate_message(self, partner_name: str, conversation_history: list, conversation_stage: str = "greeting"):
+    async def generate_message(
+        self,
+        partner_name: str,
+        conversation_history: list,
+        conversation_stage: str = "greeting",
+        history_length: int | None = None,
+    ):
         """Generate a contextually relevant message using an LLM based on conversation history and partner profile.
         
         Args:
             partner_name: The name of the conversation partner
             conversation_history: List of previous messages in the conversation
             conversation_stage: The current stage of the conversation (greeting, followup, etc.)
+            history_length: Number of messages exchanged with the partner so far,
+                when conversation_history holds only the most recent of them
             
         Returns:
             A generated message appropriate for the conversation context
         """
+        if history_length is None:
+            history_length = len(conversation_history)
         try:
-            # Extract partner's interests and topics from conversation history
-            interests = []
-            topics_discussed = []
-            
-            for entry in conversation_history:
-                if partner_name in entry["speaker"]:
-                    # Simple keyword extraction (in a real implementation, this would use NLP)
-                    message = entry["message"].lower()
-                    if "cooking" in message or "chef" in message:
-                        interests.append("cooking")
-                    if "motorcycle" in message or "riding" in message:
-                        interests.append("motorcycles")
-                    if "business" in message or "restaurant" in message:
-                        interests.append("business")
-                    if "animal" in message or "welfare" in message:
-                        topics_discussed.append("animal welfare")
-                    if "hobby" in message or "hobbies" in message:
-                        topics_discussed.append("hobbies")
-                    if "turkish" in message or "cuisine" in message:
-                        interests.append("turkish cuisine")
-                    if "travel" in message or "traveling" in message:
-                        topics_discussed.append("travel")
-                    if "music" in message or "concert" in message:
-                        topics_discussed.append("music")
-                    if "book" in message or "reading" in message:
-                        topics_discussed.append("reading")
-                    if "fitness" in message or "exercise" in message:
-                        topics_discussed.append("fitness")
-                    if "environment" in message or "sustainability" in message:
-                        topics_discussed.append("environment")
+            # Update what we know about the partner from the new turns only
+            profile = self._interest_profiles.get(partner_name)
+            if profile is None:
+                profile = InterestProfile(self.INTEREST_TABLE)
+                self._interest_profiles[partner_name] = profile
+            profile.update(partner_name, conversation_history)
+            interests = profile.interests
+            topics_discussed = profile.topics
             
             # Ana's profile and interests
             my_interests = ["animal rights", "law", "yoga", "hiking", "Mexican culture"]
@@ -468,6 +678,8 @@ Current agent: {current_agent['active_agent']}
                 # Check conversation history to avoid repeating topics
                 recent_messages = [entry["message"].lower() for entry in conversation_history[-6:] if "Ana" in entry["speaker"]]
                 
+                recent_words = self.RECENT_TOPIC_MATCHER.keywords('\n'.join(recent_messages))
+                
                 # Filter out topics that have been recently discussed
                 available_topics = []
                 for topic in additional_topics:
@@ -476,33 +688,33 @@ Current agent: {current_agent['active_agent']}
                         available_topics.append(topic)
                 
                 # If we have available topics, choose one randomly
-                if available_topics and len(conversation_history) % 3 == 0:  # Every 3rd message, introduce a new topic
+                if available_topics and history_length % 3 == 0:  # Every 3rd message, introduce a new topic
                     import random
                     return random.choice(available_topics)
                 
                 # Otherwise, respond to something from the partner's interests or recent messages
-                if "turkish cuisine" in interests and not any("turkish" in message for message in recent_messages):
+                if "turkish cuisine" in interests and "turkish" not in recent_words:
                     return "I'm curious about Turkish cuisine. What are some traditional dishes that represent your culinary heritage?"
-                elif "business" in interests and not any("business" in message for message in recent_messages):
+                elif "business" in interests and "business" not in recent_words:
                     return "Running a business must be challenging. How do you balance the demands of entrepreneurship with your personal life?"
-                elif "motorcycles" in interests and not any("motorcycle" in message for message in recent_messages):
+                elif "motorcycles" in interests and "motorcycle" not in recent_words:
                     return "I've never ridden a motorcycle before. What drew you to that hobby, and what do you enjoy most about it?"
-                elif "travel" in topics_discussed and not any("travel" in message for message in recent_messages):
+                elif "travel" in topics_discussed and "travel" not in recent_words:
                     return "I try to travel to different parts of Mexico when I can to connect with my heritage. Have you traveled much in your home country?"
-                elif "music" in topics_discussed and not any("music" in message for message in recent_messages):
+                elif "music" in topics_discussed and "music" not in recent_words:
                     return "I find that music helps me relax after a long day in court. Do you have favorite artists or genres that you enjoy?"
-                elif "reading" in topics_discussed and not any("reading" in message for message in recent_messages):
+                elif "reading" in topics_discussed and "reading" not in recent_words:
                     return "I'm currently reading a book about international animal rights law. Are you a reader? What kinds of books do you enjoy?"
-                elif "fitness" in topics_discussed and not any("fitness" in message for message in recent_messages):
+                elif "fitness" in topics_discussed and "fitness" not in recent_words:
                     return "Besides yoga and hiking, I've been trying to incorporate more fitness into my routine. Do you have any workout recommendations?"
-                elif "environment" in topics_discussed and not any("environment" in message for message in recent_messages):
+                elif "environment" in topics_discussed and "environment" not in recent_words:
                     return "Environmental protection is closely tied to my animal rights work. What environmental issues do you think deserve more attention?"
                 else:
                     # Default fallback for ongoing conversation
                     return f"I'm really enjoying our conversation, {partner_name}. What other interests or passions would you like to share?"
                 
-        except Exception as e:
-            print(f"Error generating message: {e}")
+        except Exception:
+            logger.exception(f"Error generating message for {partner_name}")
             # Fallback message in case of error
             return f"I'm enjoying our conversation, {partner_name}. What else would you like to talk about?"
 
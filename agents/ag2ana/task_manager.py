@@ -13,6 +13,8 @@ from common.server import utils
 from common.server.task_manager import InMemoryTaskManager
 from common.types import (
     Artifact,
+    GetTaskRequest,
+    GetTaskResponse,
     InternalError,
     JSONRPCResponse,
     Message,
@@ -20,7 +22,10 @@ from common.types import (
     SendTaskResponse,
     SendTaskStreamingRequest,
     SendTaskStreamingResponse,
+    Task,
     TaskArtifactUpdateEvent,
+    TaskNotFoundError,
+    TaskQueryParams,
     TaskSendParams,
     TaskState,
     TaskStatus,
@@ -29,6 +34,8 @@ from common.types import (
 )
 
 from .agent import AnaAgent
+from ..persona_server.sqlite_task_store import SqliteTaskStore
+from ..persona_server.task_store import BoundedTaskStore
 
 
 logger = logging.getLogger(__name__)
@@ -37,9 +44,15 @@ logger = logging.getLogger(__name__)
 class AgentTaskManager(InMemoryTaskManager):
     """Task manager for Ana conversational agent."""
 
-    def __init__(self, agent: AnaAgent):
+    def __init__(
+        self,
+        agent: AnaAgent,
+        task_store: BoundedTaskStore | SqliteTaskStore | None = None,
+    ):
         super().__init__()
         self.agent = agent
+        # Evicts idle and finished tasks instead of keeping every task forever
+        self.tasks = task_store if task_store is not None else BoundedTaskStore()
 
     # -------------------------------------------------------------
     # Public API methods
@@ -114,6 +127,38 @@ class AgentTaskManager(InMemoryTaskManager):
                 ),
             )
 
+    # -------------------------------------------------------------
+    # Task store
+    # -------------------------------------------------------------
+
+    async def on_get_task(self, request: GetTaskRequest) -> GetTaskResponse:
+        # The store truncates the history itself instead of copying all of it,
+        # and reads a task that is not in memory off the event loop
+        task_query_params: TaskQueryParams = request.params
+        task_result = await self.tasks.fetch_task(
+            task_query_params.id, task_query_params.historyLength
+        )
+        if task_result is None:
+            return GetTaskResponse(id=request.id, error=TaskNotFoundError())
+        return GetTaskResponse(id=request.id, result=task_result)
+
+    async def upsert_task(self, task_send_params: TaskSendParams) -> Task:
+        # Load a stored task first, so the base class finds it in memory
+        await self.tasks.prefetch(task_send_params.id)
+        task = await super().upsert_task(task_send_params)
+        async with self.lock:
+            self.tasks.touch(task_send_params.id)
+        return task
+
+    async def update_store(
+        self, task_id: str, status: TaskStatus, artifacts: list[Artifact] | None
+    ) -> Task:
+        await self.tasks.prefetch(task_id)
+        task = await super().update_store(task_id, status, artifacts)
+        async with self.lock:
+            self.tasks.touch(task_id)
+        return task
+
     # -------------------------------------------------------------
     # Agent response handlers
     # -------------------------------------------------------------
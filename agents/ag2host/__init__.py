@@ -0,0 +1 @@
+# Multi-persona A2A host
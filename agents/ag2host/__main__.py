@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+import sys
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+import uvicorn
+
+from xoxo.agents.ag2host.agent import PersonaAgent, shared_client
+from xoxo.agents.ag2host.personas import PERSONAS_PATH, Persona, load_personas
+from xoxo.agents.persona_server.llm_gateway import LLMGateway
+from xoxo.agents.persona_server.push_notifications import PushNotificationSender
+from xoxo.agents.persona_server.reply_cache import default_reply_cache
+from xoxo.agents.persona_server.task_manager import AgentTaskManager
+from xoxo.agents.persona_server.task_store import open_task_store, stats_route
+from common.server import A2AServer
+from common.types import MissingAPIKeyError
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@click.command()
+@click.option('--host', 'host', default='localhost')
+@click.option('--port', 'port', default=10010)
+@click.option('--personas', 'personas_path', default=str(PERSONAS_PATH))
+def main(host, port, personas_path):
+    """Starts one server process for many conversational personas.
+
+    Each persona is served on its own route of the shared server, at
+    http://<host>:<port>/<persona id>/, or on its own port if its definition
+    has one. All of them share one event loop, one model client, one task
+    store, one reply cache, one LLM gateway and one push notification
+    sender; each persona keeps its own pool of session histories.
+    """
+    try:
+        if not os.getenv('GOOGLE_API_KEY'):
+            raise MissingAPIKeyError(
+                'GOOGLE_API_KEY environment variable not set.'
+            )
+
+        personas = load_personas(personas_path)
+        client = shared_client()
+        task_store = open_task_store()
+        notification_sender = PushNotificationSender()
+        reply_cache = default_reply_cache()
+        gateway = LLMGateway()
+
+        def persona_server(persona: Persona, url: str) -> A2AServer:
+            task_manager = AgentTaskManager(
+                agent=PersonaAgent(
+                    persona, client, reply_cache=reply_cache, gateway=gateway
+                ),
+                task_store=task_store,
+                notification_sender=notification_sender,
+            )
+            return A2AServer(
+                agent_card=persona.card(url),
+                task_manager=task_manager,
+                host=host,
+                port=persona.port or port,
+            )
+
+        routes = []
+        apps = {}
+        cards = []
+        for persona in personas:
+            if persona.port:
+                if persona.port == port or persona.port in apps:
+                    raise ValueError(f'Port {persona.port} of persona {persona.id} is taken')
+                server = persona_server(persona, f'http://{host}:{persona.port}/')
+                apps[persona.port] = server.app
+            else:
+                server = persona_server(persona, f'http://{host}:{port}/{persona.id}/')
+                routes.append(Mount(f'/{persona.id}', app=server.app))
+            cards.append(server.agent_card)
+
+        async def list_personas(request: Request) -> JSONResponse:
+            return JSONResponse(
+                [card.model_dump(exclude_none=True) for card in cards]
+            )
+
+        routes.append(Route('/personas', list_personas, methods=['GET']))
+        routes.append(stats_route(task_store))
+        routes.append(stats_route(gateway, '/metrics/llm-gateway'))
+        if reply_cache is not None:
+            routes.append(stats_route(reply_cache, '/metrics/reply-cache'))
+        apps[port] = Starlette(routes=routes)
+
+        logger.info(f'Starting {len(personas)} personas on ports {sorted(apps)}')
+        try:
+            asyncio.run(serve(apps, host, notification_sender))
+        finally:
+            # Write out tasks still queued for a durable store
+            task_store.close()
+    except Exception as e:
+        logger.error(f'An error occurred during server startup: {e}')
+        exit(1)
+
+
+async def serve(
+    apps: dict[int, Starlette],
+    host: str,
+    notification_sender: PushNotificationSender,
+):
+    """Run a uvicorn server per port, all on the current event loop."""
+    servers = [
+        uvicorn.Server(uvicorn.Config(app, host=host, port=app_port))
+        for app_port, app in apps.items()
+    ]
+    try:
+        await asyncio.gather(*(server.serve() for server in servers))
+    finally:
+        await notification_sender.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+import logging
+import os
+import traceback
+
+from collections.abc import AsyncIterable, Iterable
+from typing import Any
+
+from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+from ..persona_server.llm_gateway import INTERACTIVE, LLMGateway
+from ..persona_server.reply_cache import ReplyCache
+from ..persona_server.sessions import SessionPool
+from .personas import Persona
+
+
+logger = logging.getLogger(__name__)
+
+MODEL = 'gemini-2.0-flash-lite'
+
+
+def get_api_key() -> str:
+    """Helper method to handle API Key."""
+    load_dotenv()
+    return os.getenv('GOOGLE_API_KEY')
+
+
+def shared_client() -> genai.Client:
+    """One model client for every persona in the process."""
+    return genai.Client(api_key=get_api_key())
+
+
+class PersonaAgent:
+    """A conversational agent speaking as one persona.
+
+    Behaves like `TomAgent` and `JakeAgent` (same `stream` and `invoke`
+    items), but the personality comes from a `Persona` definition and the
+    model client is shared, so a persona costs a system prompt rather than
+    an SDK client of its own.
+    """
+
+    SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
+
+    def __init__(
+        self,
+        persona: Persona,
+        client: genai.Client,
+        sessions: SessionPool | None = None,
+        reply_cache: ReplyCache | None = None,
+        gateway: LLMGateway | None = None,
+    ):
+        self.persona = persona
+        self.client = client
+        self.sessions = sessions or SessionPool()
+        # May be shared by all personas, replies are keyed by persona id
+        self.reply_cache = reply_cache
+        # One gateway for the whole process keeps it under the provider's limits
+        self.gateway = gateway or LLMGateway()
+        self.config = types.GenerateContentConfig(
+            system_instruction=persona.system_message
+        )
+
+    def get_agent_response(self, response: str) -> dict[str, Any]:
+        """Format agent response in a consistent structure."""
+        return {
+            'is_task_complete': True,
+            'require_user_input': False,
+            'content': response,
+        }
+
+    async def stream(
+        self,
+        query: str,
+        sessionId: str,
+        use_cache: bool = True,
+        priority: str = INTERACTIVE,
+    ) -> AsyncIterable[dict[str, Any]]:
+        """Stream the reply as it is generated, then the whole reply."""
+        logger.info(f'Processing query for {self.persona.id}: {query[:50]}...')
+        try:
+            async with self.sessions.session(sessionId) as session:
+                key, reply = self._lookup(query, session.history, use_cache)
+                if reply is None:
+                    pieces = []
+                    async with self.gateway.slot(priority):
+                        stream = await self.client.aio.models.generate_content_stream(
+                            model=MODEL,
+                            contents=self._contents(query, session.history),
+                            config=self.config,
+                        )
+                        async for chunk in stream:
+                            if not chunk.text:
+                                continue
+                            pieces.append(chunk.text)
+                            yield {
+                                'is_task_complete': False,
+                                'require_user_input': False,
+                                'is_delta': True,
+                                'content': chunk.text,
+                            }
+                    reply = ''.join(pieces)
+                    if key is not None:
+                        self.reply_cache.put(key, reply)
+                session.add_turn(query, reply)
+            yield self.get_agent_response(reply)
+        except Exception as e:
+            logger.error(f'Error in streaming agent: {traceback.format_exc()}')
+            yield {
+                'is_task_complete': False,
+                'require_user_input': True,
+                'content': f'Error processing request: {e!s}',
+            }
+
+    async def invoke(
+        self,
+        query: str,
+        sessionId: str,
+        use_cache: bool = True,
+        priority: str = INTERACTIVE,
+    ) -> dict[str, Any]:
+        """Get the whole reply."""
+        logger.info(f'Processing query for {self.persona.id}: {query[:50]}...')
+        try:
+            async with self.sessions.session(sessionId) as session:
+                key, reply = self._lookup(query, session.history, use_cache)
+                if reply is not None:
+                    session.add_turn(query, reply)
+                    return self.get_agent_response(reply)
+                async with self.gateway.slot(priority):
+                    response = await self.client.aio.models.generate_content(
+                        model=MODEL,
+                        contents=self._contents(query, session.history),
+                        config=self.config,
+                    )
+                reply = response.text or ''
+                if key is not None:
+                    self.reply_cache.put(key, reply)
+                session.add_turn(query, reply)
+            return self.get_agent_response(reply)
+        except Exception as e:
+            logger.error(f'Error during processing: {traceback.format_exc()}')
+            return {
+                'is_task_complete': False,
+                'require_user_input': True,
+                'content': f'Error processing request: {e!s}',
+            }
+
+    def _lookup(
+        self, query: str, history: Iterable[tuple[str, str]], use_cache: bool
+    ) -> tuple[str | None, str | None]:
+        """The reply cache key for this request, and the cached reply if any."""
+        if self.reply_cache is None:
+            return None, None
+        if not use_cache:
+            self.reply_cache.bypass()
+            return None, None
+        key = self.reply_cache.key(self.persona.id, query, history)
+        return key, self.reply_cache.get(key)
+
+    @staticmethod
+    def _contents(query: str, history: Iterable[tuple[str, str]]) -> list[types.Content]:
+        """The session's earlier turns followed by the new query."""
+        contents = [
+            types.Content(role=role, parts=[types.Part(text=text)])
+            for role, text in history
+        ]
+        contents.append(types.Content(role='user', parts=[types.Part(text=query)]))
+        return contents
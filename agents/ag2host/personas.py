@@ -0,0 +1,57 @@
+import json
+import re
+
+from pathlib import Path
+
+from common.types import AgentCapabilities, AgentCard, AgentSkill
+from pydantic import BaseModel, field_validator
+
+
+PERSONAS_PATH = Path(__file__).with_name('personas.json')
+
+
+class Persona(BaseModel):
+    """A conversational persona, as defined in the personas file.
+
+    `id` is the persona's route on the shared server (`/<id>/`). A persona
+    with a `port` gets a server of its own on that port instead.
+    """
+
+    id: str
+    name: str
+    description: str
+    system_message: str
+    skills: list[AgentSkill] = []
+    version: str = '1.0.0'
+    port: int | None = None
+
+    @field_validator('id')
+    @classmethod
+    def check_id(cls, value: str) -> str:
+        if not re.fullmatch(r'[a-z0-9][a-z0-9_-]*', value):
+            raise ValueError(f'Persona id {value!r} must be a lowercase route segment')
+        return value
+
+    def card(self, base_url: str) -> AgentCard:
+        return AgentCard(
+            name=self.name,
+            description=self.description,
+            url=base_url,
+            version=self.version,
+            defaultInputModes=['text', 'text/plain'],
+            defaultOutputModes=['text', 'text/plain'],
+            capabilities=AgentCapabilities(streaming=True, pushNotifications=True),
+            skills=self.skills,
+        )
+
+
+def load_personas(path: str | Path = PERSONAS_PATH) -> list[Persona]:
+    """The personas in a JSON file holding a list of persona definitions."""
+    with open(path, encoding='utf-8') as f:
+        personas = [Persona(**data) for data in json.load(f)]
+    seen = set()
+    for persona in personas:
+        if persona.id in seen:
+            raise ValueError(f'Persona id {persona.id!r} is defined twice in {path}')
+        seen.add(persona.id)
+    return personas
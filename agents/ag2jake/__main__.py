@@ -4,7 +4,10 @@ import os
 import click
 
 from agents.ag2jake.agent import JakeAgent
-from agents.ag2jake.task_manager import AgentTaskManager
+from agents.persona_server.llm_gateway import LLMGateway
+from agents.persona_server.reply_cache import default_reply_cache
+from agents.persona_server.task_manager import AgentTaskManager
+from agents.persona_server.task_store import open_task_store, stats_route
 from common.server import A2AServer
 from common.types import (
     AgentCapabilities,
@@ -32,7 +35,7 @@ def main(host, port):
                 'GOOGLE_API_KEY environment variable not set.'
             )
 
-        capabilities = AgentCapabilities(streaming=True)
+        capabilities = AgentCapabilities(streaming=True, pushNotifications=True)
         skills = [
             AgentSkill(
                 id='have_conversation',
@@ -59,15 +62,27 @@ def main(host, port):
             skills=skills,
         )
 
+        task_store = open_task_store()
+        reply_cache = default_reply_cache()
+        gateway = LLMGateway()
         server = A2AServer(
             agent_card=agent_card,
-            task_manager=AgentTaskManager(agent=JakeAgent()),
+            task_manager=AgentTaskManager(
+                agent=JakeAgent(reply_cache=reply_cache, gateway=gateway),
+                task_store=task_store,
+            ),
             host=host,
             port=port,
         )
+        server.app.routes.append(stats_route(task_store))
+        server.app.routes.append(stats_route(gateway, '/metrics/llm-gateway'))
+        if reply_cache is not None:
+            server.app.routes.append(stats_route(reply_cache, '/metrics/reply-cache'))
 
         logger.info(f'Starting Jake Conversational Agent on {host}:{port}')
         server.start()
+        # Write out tasks still queued for a durable store
+        task_store.close()
     except MissingAPIKeyError as e:
         logger.error(f'Error: {e}')
         exit(1)
@@ -10,7 +10,10 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 import click
 
 from xoxo.agents.ag2tom.agent import TomAgent
-from xoxo.agents.ag2tom.task_manager import AgentTaskManager
+from xoxo.agents.persona_server.llm_gateway import LLMGateway
+from xoxo.agents.persona_server.reply_cache import default_reply_cache
+from xoxo.agents.persona_server.task_manager import AgentTaskManager
+from xoxo.agents.persona_server.task_store import open_task_store, stats_route
 from common.server import A2AServer
 from common.types import (
     AgentCapabilities,
@@ -39,7 +42,7 @@ def main(host, port):
                 'GOOGLE_API_KEY environment variable not set.'
             )
 
-        capabilities = AgentCapabilities(streaming=True)
+        capabilities = AgentCapabilities(streaming=True, pushNotifications=True)
         skills = [
             AgentSkill(
                 id='have_conversation',
@@ -67,8 +70,11 @@ def main(host, port):
         )
 
         # Create the agent and task manager
-        tom_agent = TomAgent()
-        task_manager = AgentTaskManager(agent=tom_agent)
+        reply_cache = default_reply_cache()
+        gateway = LLMGateway()
+        tom_agent = TomAgent(reply_cache=reply_cache, gateway=gateway)
+        task_store = open_task_store()
+        task_manager = AgentTaskManager(agent=tom_agent, task_store=task_store)
         
         # Create the server
         server = A2AServer(
@@ -77,10 +83,16 @@ def main(host, port):
             host=host,
             port=port,
         )
+        server.app.routes.append(stats_route(task_store))
+        server.app.routes.append(stats_route(gateway, '/metrics/llm-gateway'))
+        if reply_cache is not None:
+            server.app.routes.append(stats_route(reply_cache, '/metrics/reply-cache'))
 
         # Start the server
         logger.info(f'Starting Tom Conversational Agent on {host}:{port}')
         server.start()
+        # Write out tasks still queued for a durable store
+        task_store.close()
     except Exception as e:
         logger.error(f'An error occurred during server startup: {e}')
         exit(1)
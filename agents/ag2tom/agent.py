@@ -2,16 +2,24 @@ import logging
 import os
 import traceback
 
-from collections.abc import AsyncIterable
+from collections.abc import AsyncIterable, Iterable
 from typing import Any, Dict
 
 from autogen import ConversableAgent
 from dotenv import load_dotenv
+from google import genai
+from google.genai import types
+
+from ..persona_server.llm_gateway import INTERACTIVE, LLMGateway
+from ..persona_server.reply_cache import ReplyCache
+from ..persona_server.sessions import SessionPool
 from common.client import A2AClient
 
 
 logger = logging.getLogger(__name__)
 
+MODEL = 'gemini-2.0-flash-lite'
+
 
 def get_api_key() -> str:
     """Helper method to handle API Key."""
@@ -24,13 +32,18 @@ class TomAgent:
 
     SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
 
-    def __init__(self):
+    def __init__(
+        self,
+        sessions: SessionPool | None = None,
+        reply_cache: ReplyCache | None = None,
+        gateway: LLMGateway | None = None,
+    ):
         # Import AG2 dependencies here to isolate requirements
         try:
             # Set up LLM configuration
             llm_config = {
                 "config_list": [{
-                    "model": "gemini-2.0-flash-lite",
+                    "model": MODEL,
                     "api_type": "google",
                     "api_key": get_api_key()
                 }]
@@ -56,6 +69,16 @@ class TomAgent:
                 ),
             )
 
+            # AG2's Gemini client only returns whole replies, so streaming
+            # goes to the model directly, with the same system message
+            self.client = genai.Client(api_key=get_api_key())
+            # Each session's own history; sessions never share chat state
+            self.sessions = sessions or SessionPool()
+            # Replies to repeated openers, off unless a cache is given
+            self.reply_cache = reply_cache
+            # Admission of model calls, shared with the rest of the process
+            self.gateway = gateway or LLMGateway()
+
             self.initialized = True
             # self.host_client = A2AClient(name="Multiagent Host", base_url="http://localhost:10000")
             logger.info('Tom Conversable Agent initialized successfully')
@@ -73,9 +96,20 @@ class TomAgent:
         }
 
     async def stream(
-        self, query: str, sessionId: str
+        self,
+        query: str,
+        sessionId: str,
+        use_cache: bool = True,
+        priority: str = INTERACTIVE,
     ) -> AsyncIterable[dict[str, Any]]:
-        """Stream updates from the conversational agent."""
+        """Stream the reply from the conversational agent as it is generated.
+
+        Every piece of text from the model is yielded with `is_delta` set,
+        followed by the whole reply marked complete. The model sees the
+        session's earlier turns, and the reply is added to them. A reply
+        from the reply cache is yielded whole, unless `use_cache` is False.
+        The model call waits for a gateway slot of the given `priority`.
+        """
         if not self.initialized:
             yield {
                 'is_task_complete': False,
@@ -84,44 +118,25 @@ class TomAgent:
             }
             return
 
+        logger.info(f'Processing query: {query[:50]}...')
         try:
-            # Initial response to acknowledge the query
-            yield {
-                'is_task_complete': False,
-                'require_user_input': False,
-                'content': 'Tom is thinking...',
-            }
-
-            logger.info(f'Processing query: {query[:50]}...')
-
-            try:
-                # Process the user's message directly with the agent
-                result = await self.agent.a_run(
-                    message=query,
-                    max_turns=1,  # Single turn for conversation
-                    user_input=False,
-                )
-
-                # Process the result to get the response
-                await result.process()
-                
-                print(f'Tom Agent Final result 1: {result}')
-                # Get the summary which contains the output
-                response = await result.summary
-                print(f'Tom Agent Final response 2: {response}')
-                
-                # Final response
-                yield self.get_agent_response(response)
-
-            except Exception as e:
-                logger.error(
-                    f'Error during processing: {traceback.format_exc()}'
-                )
-                yield {
-                    'is_task_complete': False,
-                    'require_user_input': True,
-                    'content': f'Error processing request: {e!s}',
-                }
+            async with self.sessions.session(sessionId) as session:
+                key, reply = self._lookup(query, session.history, use_cache)
+                if reply is None:
+                    pieces = []
+                    async for text in self._generate(query, session.history, priority):
+                        pieces.append(text)
+                        yield {
+                            'is_task_complete': False,
+                            'require_user_input': False,
+                            'is_delta': True,
+                            'content': text,
+                        }
+                    reply = ''.join(pieces)
+                    if key is not None:
+                        self.reply_cache.put(key, reply)
+                session.add_turn(query, reply)
+            yield self.get_agent_response(reply)
         except Exception as e:
             logger.error(f'Error in streaming agent: {traceback.format_exc()}')
             yield {
@@ -130,64 +145,86 @@ class TomAgent:
                 'content': f'Error processing request: {e!s}',
             }
 
+    async def _generate(
+        self, query: str, history: Iterable[tuple[str, str]], priority: str
+    ) -> AsyncIterable[str]:
+        """The model's reply to `query`, in the pieces the model streams it in."""
+        contents = [
+            types.Content(role=role, parts=[types.Part(text=text)])
+            for role, text in history
+        ]
+        contents.append(types.Content(role='user', parts=[types.Part(text=query)]))
+        # The slot is held until the whole reply has streamed
+        async with self.gateway.slot(priority):
+            stream = await self.client.aio.models.generate_content_stream(
+                model=MODEL,
+                contents=contents,
+                config=types.GenerateContentConfig(
+                    system_instruction=self.agent.system_message
+                ),
+            )
+            async for chunk in stream:
+                if chunk.text:
+                    yield chunk.text
+
+    def _lookup(
+        self, query: str, history: Iterable[tuple[str, str]], use_cache: bool
+    ) -> tuple[str | None, str | None]:
+        """The reply cache key for this request, and the cached reply if any."""
+        if self.reply_cache is None:
+            return None, None
+        if not use_cache:
+            self.reply_cache.bypass()
+            return None, None
+        key = self.reply_cache.key(self.agent.name, query, history)
+        return key, self.reply_cache.get(key)
+
     async def invoke(
-        self, query: str, sessionId: str
-    ) -> AsyncIterable[dict[str, Any]]:
-        """Stream updates from the conversational agent."""
+        self,
+        query: str,
+        sessionId: str,
+        use_cache: bool = True,
+        priority: str = INTERACTIVE,
+    ) -> dict[str, Any]:
+        """Get the whole reply from the conversational agent."""
         if not self.initialized:
-            yield {
+            return {
                 'is_task_complete': False,
                 'require_user_input': True,
                 'content': 'Agent initialization failed. Please check the dependencies and logs.',
             }
-            return
 
+        logger.info(f'Processing query: {query[:50]}...')
         try:
-            # Initial response to acknowledge the query
-            yield {
-                'is_task_complete': False,
-                'require_user_input': False,
-                'content': 'Tom is thinking...',
-            }
-
-            logger.info(f'Processing query: {query[:50]}...')
-
-            try:
-                # Process the user's message directly with the agent
-                result = await self.agent.a_run(
-                    message=query,
-                    max_turns=1,  # Single turn for conversation
-                    user_input=False,
-                )
-
-                # Process the result to get the response
-                await result.process()
-                
-                print(f'Tom Agent Final result 1: {result}')
-                # Get the summary which contains the output
-                response = await result.summary
-                print(f'Tom Agent Final response 2: {response}')
-                
-                # Final response
-                yield self.get_agent_response(response)
-
-            except Exception as e:
-                logger.error(
-                    f'Error during processing: {traceback.format_exc()}'
-                )
-                yield {
-                    'is_task_complete': False,
-                    'require_user_input': True,
-                    'content': f'Error processing request: {e!s}',
-                }
+            async with self.sessions.session(sessionId) as session:
+                key, response = self._lookup(query, session.history, use_cache)
+                if response is not None:
+                    session.add_turn(query, response)
+                    return self.get_agent_response(response)
+                # The session's turns are passed in, so the shared agent keeps
+                # no chat state and sessions can be answered concurrently
+                messages = [
+                    {'role': 'user' if role == 'user' else 'assistant', 'content': text}
+                    for role, text in session.history
+                ]
+                messages.append({'role': 'user', 'content': query})
+                async with self.gateway.slot(priority):
+                    reply = await self.agent.a_generate_reply(messages=messages)
+                if isinstance(reply, dict):
+                    reply = reply.get('content')
+                response = reply or ''
+                if key is not None:
+                    self.reply_cache.put(key, response)
+                session.add_turn(query, response)
+            return self.get_agent_response(response)
         except Exception as e:
-            logger.error(f'Error in streaming agent: {traceback.format_exc()}')
-            yield {
+            logger.error(f'Error during processing: {traceback.format_exc()}')
+            return {
                 'is_task_complete': False,
                 'require_user_input': True,
                 'content': f'Error processing request: {e!s}',
             }
-    
+
 
     # def invoke(self, query: str, sessionId: str) -> dict[str, Any]:
     #     """Synchronous invocation of the MCP agent."""
@@ -0,0 +1,96 @@
+"""Interactive latency through `LLMGateway` while autonomous traffic floods it.
+
+A fake model answers every call after `--latency` seconds. `--background`
+autonomous callers keep calling it back to back, like a host agent's
+periodic conversations, while `--requests` interactive calls arrive
+`--interval` seconds apart. Reports how long calls of each class waited
+for the gateway, once with priorities and once with every call in one
+class (first come, first served), under the same rate and concurrency
+limits.
+
+    python -m xoxo.agents.benchmarks.llm_gateway --rate 20 --concurrency 4
+"""
+import asyncio
+import os
+import sys
+import time
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+
+from xoxo.agents.persona_server.llm_gateway import AUTONOMOUS, INTERACTIVE, LLMGateway
+
+
+async def fake_model(latency: float) -> str:
+    await asyncio.sleep(latency)
+    return 'reply'
+
+
+async def run(
+    rate: float,
+    burst: int,
+    concurrency: int,
+    latency: float,
+    background: int,
+    requests: int,
+    interval: float,
+    prioritized: bool,
+):
+    gateway = LLMGateway(rate=rate, burst=burst, max_concurrency=concurrency)
+    interactive_waits: list[float] = []
+    stop = asyncio.Event()
+
+    async def autonomous_caller():
+        while not stop.is_set():
+            async with gateway.slot(AUTONOMOUS if prioritized else INTERACTIVE):
+                await fake_model(latency)
+
+    async def interactive_call():
+        start = time.perf_counter()
+        async with gateway.slot(INTERACTIVE):
+            interactive_waits.append(time.perf_counter() - start)
+            await fake_model(latency)
+
+    callers = [asyncio.create_task(autonomous_caller()) for _ in range(background)]
+    # Let the background traffic fill the queue first
+    await asyncio.sleep(1)
+    calls = []
+    for _ in range(requests):
+        calls.append(asyncio.create_task(interactive_call()))
+        await asyncio.sleep(interval)
+    await asyncio.gather(*calls)
+    stop.set()
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+
+    interactive_waits.sort()
+    stats = gateway.stats()
+    name = 'priorities' if prioritized else 'one class'
+    print(
+        f"{name:>10}: interactive wait p50={interactive_waits[len(interactive_waits) // 2] * 1000:.0f} ms"
+        f"  p95={interactive_waits[int(len(interactive_waits) * 0.95) - 1] * 1000:.0f} ms"
+        f"  granted={stats['granted']}  wait={stats['wait']}"
+    )
+
+
+@click.command()
+@click.option('--rate', 'rate', default=20.0)
+@click.option('--burst', 'burst', default=5)
+@click.option('--concurrency', 'concurrency', default=4)
+@click.option('--latency', 'latency', default=0.2)
+@click.option('--background', 'background', default=50)
+@click.option('--requests', 'requests', default=40)
+@click.option('--interval', 'interval', default=0.1)
+def main(rate, burst, concurrency, latency, background, requests, interval):
+    """Benchmarks interactive waits behind autonomous LLM traffic."""
+    for prioritized in (True, False):
+        asyncio.run(run(
+            rate, burst, concurrency, latency, background, requests, interval, prioritized
+        ))
+
+
+if __name__ == '__main__':
+    main()
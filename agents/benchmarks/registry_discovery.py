@@ -0,0 +1,131 @@
+"""Discovery latency of AgentRegistry with and without its indexes.
+
+Fills a scratch collection with registered agents (most of them stale, as in a
+long-running network) and times the discovery query and the heartbeat upsert
+before and after `ensure_indexes()`.
+
+    python -m xoxo.agents.benchmarks.registry_discovery --agents 10000
+"""
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+from datetime import datetime, timezone
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+
+from xoxo.agents.conversation_host.registry import ACTIVE_WINDOW_SECONDS, AgentRegistry
+from common.types import AgentCapabilities, AgentCard, AgentSkill
+
+
+MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017')
+DB_NAME = 'xoxo_bench'
+COLLECTION = 'agents_bench'
+
+
+def agent_document(index: int, last_seen: float) -> dict:
+    return {
+        "name": f"Persona {index}",
+        "description": f"Benchmark persona number {index}",
+        "url": f"http://localhost:{20000 + index}/",
+        "version": "1.0.0",
+        "capabilities": {"streaming": True},
+        "skills": [{
+            "id": "have_conversation",
+            "name": "Have a Conversation",
+            "tags": ["conversation", "chat"],
+        }],
+        "last_seen": last_seen,
+        "heartbeat_at": datetime.fromtimestamp(last_seen, timezone.utc),
+        "active": True,
+    }
+
+
+def bench_card(index: int) -> AgentCard:
+    return AgentCard(
+        name=f"Persona {index}",
+        description=f"Benchmark persona number {index}",
+        url=f"http://localhost:{20000 + index}/",
+        version="1.0.0",
+        capabilities=AgentCapabilities(streaming=True),
+        skills=[AgentSkill(id="have_conversation", name="Have a Conversation")],
+    )
+
+
+async def time_calls(label: str, runs: int, call) -> None:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(
+        f"{label:<34} p50={statistics.median(timings):8.2f} ms"
+        f"  p95={p95:8.2f} ms  max={timings[-1]:8.2f} ms"
+    )
+
+
+async def explain_stage(registry: AgentRegistry) -> str:
+    plan = await registry.collection.find(
+        {"last_seen": {"$gt": time.time() - ACTIVE_WINDOW_SECONDS}}
+    ).explain()
+    stage = plan["queryPlanner"]["winningPlan"]
+    while "inputStage" in stage:
+        stage = stage["inputStage"]
+    return stage["stage"]
+
+
+async def run(agents: int, active: int, runs: int) -> None:
+    registry = AgentRegistry(MONGO_URI, DB_NAME, COLLECTION)
+    await registry.collection.drop()
+
+    now = time.time()
+    stale = now - 2 * ACTIVE_WINDOW_SECONDS
+    documents = [
+        agent_document(i, now if i < active else stale - i)
+        for i in range(agents)
+    ]
+    await registry.collection.insert_many(documents)
+    print(f"{agents} registered agents, {active} active, {runs} runs each\n")
+
+    cards = [bench_card(i) for i in range(0, agents, max(1, agents // 20))]
+
+    async def discover():
+        await registry.get_all_active_agents()
+
+    async def heartbeat():
+        await registry.heartbeat(cards)
+
+    print(f"without indexes ({await explain_stage(registry)})")
+    await time_calls("  get_all_active_agents", runs, discover)
+    await time_calls(f"  heartbeat ({len(cards)} agents)", runs, heartbeat)
+
+    await registry.ensure_indexes()
+    print(f"\nwith indexes ({await explain_stage(registry)})")
+    await time_calls("  get_all_active_agents", runs, discover)
+    await time_calls(f"  heartbeat ({len(cards)} agents)", runs, heartbeat)
+
+    await registry.collection.drop()
+    registry.close()
+
+
+@click.command()
+@click.option('--agents', 'agents', default=10000)
+@click.option('--active', 'active', default=500)
+@click.option('--runs', 'runs', default=50)
+def main(agents, active, runs):
+    """Benchmarks discovery latency against a local MongoDB."""
+    # Silence the registry's per-call logging
+    logging.getLogger('xoxo.agents.conversation_host.registry').setLevel(logging.WARNING)
+    asyncio.run(run(agents, active, runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Turn latency of remote agent calls with and without the shared connection pool.
+
+Starts a stub A2A server on localhost (in its own thread, so the blocking
+streaming client of the base `A2AClient` cannot stall it) and times
+`tasks/send` and `tasks/sendSubscribe` turns through the base client, which
+opens a new connection per call, and through `PooledA2AClient`.
+
+    python -m xoxo.agents.benchmarks.remote_transport --turns 200 --concurrency 8
+"""
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+import uvicorn
+
+from xoxo.agents.conversation_host.transport import HTTPConnectionPool, PooledA2AClient
+from common.client import A2AClient
+from common.types import AgentCapabilities, AgentCard, AgentSkill
+from sse_starlette.sse import EventSourceResponse
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+def completed_task(params: dict) -> dict:
+    return {
+        "id": params["id"],
+        "sessionId": params.get("sessionId"),
+        "status": {
+            "state": "completed",
+            "message": {"role": "agent", "parts": [{"type": "text", "text": "Hello!"}]},
+        },
+        "artifacts": [{"parts": [{"type": "text", "text": "Hello!"}]}],
+    }
+
+
+async def handle(request: Request):
+    body = await request.json()
+    params = body["params"]
+    if body["method"] == "tasks/sendSubscribe":
+        async def events():
+            yield json.dumps({
+                "jsonrpc": "2.0",
+                "id": body["id"],
+                "result": {
+                    "id": params["id"],
+                    "status": completed_task(params)["status"],
+                    "final": True,
+                },
+            })
+        return EventSourceResponse(events())
+    return JSONResponse({"jsonrpc": "2.0", "id": body["id"], "result": completed_task(params)})
+
+
+def start_stub_server(port: int, handler=handle) -> uvicorn.Server:
+    app = Starlette(routes=[Route('/', handler, methods=['POST'])])
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def stub_card(port: int) -> AgentCard:
+    return AgentCard(
+        name="Stub",
+        url=f"http://127.0.0.1:{port}/",
+        version="1.0.0",
+        capabilities=AgentCapabilities(streaming=True),
+        skills=[AgentSkill(id="have_conversation", name="Have a Conversation")],
+    )
+
+
+def payload() -> dict:
+    return {
+        "id": uuid.uuid4().hex,
+        "sessionId": "bench",
+        "acceptedOutputModes": ["text"],
+        "message": {"role": "user", "parts": [{"type": "text", "text": "Hi there"}]},
+    }
+
+
+async def send(client: A2AClient):
+    await client.send_task(payload())
+
+
+async def stream(client: A2AClient):
+    async for _ in client.send_task_streaming(payload()):
+        pass
+
+
+async def time_turns(label: str, turns: int, concurrency: int, call) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    timings = []
+
+    async def turn():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(turn() for _ in range(turns)))
+    elapsed = time.perf_counter() - start
+    timings.sort()
+    p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+    print(
+        f"{label:<30} p50={statistics.median(timings):7.2f} ms"
+        f"  p95={p95:7.2f} ms  {turns / elapsed:8.1f} turns/s"
+    )
+
+
+async def run(port: int, turns: int, concurrency: int, http2: bool) -> None:
+    card = stub_card(port)
+    plain = A2AClient(card)
+    pool = HTTPConnectionPool(http2=http2)
+    pooled = PooledA2AClient(card, pool)
+    print(f"{turns} turns, concurrency {concurrency}\n")
+
+    for label, client in (("new connection per turn", plain), ("shared pool", pooled)):
+        print(label)
+        # Warm up so the first connection is not counted
+        await send(client)
+        await time_turns("  tasks/send", turns, concurrency, lambda: send(client))
+        await time_turns("  tasks/sendSubscribe", turns, concurrency, lambda: stream(client))
+
+    await pool.close()
+
+
+@click.command()
+@click.option('--port', 'port', default=10099)
+@click.option('--turns', 'turns', default=200)
+@click.option('--concurrency', 'concurrency', default=1)
+@click.option('--http2', 'http2', is_flag=True, default=False)
+def main(port, turns, concurrency, http2):
+    """Benchmarks remote agent turns against a local stub A2A server."""
+    server = start_stub_server(port)
+    try:
+        asyncio.run(run(port, turns, concurrency, http2))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == '__main__':
+    main()
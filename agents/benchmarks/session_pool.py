@@ -0,0 +1,107 @@
+"""Concurrent sessions through `TomAgent.stream` or `JakeAgent.stream` against a stub model.
+
+`--sessions` sessions each send `--turns` messages, all sessions at once,
+to the `--agent` persona, whose model client is replaced by a stub that
+answers after `--latency` seconds in `--chunks` pieces. Reports replies
+per second and latency, and checks that every session's model call saw
+exactly that session's earlier turns. It then runs the same load with
+every request in one shared session, which is how a single chat state
+behaves.
+
+    python -m xoxo.agents.benchmarks.session_pool --agent tom --sessions 100 --turns 5
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+from types import SimpleNamespace
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+
+from xoxo.agents.ag2jake.agent import JakeAgent
+from xoxo.agents.ag2tom.agent import TomAgent
+from xoxo.agents.persona_server.llm_gateway import LLMGateway
+from xoxo.agents.persona_server.sessions import SessionPool
+
+
+AGENTS = {'tom': TomAgent, 'jake': JakeAgent}
+
+
+class StubModels:
+    """Answers with the number of messages it was sent."""
+
+    def __init__(self, latency: float, chunks: int):
+        self.latency = latency
+        self.chunks = chunks
+
+    async def generate_content_stream(self, model, contents, config):
+        async def stream():
+            await asyncio.sleep(self.latency)
+            for index in range(self.chunks):
+                text = f'{len(contents)}' if index == 0 else ' .'
+                yield SimpleNamespace(text=text)
+
+        return stream()
+
+
+async def converse(agent: TomAgent | JakeAgent, session_id: str, turns: int, latencies: list[float]) -> bool:
+    correct = True
+    for turn in range(turns):
+        start = time.perf_counter()
+        async for item in agent.stream(f'message {turn}', session_id):
+            if item['is_task_complete']:
+                seen = int(item['content'].split()[0])
+                # The earlier turns of this session plus the new message
+                expected = 2 * min(turn, agent.sessions.max_turns) + 1
+                correct = correct and seen == expected
+        latencies.append(time.perf_counter() - start)
+    return correct
+
+
+async def run(
+    agent_name: str, sessions: int, turns: int, latency: float, chunks: int, shared: bool
+):
+    # No rate limit, this measures the session handling only
+    gateway = LLMGateway(rate=0, max_concurrency=sessions)
+    agent = AGENTS[agent_name](sessions=SessionPool(max_sessions=sessions), gateway=gateway)
+    # The agent streams through its genai client, which never reaches the network here
+    agent.client = SimpleNamespace(aio=SimpleNamespace(models=StubModels(latency, chunks)))
+    latencies: list[float] = []
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        converse(agent, 'shared' if shared else f'session-{index}', turns, latencies)
+        for index in range(sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    name = 'one shared session' if shared else 'session pool'
+    print(
+        f"{name:>18}: {len(latencies)} replies in {elapsed:.2f} s"
+        f"  ({len(latencies) / elapsed:,.0f} replies/s)"
+        f"  p50={statistics.median(latencies) * 1000:.0f} ms"
+        f"  p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms"
+        + ("" if shared else f"  histories correct: {all(results)}")
+    )
+
+
+@click.command()
+@click.option('--agent', 'agent_name', type=click.Choice(sorted(AGENTS)), default='tom')
+@click.option('--sessions', 'sessions', default=100)
+@click.option('--turns', 'turns', default=5)
+@click.option('--latency', 'latency', default=0.05)
+@click.option('--chunks', 'chunks', default=20)
+def main(agent_name, sessions, turns, latency, chunks):
+    """Benchmarks concurrent sessions with per-session contexts."""
+    # The stub replaces the model client, but the agents still need a key to start
+    os.environ.setdefault('GOOGLE_API_KEY', 'benchmark')
+    asyncio.run(run(agent_name, sessions, turns, latency, chunks, shared=False))
+    asyncio.run(run(agent_name, sessions, turns, latency, chunks, shared=True))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Events per second out of `AgentTaskManager` for a token-streamed reply.
+
+A stub agent streams `--tokens` pieces of text per task, `--delay` seconds
+apart, through the personas' task manager. The benchmark reads the task's SSE event
+queue and reports how many events the subscriber gets and how fast, once
+with every token sent as its own event and once coalesced.
+
+    python -m xoxo.agents.benchmarks.stream_coalescing --tasks 20 --tokens 2000
+"""
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+
+from xoxo.agents.persona_server.coalescing import STREAM_COALESCE_BYTES, STREAM_COALESCE_WINDOW
+from xoxo.agents.persona_server.task_manager import AgentTaskManager
+from common.types import Message, SendTaskStreamingRequest, TaskSendParams, TextPart
+
+
+class StubAgent:
+    """Streams a reply of `tokens` pieces, like `TomAgent.stream`."""
+
+    SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
+
+    def __init__(self, tokens: int, delay: float):
+        self.tokens = tokens
+        self.delay = delay
+
+    async def stream(self, query: str, sessionId: str, use_cache: bool = True):
+        for index in range(self.tokens):
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            yield {
+                'is_task_complete': False,
+                'require_user_input': False,
+                'is_delta': True,
+                'content': f'token{index} ',
+            }
+        yield {
+            'is_task_complete': True,
+            'require_user_input': False,
+            'content': ''.join(f'token{index} ' for index in range(self.tokens)),
+        }
+
+
+async def run(manager: AgentTaskManager, tasks: int) -> tuple[int, float]:
+    events = 0
+    start = time.perf_counter()
+    for _ in range(tasks):
+        request = SendTaskStreamingRequest(
+            id=uuid.uuid4().hex,
+            params=TaskSendParams(
+                id=uuid.uuid4().hex,
+                sessionId='bench',
+                message=Message(role='user', parts=[TextPart(text='hello')]),
+            ),
+        )
+        async for _ in await manager.on_send_task_subscribe(request):
+            events += 1
+    return events, time.perf_counter() - start
+
+
+@click.command()
+@click.option('--tasks', 'tasks', default=20)
+@click.option('--tokens', 'tokens', default=2000)
+@click.option('--delay', 'delay', default=0.0)
+@click.option('--window', 'window', default=STREAM_COALESCE_WINDOW)
+@click.option('--max-bytes', 'max_bytes', default=STREAM_COALESCE_BYTES)
+def main(tasks, tokens, delay, window, max_bytes):
+    """Benchmarks streamed events with and without coalescing."""
+    agent = StubAgent(tokens, delay)
+    for name, coalesce_bytes in (('per token', 0), ('coalesced', max_bytes)):
+        manager = AgentTaskManager(
+            agent=agent, coalesce_window=window, coalesce_bytes=coalesce_bytes
+        )
+        events, elapsed = asyncio.run(run(manager, tasks))
+        print(
+            f"{name:>9}: {tasks} tasks x {tokens} tokens -> {events} events in {elapsed:.2f} s"
+            f"  ({tasks * tokens / elapsed:,.0f} tokens/s, {events / elapsed:,.0f} events/s)"
+        )
+
+
+if __name__ == '__main__':
+    main()
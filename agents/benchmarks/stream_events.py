@@ -0,0 +1,102 @@
+"""Events per second through `RemoteAgentConnections.send_task` in streaming mode.
+
+A stub A2A server streams `--events` working status updates per task, each
+with a status message, followed by a final one. The benchmark measures how
+many events per second `send_task` delivers to a task callback.
+
+    python -m xoxo.agents.benchmarks.stream_events --tasks 50 --events 500
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+
+from xoxo.agents.conversation_host.remote_agent_connection import RemoteAgentConnections
+from xoxo.agents.conversation_host.transport import HTTPConnectionPool
+from xoxo.agents.benchmarks.remote_transport import payload, start_stub_server, stub_card
+from common.types import TaskSendParams
+from sse_starlette.sse import EventSourceResponse
+from starlette.requests import Request
+
+
+def stream_handler(events: int):
+    async def handle(request: Request):
+        body = await request.json()
+        params = body["params"]
+
+        def event(index: int, final: bool) -> str:
+            return json.dumps({
+                "jsonrpc": "2.0",
+                "id": body["id"],
+                "result": {
+                    "id": params["id"],
+                    "status": {
+                        "state": "completed" if final else "working",
+                        "message": {
+                            "role": "agent",
+                            "parts": [{"type": "text", "text": f"chunk {index}"}],
+                            "metadata": {"message_id": f"m{index}"},
+                        },
+                    },
+                    "final": final,
+                },
+            })
+
+        async def stream():
+            for index in range(events):
+                yield event(index, False)
+            yield event(events, True)
+
+        return EventSourceResponse(stream())
+
+    return handle
+
+
+async def run(port: int, tasks: int, events: int) -> None:
+    pool = HTTPConnectionPool()
+    connection = RemoteAgentConnections(stub_card(port), pool)
+    received = 0
+
+    def callback(update, card):
+        nonlocal received
+        received += 1
+
+    # Warm up the connection
+    await connection.send_task(TaskSendParams(**payload()), callback)
+    received = 0
+
+    start = time.perf_counter()
+    for _ in range(tasks):
+        request = TaskSendParams(**payload(), metadata={"conversation_id": "bench"})
+        await connection.send_task(request, callback)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{tasks} tasks x {events + 1} events: {received} callbacks in {elapsed:.2f} s"
+        f"  ({received / elapsed:,.0f} events/s)"
+    )
+    await pool.close()
+
+
+@click.command()
+@click.option('--port', 'port', default=10098)
+@click.option('--tasks', 'tasks', default=50)
+@click.option('--events', 'events', default=500)
+def main(port, tasks, events):
+    """Benchmarks streamed events per second through send_task."""
+    logging.basicConfig(level=logging.INFO)
+    server = start_stub_server(port, stream_handler(events))
+    try:
+        asyncio.run(run(port, tasks, events))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Throughput of `update_store` with each task store.
+
+Runs `--tasks` tasks through an `AgentTaskManager` (without an agent), each
+with `--updates` working status updates carrying a message and a final
+completed one, and reports updates per second for a plain dict, the
+`BoundedTaskStore` and the `SqliteTaskStore`.
+
+    python -m xoxo.agents.benchmarks.task_store --tasks 200 --updates 50
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Add the src directory to sys.path to make imports work
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../../')))
+
+import click
+
+from xoxo.agents.persona_server.sqlite_task_store import SqliteTaskStore
+from xoxo.agents.persona_server.task_manager import AgentTaskManager
+from xoxo.agents.persona_server.task_store import BoundedTaskStore
+from common.types import Message, TaskSendParams, TaskState, TaskStatus, TextPart
+
+
+class DictStore(dict):
+    """The upstream store: a plain dict, with the `touch` the task manager calls."""
+
+    def touch(self, task_id: str):
+        pass
+
+    async def prefetch(self, task_id: str):
+        pass
+
+
+def message(role: str, text: str) -> Message:
+    return Message(role=role, parts=[TextPart(text=text)])
+
+
+async def run(store, tasks: int, updates: int) -> float:
+    manager = AgentTaskManager(agent=None, task_store=store)
+    start = time.perf_counter()
+    for _ in range(tasks):
+        task_id = uuid.uuid4().hex
+        await manager.upsert_task(
+            TaskSendParams(id=task_id, sessionId='bench', message=message('user', 'hello'))
+        )
+        for index in range(updates):
+            status = TaskStatus(state=TaskState.WORKING, message=message('agent', f'chunk {index}'))
+            await manager.update_store(task_id, status, None)
+        status = TaskStatus(state=TaskState.COMPLETED, message=message('agent', 'done'))
+        await manager.update_store(task_id, status, None)
+    if hasattr(store, 'flush'):
+        store.flush()
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option('--tasks', 'tasks', default=200)
+@click.option('--updates', 'updates', default=50)
+def main(tasks, updates):
+    """Benchmarks update_store throughput per task store."""
+    total = tasks * (updates + 1)
+    with tempfile.TemporaryDirectory() as directory:
+        stores = {
+            'dict': DictStore,
+            'memory': BoundedTaskStore,
+            'sqlite': lambda: SqliteTaskStore(os.path.join(directory, 'tasks.db')),
+        }
+        for name, make_store in stores.items():
+            store = make_store()
+            elapsed = asyncio.run(run(store, tasks, updates))
+            stats = store.stats() if hasattr(store, 'stats') else {}
+            if hasattr(store, 'close'):
+                store.close()
+            print(
+                f"{name:>6}: {total} updates in {elapsed:.2f} s"
+                f"  ({total / elapsed:,.0f} updates/s)  {stats}"
+            )
+
+
+if __name__ == '__main__':
+    main()
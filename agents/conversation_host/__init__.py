@@ -0,0 +1 @@
+# Shared pieces of the host agents that hold conversations with other agents
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import logging
+import os
+
+import httpx
+
+from common.types import AgentCard
+
+from .transport import HTTPConnectionPool, shared_pool
+
+
+logger = logging.getLogger(__name__)
+
+AGENT_CARD_PATH = '/.well-known/agent.json'
+
+
+class AgentCardCache:
+    """Resolves agent cards concurrently and remembers them on disk.
+
+    `cached` returns the cards from the last run without touching the
+    network, so an agent can boot straight from the cache. `resolve_all`
+    fetches every address at once, each bounded by `timeout` seconds, so a
+    dead address costs one timeout instead of blocking the others. Requests
+    send the cached ETag as `If-None-Match`, and a `304 Not Modified` keeps
+    the cached card. For servers without ETags the cache file is rewritten
+    only when a card's content or `version` changed.
+    """
+
+    def __init__(
+        self,
+        path: str | None,
+        timeout: float = 5,
+        pool: HTTPConnectionPool | None = None,
+    ):
+        self.path = path
+        self.timeout = timeout
+        self.pool = pool or shared_pool()
+        # address -> {"card": ..., "etag": ..., "version": ...}
+        self._entries: dict[str, dict] = self._load()
+
+    def cached(self, addresses: list[str]) -> list[AgentCard]:
+        """The cached cards of `addresses`, skipping any never resolved."""
+        cards = []
+        for address in addresses:
+            entry = self._entries.get(address)
+            if entry is None:
+                continue
+            try:
+                cards.append(AgentCard(**entry['card']))
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f'Ignoring cached card for {address}: {e}')
+        return cards
+
+    async def resolve_all(self, addresses: list[str]) -> list[AgentCard]:
+        """Fetch the cards of `addresses` concurrently.
+
+        Addresses that fail or time out fall back to their cached card, if any.
+        """
+        results = await asyncio.gather(
+            *(self.resolve(address) for address in addresses),
+            return_exceptions=True,
+        )
+        cards = []
+        changed = False
+        for address, result in zip(addresses, results):
+            if isinstance(result, BaseException):
+                logger.warning(f'Could not resolve agent card at {address}: {result!r}')
+                cards.extend(self.cached([address]))
+                continue
+            card, updated = result
+            cards.append(card)
+            changed = changed or updated
+        if changed:
+            await asyncio.to_thread(self._save, dict(self._entries))
+        return cards
+
+    async def resolve(self, address: str) -> tuple[AgentCard, bool]:
+        """Fetch the card at `address`; also reports whether the cache changed."""
+        entry = self._entries.get(address)
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+
+        response = await asyncio.wait_for(
+            self.pool.client.get(
+                address.rstrip('/') + AGENT_CARD_PATH, headers=headers
+            ),
+            timeout=self.timeout,
+        )
+        if response.status_code == httpx.codes.NOT_MODIFIED and entry:
+            return AgentCard(**entry['card']), False
+        response.raise_for_status()
+
+        data = response.json()
+        card = AgentCard(**data)
+        etag = response.headers.get('ETag')
+        if (
+            entry
+            and entry['card'] == data
+            and entry.get('etag') == etag
+            and entry.get('version') == card.version
+        ):
+            return card, False
+        self._entries[address] = {
+            'card': data,
+            'etag': etag,
+            'version': card.version,
+        }
+        return card, True
+
+    def _load(self) -> dict[str, dict]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f'Ignoring unreadable agent card cache: {e}')
+            return {}
+
+    def _save(self, entries: dict[str, dict]):
+        if not self.path:
+            return
+        try:
+            tmp_path = f'{self.path}.tmp'
+            with open(tmp_path, 'w') as cache_file:
+                json.dump(entries, cache_file)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f'Could not persist agent card cache: {e}')
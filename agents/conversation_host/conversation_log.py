@@ -0,0 +1,161 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+from collections import OrderedDict
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ConversationLogWriter:
+    """Appends conversation transcripts to per-pair log files.
+
+    `write` only enqueues the entry, so it is safe to call from the event
+    loop. A background thread drains the queue in batches, keeps a file handle
+    open per conversation pair, flushes every `flush_interval` seconds and
+    rotates a file once it grows past `max_bytes`, keeping `backup_count`
+    old copies (`name.txt.1`, `name.txt.2`, ...).
+    """
+
+    def __init__(
+        self,
+        logs_dir: str,
+        short_name: str,
+        flush_interval: float = 1.0,
+        max_bytes: int = 5 * 1024 * 1024,
+        backup_count: int = 3,
+        max_open_files: int = 64,
+    ):
+        self.logs_dir = logs_dir
+        self.short_name = short_name
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_open_files = max_open_files
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._handles: OrderedDict = OrderedDict()
+        # Bytes in each open file, counted as entries are written; asking the
+        # handle with tell() would flush its buffer on every entry
+        self._sizes: dict[str, int] = {}
+        self._dirty: set[str] = set()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def write(self, partner_name: str, speaker: str, message: str):
+        """Queue a message for the log shared with `partner_name`."""
+        partner_short_name = partner_name.lower().split(' ')[0]
+        # Sort the names alphabetically to ensure consistent naming regardless of who logs
+        names = sorted([self.short_name, partner_short_name])
+        # Format the log filename: name1_name2_conversation.txt
+        filename = f"{names[0]}_{names[1]}_conversation.txt"
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+        self._ensure_started()
+        self._queue.put((filename, f"[{timestamp}] {speaker}: {message}\n\n"))
+
+    def close(self):
+        """Write out everything queued so far and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                os.makedirs(self.logs_dir, exist_ok=True)
+                self._thread = threading.Thread(
+                    target=self._run, name='conversation-log', daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            batch = []
+            while item is not None:
+                if item is _STOP:
+                    running = False
+                    break
+                batch.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            for filename, entry in batch:
+                try:
+                    self._append(filename, entry)
+                except OSError as e:
+                    logger.error(f"Error logging conversation: {e}")
+
+            if not running or time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+        self._sizes.clear()
+
+    def _append(self, filename: str, entry: str):
+        handle = self._open(filename)
+        handle.write(entry)
+        self._dirty.add(filename)
+        self._sizes[filename] += len(entry.encode('utf-8'))
+        if self._sizes[filename] >= self.max_bytes:
+            self._rotate(filename)
+
+    def _open(self, filename: str):
+        handle = self._handles.get(filename)
+        if handle is not None:
+            self._handles.move_to_end(filename)
+            return handle
+        if len(self._handles) >= self.max_open_files:
+            oldest, old_handle = self._handles.popitem(last=False)
+            old_handle.close()
+            self._dirty.discard(oldest)
+            self._sizes.pop(oldest, None)
+        handle = open(
+            os.path.join(self.logs_dir, filename),
+            'a',
+            encoding='utf-8',
+            buffering=64 * 1024,
+        )
+        self._handles[filename] = handle
+        self._sizes[filename] = os.fstat(handle.fileno()).st_size
+        return handle
+
+    def _rotate(self, filename: str):
+        self._handles.pop(filename).close()
+        self._dirty.discard(filename)
+        self._sizes.pop(filename, None)
+        path = os.path.join(self.logs_dir, filename)
+        if self.backup_count <= 0:
+            os.remove(path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{path}.{index + 1}")
+        os.replace(path, f"{path}.1")
+
+    def _flush(self):
+        for filename in self._dirty:
+            try:
+                self._handles[filename].flush()
+            except (KeyError, OSError) as e:
+                logger.error(f"Error flushing conversation log {filename}: {e}")
+        self._dirty.clear()
@@ -0,0 +1,210 @@
+import json
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict, deque
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    agent TEXT NOT NULL,
+    partner TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    task_id TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (agent, partner, session_id)
+);
+CREATE INDEX IF NOT EXISTS conversations_latest
+    ON conversations (agent, partner, updated_at);
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent TEXT NOT NULL,
+    partner TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    speaker TEXT NOT NULL,
+    message TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_by_partner ON turns (agent, partner, id);
+"""
+
+
+class ConversationStore:
+    """Durable record of a host agent's conversations, backed by SQLite in WAL mode.
+
+    Conversations are keyed by `(agent, partner, session_id)`. The latest
+    session with each partner (its tool state and message count) and a
+    bounded window of its most recent turns are kept in memory for the
+    `max_partners` most recently used partners; everything else lives on
+    disk and is read back when needed, so a restarted agent picks its
+    conversations up where it left off.
+
+    Turns carry a `seq` number that increases monotonically per partner.
+
+    Calls block on SQLite; from the event loop run them with
+    `asyncio.to_thread`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        agent_name: str,
+        window: int = 20,
+        max_partners: int = 256,
+    ):
+        self.path = path
+        self.agent_name = agent_name
+        self.window = window
+        self.max_partners = max_partners
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        # partner -> (state, message_count) of the latest session, least
+        # recently used first
+        self._sessions: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        # partner -> recent turns of the latest session
+        self._windows: dict[str, deque] = {}
+        # partner -> last seq written
+        self._last_seq: dict[str, int] = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def load(self, partner: str) -> tuple[dict, int]:
+        """The tool state and message count of the latest session with `partner`."""
+        with self._lock:
+            return self._load(partner)
+
+    def history(self, partner: str) -> list[dict]:
+        """The recent turns of the latest session with `partner`, oldest first."""
+        with self._lock:
+            self._load(partner)
+            return list(self._windows[partner])
+
+    def turn_count(self, partner: str) -> int:
+        """The number of turns recorded with `partner`, over all sessions."""
+        with self._lock:
+            self._load(partner)
+            return self._last_seq[partner]
+
+    def record_turn(
+        self,
+        partner: str,
+        state: dict,
+        message_count: int,
+        turns: list[dict],
+    ):
+        """Persist new turns and the updated session state in one transaction."""
+        session_id = state.get('session_id', '')
+        now = time.time()
+        with self._lock:
+            self._load(partner)
+            seq = self._last_seq[partner]
+            rows = []
+            entries = []
+            for turn in turns:
+                seq += 1
+                entry = dict(turn, seq=seq)
+                entries.append(entry)
+                rows.append((
+                    self.agent_name,
+                    partner,
+                    session_id,
+                    seq,
+                    turn['speaker'],
+                    turn['message'],
+                    turn['timestamp'],
+                ))
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.executemany(
+                    'INSERT INTO turns '
+                    '(agent, partner, session_id, seq, speaker, message, timestamp) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    rows,
+                )
+                self._conn.execute(
+                    'INSERT INTO conversations '
+                    '(agent, partner, session_id, task_id, message_count, state, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (agent, partner, session_id) DO UPDATE SET '
+                    'task_id = excluded.task_id, '
+                    'message_count = excluded.message_count, '
+                    'state = excluded.state, '
+                    'updated_at = excluded.updated_at',
+                    (
+                        self.agent_name,
+                        partner,
+                        session_id,
+                        state.get('task_id'),
+                        message_count,
+                        json.dumps(state),
+                        now,
+                    ),
+                )
+
+            previous_state, _ = self._sessions[partner]
+            if previous_state.get('session_id') != session_id:
+                self._windows[partner].clear()
+            self._windows[partner].extend(entries)
+            self._sessions[partner] = (dict(state), message_count)
+            self._last_seq[partner] = seq
+
+    def last_turns(self, partner: str, limit: int) -> list[dict]:
+        """The last `limit` turns with `partner` across all sessions, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT session_id, seq, speaker, message, timestamp FROM turns '
+                'WHERE agent = ? AND partner = ? ORDER BY id DESC LIMIT ?',
+                (self.agent_name, partner, limit),
+            ).fetchall()
+        return [dict(row) for row in reversed(rows)]
+
+    def _load(self, partner: str) -> tuple[dict, int]:
+        session = self._sessions.get(partner)
+        if session is not None:
+            self._sessions.move_to_end(partner)
+            return session
+
+        row = self._conn.execute(
+            'SELECT session_id, message_count, state FROM conversations '
+            'WHERE agent = ? AND partner = ? ORDER BY updated_at DESC LIMIT 1',
+            (self.agent_name, partner),
+        ).fetchone()
+        window = deque(maxlen=self.window)
+        last_seq = 0
+        if row is None:
+            session = ({}, 0)
+        else:
+            session = (json.loads(row['state']), row['message_count'])
+            turns = self._conn.execute(
+                'SELECT seq, speaker, message, timestamp FROM turns '
+                'WHERE agent = ? AND partner = ? AND session_id = ? '
+                'ORDER BY id DESC LIMIT ?',
+                (self.agent_name, partner, row['session_id'], self.window),
+            ).fetchall()
+            window.extend(dict(turn) for turn in reversed(turns))
+            latest = self._conn.execute(
+                'SELECT seq FROM turns WHERE agent = ? AND partner = ? '
+                'ORDER BY id DESC LIMIT 1',
+                (self.agent_name, partner),
+            ).fetchone()
+            last_seq = latest['seq'] if latest else 0
+
+        self._sessions[partner] = session
+        self._windows[partner] = window
+        self._last_seq[partner] = last_seq
+        while len(self._sessions) > self.max_partners:
+            # Everything cached is on disk, so it can just be dropped
+            oldest, _ = self._sessions.popitem(last=False)
+            del self._windows[oldest]
+            del self._last_seq[oldest]
+        return session
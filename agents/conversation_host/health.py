@@ -0,0 +1,170 @@
+import os
+import time
+
+from collections import deque
+
+
+# Circuit breaker and adaptive timeout settings, overridable from the environment
+FAILURE_THRESHOLD = int(os.getenv('A2A_FAILURE_THRESHOLD', '5'))
+ERROR_RATE_THRESHOLD = float(os.getenv('A2A_ERROR_RATE_THRESHOLD', '0.5'))
+OPEN_SECONDS = float(os.getenv('A2A_CIRCUIT_OPEN_SECONDS', '30'))
+MAX_OPEN_SECONDS = float(os.getenv('A2A_CIRCUIT_MAX_OPEN_SECONDS', '600'))
+MIN_TIMEOUT = float(os.getenv('A2A_MIN_TIMEOUT', '5'))
+MAX_TIMEOUT = float(os.getenv('A2A_MAX_TIMEOUT', '120'))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the partner's circuit is open."""
+
+    def __init__(self, agent_name: str, retry_after: float):
+        super().__init__(
+            f'Agent {agent_name} is unavailable, retry in {retry_after:.0f}s'
+        )
+        self.agent_name = agent_name
+        self.retry_after = retry_after
+
+
+class PartnerHealth:
+    """Latency and error-rate health of one remote agent, with a circuit breaker.
+
+    The last `window` calls are kept. The circuit opens after
+    `failure_threshold` consecutive failures, or when more than
+    `error_rate_threshold` of at least `min_samples` recent calls failed.
+    While open, calls are refused. After `open_seconds` a single probe call
+    is let through (half-open). If it succeeds the circuit closes; if it
+    fails the circuit opens again for twice as long, up to
+    `max_open_seconds`.
+
+    `timeout()` adapts to the partner: `timeout_factor` times its observed
+    p95 latency, clamped to `[min_timeout, max_timeout]`.
+    """
+
+    def __init__(
+        self,
+        window: int = 50,
+        min_samples: int = 10,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        error_rate_threshold: float = ERROR_RATE_THRESHOLD,
+        open_seconds: float = OPEN_SECONDS,
+        max_open_seconds: float = MAX_OPEN_SECONDS,
+        timeout_factor: float = 3,
+        min_timeout: float = MIN_TIMEOUT,
+        max_timeout: float = MAX_TIMEOUT,
+    ):
+        self.min_samples = min_samples
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._open_for = open_seconds
+        self._opened_until = 0.0
+        self._probing = False
+
+    @property
+    def error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    @property
+    def p95(self) -> float | None:
+        if len(self._latencies) < self.min_samples:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[max(0, int(len(latencies) * 0.95) - 1)]
+
+    @property
+    def score(self) -> float:
+        """1.0 for a healthy partner, 0.0 for one whose circuit is open."""
+        if self.state == OPEN:
+            return 0.0
+        score = 1.0 - self.error_rate
+        return score / 2 if self.state == HALF_OPEN else score
+
+    def timeout(self) -> float:
+        p95 = self.p95
+        if p95 is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_factor))
+
+    def retry_after(self) -> float:
+        """Seconds until a call would be let through; 0 if it would be now."""
+        if self.state == OPEN:
+            return max(0.0, self._opened_until - time.monotonic())
+        if self.state == HALF_OPEN and self._probing:
+            return self.open_seconds
+        return 0.0
+
+    def available(self) -> bool:
+        """Whether a call would be let through, without claiming the probe."""
+        return self.retry_after() == 0.0
+
+    def acquire(self) -> bool:
+        """Claim the right to make a call; in half-open state only one at a time."""
+        if self.state == OPEN:
+            if time.monotonic() < self._opened_until:
+                return False
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record_success(self, latency: float):
+        self._latencies.append(latency)
+        self._outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self._probing = False
+            self._open_for = self.open_seconds
+            # Start over, so old failures do not reopen the circuit right away
+            self._outcomes.clear()
+
+    def record_failure(self):
+        self._outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN:
+            self._open(min(self._open_for * 2, self.max_open_seconds))
+        elif self.state == CLOSED and (
+            self.consecutive_failures >= self.failure_threshold
+            or (
+                len(self._outcomes) >= self.min_samples
+                and self.error_rate > self.error_rate_threshold
+            )
+        ):
+            self._open(self.open_seconds)
+
+    def release(self):
+        """Give up a claimed call without an outcome (e.g. it was cancelled)."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def snapshot(self) -> dict:
+        return {
+            'state': self.state,
+            'score': round(self.score, 3),
+            'error_rate': round(self.error_rate, 3),
+            'p95': self.p95,
+            'timeout': self.timeout(),
+            'retry_after': round(self.retry_after(), 1),
+        }
+
+    def _open(self, seconds: float):
+        self.state = OPEN
+        self._probing = False
+        self._open_for = seconds
+        self._opened_until = time.monotonic() + seconds
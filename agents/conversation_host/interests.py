@@ -0,0 +1,106 @@
+import functools
+import json
+import re
+
+from collections.abc import Iterable, Mapping
+from pathlib import Path
+
+
+# Interest tables of the host personas: {persona: {keyword: [kind, label]}}
+INTERESTS_PATH = Path(__file__).with_name('interests.json')
+
+
+class KeywordMatcher:
+    """Finds which of a set of keywords occur in a text in a single regex pass.
+
+    Keywords match as plain substrings, like `keyword in text`. A keyword that
+    is contained in a longer one (`law` in `lawyer`) is reported whenever the
+    longer one is.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        keywords = sorted({k.lower() for k in keywords}, key=len, reverse=True)
+        self._contained = {
+            keyword: {other for other in keywords if other in keyword}
+            for keyword in keywords
+        }
+        alternation = '|'.join(re.escape(k) for k in keywords) or '(?!)'
+        # Zero-width lookahead so matches starting at every position are found
+        self._pattern = re.compile(f'(?=({alternation}))')
+
+    def keywords(self, text: str) -> set[str]:
+        """The keywords that occur in `text`."""
+        found = set()
+        for match in self._pattern.finditer(text.lower()):
+            found |= self._contained[match.group(1)]
+        return found
+
+
+class InterestTable:
+    """Maps keywords to the interest or topic they reveal about a partner.
+
+    The table is plain data, `{keyword: (kind, label)}` with kind either
+    `'interest'` or `'topic'`, so personas can share or extend it.
+    """
+
+    def __init__(self, keywords: Mapping[str, tuple[str, str]]):
+        self._labels = {k.lower(): value for k, value in keywords.items()}
+        self.matcher = KeywordMatcher(self._labels)
+
+    def labels(self, text: str) -> set[tuple[str, str]]:
+        return {self._labels[k] for k in self.matcher.keywords(text)}
+
+
+def load_interest_table(persona: str, path: str | Path = INTERESTS_PATH) -> InterestTable:
+    """The interest table of `persona` in the interests file.
+
+    The file is read once per process; each persona gets its own table.
+    """
+    tables = _load_interest_tables(str(path))
+    if persona not in tables:
+        raise ValueError(f'No interests for persona {persona!r} in {path}')
+    return tables[persona]
+
+
+@functools.cache
+def _load_interest_tables(path: str) -> dict[str, InterestTable]:
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return {
+        persona: InterestTable({k: tuple(value) for k, value in keywords.items()})
+        for persona, keywords in data.items()
+    }
+
+
+class InterestProfile:
+    """What a partner has talked about, updated incrementally.
+
+    `update` only looks at history entries it has not seen yet, identified by
+    their `seq` (or their position when entries carry no `seq`).
+    """
+
+    def __init__(self, table: InterestTable):
+        self.table = table
+        self.interests: set[str] = set()
+        self.topics: set[str] = set()
+        self._next_seq = 0
+
+    def update(self, partner_name: str, conversation_history: list[dict]):
+        new_entries = []
+        for index in range(len(conversation_history) - 1, -1, -1):
+            entry = conversation_history[index]
+            seq = entry.get('seq', index)
+            if seq < self._next_seq:
+                break
+            new_entries.append((seq, entry))
+        if not new_entries:
+            return
+
+        for _, entry in reversed(new_entries):
+            if partner_name in entry["speaker"]:
+                for kind, label in self.table.labels(entry["message"]):
+                    if kind == 'interest':
+                        self.interests.add(label)
+                    else:
+                        self.topics.add(label)
+        self._next_seq = new_entries[0][0] + 1
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import secrets
+
+from common.types import (
+    PushNotificationConfig,
+    TaskArtifactUpdateEvent,
+    TaskStatusUpdateEvent,
+)
+from pydantic import ValidationError
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+
+logger = logging.getLogger(__name__)
+
+# Header carrying the token we put in the task's PushNotificationConfig
+TOKEN_HEADER = 'X-A2A-Notification-Token'
+
+
+class PushNotificationReceiver:
+    """Webhook that receives the task updates remote agents push to us.
+
+    Served as one route on the host agent's own server, so a single listener
+    handles every in-flight push task. Each subscribed task gets its own
+    random token; an update is accepted only when it carries the token of a
+    task we are waiting on. It is then put on that task's queue.
+
+    A GET with a `validationToken` query parameter is answered with the
+    token, which is how a remote agent checks the webhook before using it.
+    """
+
+    def __init__(self, base_url: str, path: str = '/a2a/notifications'):
+        self.path = path
+        self.url = base_url.rstrip('/') + path
+        # task id -> (token, queue of updates)
+        self._subscriptions: dict[str, tuple[str, asyncio.Queue]] = {}
+
+    def route(self) -> Route:
+        return Route(self.path, self.handle, methods=['GET', 'POST'])
+
+    def subscribe(self, task_id: str) -> tuple[PushNotificationConfig, asyncio.Queue]:
+        """Start accepting updates for `task_id`.
+
+        Returns the config to send with the task and the queue its updates
+        arrive on.
+        """
+        token = secrets.token_urlsafe(24)
+        updates: asyncio.Queue = asyncio.Queue()
+        self._subscriptions[task_id] = (token, updates)
+        return PushNotificationConfig(url=self.url, token=token), updates
+
+    def unsubscribe(self, task_id: str):
+        self._subscriptions.pop(task_id, None)
+
+    @property
+    def pending(self) -> int:
+        return len(self._subscriptions)
+
+    async def handle(self, request: Request) -> Response:
+        if request.method == 'GET':
+            validation_token = request.query_params.get('validationToken')
+            if not validation_token:
+                return JSONResponse({'error': 'Missing validationToken'}, status_code=400)
+            return PlainTextResponse(validation_token)
+        try:
+            data = await request.json()
+            event = (
+                TaskArtifactUpdateEvent(**data)
+                if 'artifact' in data
+                else TaskStatusUpdateEvent(**data)
+            )
+        except (ValueError, TypeError, ValidationError) as e:
+            return JSONResponse({'error': f'Invalid notification: {e}'}, status_code=400)
+
+        subscription = self._subscriptions.get(event.id)
+        if subscription is None:
+            return JSONResponse({'error': 'Unknown task'}, status_code=404)
+        token, updates = subscription
+        if not secrets.compare_digest(request.headers.get(TOKEN_HEADER, ''), token):
+            logger.warning(f'Rejected push notification with a bad token for task {event.id}')
+            return JSONResponse({'error': 'Invalid token'}, status_code=401)
+
+        updates.put_nowait(event)
+        return Response(status_code=204)
@@ -0,0 +1,445 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+from collections.abc import Callable
+from datetime import datetime, timezone
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure, PyMongoError
+
+from common.types import (
+    AgentCapabilities,
+    AgentCard,
+    AgentSkill,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Agents that have not been seen within this window are considered gone
+ACTIVE_WINDOW_SECONDS = 3600
+# How often a running agent refreshes its own registration
+HEARTBEAT_INTERVAL_SECONDS = int(os.getenv('AGENT_HEARTBEAT_INTERVAL', '300'))
+# MongoDB's TTL monitor removes documents this long after their last heartbeat
+EXPIRE_AFTER_SECONDS = int(os.getenv('AGENT_EXPIRE_AFTER', str(2 * ACTIVE_WINDOW_SECONDS)))
+# Re-read this many seconds behind the polling cursor to tolerate clock skew
+# between the hosts writing `last_seen`
+POLL_OVERLAP_SECONDS = 5
+# How long a change stream read blocks when there are no changes
+WATCH_MAX_AWAIT_MS = 1000
+# How often the change stream loop ages out silent agents and persists its
+# resume token, busy or not
+SWEEP_INTERVAL_SECONDS = float(os.getenv('AGENT_SWEEP_INTERVAL', '5'))
+# After the change stream fails, poll for this long before trying it again,
+# doubling on each failure in a row up to the maximum
+WATCH_RETRY_MIN_SECONDS = 30
+WATCH_RETRY_MAX_SECONDS = 600
+
+# Connection pool sizing; a host process only needs a handful of sockets
+MAX_POOL_SIZE = int(os.getenv('MONGO_MAX_POOL_SIZE', '10'))
+MIN_POOL_SIZE = int(os.getenv('MONGO_MIN_POOL_SIZE', '1'))
+MAX_IDLE_TIME_MS = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '60000'))
+SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+
+# Only the fields needed to build an AgentCard (plus `last_seen` for sync)
+AGENT_CARD_FIELDS = (
+    "name",
+    "description",
+    "url",
+    "version",
+    "capabilities",
+    "skills",
+    "last_seen",
+)
+AGENT_CARD_PROJECTION = {field: 1 for field in AGENT_CARD_FIELDS}
+
+CardCallback = Callable[[AgentCard], None]
+ExpireCallback = Callable[[str], None]
+
+
+class AgentRegistry:
+    """Handles agent registration and MongoDB operations.
+
+    Runs on the agent's event loop through Motor. Constructing the registry
+    does no I/O; the pool connects on first use.
+    """
+
+    def __init__(
+        self,
+        mongo_uri: str,
+        db_name: str,
+        collection_name: str,
+        resume_token_path: str | None = None,
+    ):
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.resume_token_path = resume_token_path
+        # State of the incremental sync: what has been applied so far
+        self._fingerprints: dict[str, str] = {}
+        self._last_seen: dict[str, float] = {}
+        self._names_by_id: dict = {}
+        self._poll_cursor = 0.0
+        # Where the change stream got to, and whether the directory was loaded
+        self._resume_token: dict | None = None
+        self._snapshot_loaded = False
+        self._watch_failures = 0
+        self.client = AsyncIOMotorClient(
+            self.mongo_uri,
+            maxPoolSize=MAX_POOL_SIZE,
+            minPoolSize=MIN_POOL_SIZE,
+            maxIdleTimeMS=MAX_IDLE_TIME_MS,
+            serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+        )
+        self.db = self.client[self.db_name]
+        self.collection = self.db[self.collection_name]
+
+    def close(self):
+        """Release the connection pool."""
+        self.client.close()
+
+    async def ensure_indexes(self):
+        """Create the indexes the registry relies on.
+
+        - unique `(name, url)`: the heartbeat upsert key
+        - `last_seen`: discovery and the polling fallback
+        - TTL on `heartbeat_at`: dead agents are removed by the server
+        """
+        await self._create_index(
+            [("name", ASCENDING), ("url", ASCENDING)],
+            name="name_url_unique",
+            unique=True,
+        )
+        await self._create_index([("last_seen", ASCENDING)], name="last_seen")
+        try:
+            await self.collection.create_index(
+                [("heartbeat_at", ASCENDING)],
+                name="heartbeat_ttl",
+                expireAfterSeconds=EXPIRE_AFTER_SECONDS,
+            )
+        except OperationFailure as e:
+            if e.code != 85:  # IndexOptionsConflict
+                logger.error(f"Could not create index heartbeat_ttl: {e}")
+                return
+            # The expiry changed since the index was created; update it in place
+            await self.db.command(
+                'collMod',
+                self.collection_name,
+                index={
+                    'name': 'heartbeat_ttl',
+                    'expireAfterSeconds': EXPIRE_AFTER_SECONDS,
+                },
+            )
+        logger.info(f"Indexes ready on {self.db_name}.{self.collection_name}")
+
+    async def _create_index(self, keys, **kwargs):
+        try:
+            await self.collection.create_index(keys, **kwargs)
+        except OperationFailure as e:
+            # Typically duplicate (name, url) pairs written before the index existed
+            logger.error(f"Could not create index {kwargs.get('name')}: {e}")
+
+    async def register_agent(self, agent_card: AgentCard):
+        """Register an agent in the MongoDB database."""
+        return await self.heartbeat([agent_card])
+
+    async def heartbeat(self, agent_cards: List[AgentCard]):
+        """Upsert the cards of every agent hosted by this process in one round-trip."""
+        if not agent_cards:
+            return True
+
+        now = time.time()
+        heartbeat_at = datetime.fromtimestamp(now, timezone.utc)
+        operations = []
+        for agent_card in agent_cards:
+            # Convert AgentCard to dict for MongoDB storage
+            agent_data = {
+                "name": agent_card.name,
+                "description": agent_card.description,
+                "url": agent_card.url,
+                "version": agent_card.version,
+                "capabilities": agent_card.capabilities.model_dump(),
+                "skills": [skill.model_dump() for skill in agent_card.skills],
+                "last_seen": now,
+                "heartbeat_at": heartbeat_at,
+                "active": True
+            }
+            # Use upsert to update if exists or insert if not
+            operations.append(UpdateOne(
+                {"name": agent_card.name, "url": agent_card.url},
+                {"$set": agent_data},
+                upsert=True
+            ))
+
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            logger.info(
+                f"Heartbeat for {len(agent_cards)} agents "
+                f"({result.upserted_count} new, {result.modified_count} updated)"
+            )
+            return True
+        except PyMongoError as e:
+            names = ', '.join(card.name for card in agent_cards)
+            logger.error(f"Error registering agents {names}: {e}")
+            return False
+
+    async def run_heartbeat(
+        self,
+        agent_cards: List[AgentCard],
+        interval: float = HEARTBEAT_INTERVAL_SECONDS,
+    ) -> None:
+        """Refresh the registration of the hosted agents until cancelled."""
+        while True:
+            await self.heartbeat(agent_cards)
+            await asyncio.sleep(interval)
+
+    async def get_all_active_agents(self) -> List[dict]:
+        """Retrieve all active agents from the database."""
+        try:
+            # Find agents that have been seen in the last hour
+            one_hour_ago = time.time() - ACTIVE_WINDOW_SECONDS
+            agents = await self.collection.find(
+                {"last_seen": {"$gt": one_hour_ago}},
+                AGENT_CARD_PROJECTION,
+            ).to_list(length=None)
+            logger.info(f"Found {len(agents)} active agents in database")
+            return agents
+        except PyMongoError as e:
+            logger.error(f"Error retrieving agents: {e}")
+            return []
+
+    @staticmethod
+    def card_from_document(agent_data: dict) -> AgentCard:
+        """Build an AgentCard from a stored agent document."""
+        skills = [
+            AgentSkill(**skill_data)
+            for skill_data in agent_data.get("skills", [])
+        ]
+        capabilities = AgentCapabilities(**agent_data.get("capabilities", {}))
+        return AgentCard(
+            name=agent_data["name"],
+            description=agent_data["description"],
+            url=agent_data["url"],
+            version=agent_data["version"],
+            capabilities=capabilities,
+            skills=skills
+        )
+
+    # -------------------------------------------------------------
+    # Incremental sync
+    # -------------------------------------------------------------
+
+    async def watch_agents(
+        self,
+        on_upsert: CardCallback,
+        on_expire: ExpireCallback,
+        poll_interval: float = 30,
+    ) -> None:
+        """Keep a local directory in sync with the agents collection.
+
+        Opens a change stream, then loads the active agents, so nothing
+        written in between is missed; only added, changed and removed cards
+        reach the callbacks after that. Heartbeats that only bump `last_seen`
+        are not forwarded. When the change stream fails (for instance on a
+        standalone mongod, which has none), polls on `last_seen` and tries
+        the stream again after a backoff. Agents whose heartbeat ages out of
+        the active window are reported through `on_expire`.
+
+        Runs until cancelled.
+        """
+        while True:
+            try:
+                await self._watch_changes(on_upsert, on_expire)
+            except OperationFailure as e:
+                if e.code == 286:
+                    # ChangeStreamHistoryLost: the oplog rolled past our token.
+                    # Without a token the next stream reloads the agents.
+                    logger.warning('Resume token is stale, reloading agents')
+                    self._resume_token = None
+                    await asyncio.to_thread(self._save_resume_token, None)
+                    continue
+                retry_in = min(
+                    WATCH_RETRY_MAX_SECONDS,
+                    WATCH_RETRY_MIN_SECONDS * 2 ** self._watch_failures,
+                )
+                self._watch_failures += 1
+                logger.info(
+                    f'Change streams unavailable ({e}), polling for {retry_in:.0f}s'
+                )
+                await self._poll_changes(on_upsert, on_expire, poll_interval, retry_in)
+            except PyMongoError as e:
+                logger.error(f'Agent change stream interrupted: {e}')
+                await asyncio.sleep(poll_interval)
+
+    async def _load_snapshot(self, on_upsert: CardCallback):
+        for agent_data in await self.get_all_active_agents():
+            self._apply_document(agent_data, on_upsert)
+
+    async def _watch_changes(self, on_upsert: CardCallback, on_expire: ExpireCallback):
+        resume_token = self._resume_token or await asyncio.to_thread(
+            self._load_resume_token
+        )
+        # Keep change events as small as the cards they describe
+        pipeline = [{'$project': {
+            'operationType': 1,
+            'documentKey': 1,
+            **{f'fullDocument.{field}': 1 for field in AGENT_CARD_FIELDS},
+        }}]
+        async with self.collection.watch(
+            pipeline,
+            full_document='updateLookup',
+            resume_after=resume_token,
+            max_await_time_ms=WATCH_MAX_AWAIT_MS,
+        ) as stream:
+            logger.info('Watching agents collection for changes')
+            self._watch_failures = 0
+            if resume_token is None or not self._snapshot_loaded:
+                # The stream is already open, so changes made while the
+                # snapshot is read are delivered after it
+                await self._load_snapshot(on_upsert)
+                self._snapshot_loaded = True
+            dirty = False
+            next_sweep = time.monotonic() + SWEEP_INTERVAL_SECONDS
+            while stream.alive:
+                change = await stream.try_next()
+                if change is not None:
+                    self._apply_change(change, on_upsert, on_expire)
+                    self._resume_token = stream.resume_token
+                    dirty = True
+                # On a timer rather than when idle, so a steady stream of
+                # heartbeats does not hold off expiries and checkpoints
+                if time.monotonic() < next_sweep:
+                    continue
+                next_sweep = time.monotonic() + SWEEP_INTERVAL_SECONDS
+                if dirty:
+                    await asyncio.to_thread(
+                        self._save_resume_token, stream.resume_token
+                    )
+                    dirty = False
+                self._expire_stale(on_expire)
+
+    async def _poll_changes(
+        self,
+        on_upsert: CardCallback,
+        on_expire: ExpireCallback,
+        poll_interval: float,
+        duration: float,
+    ):
+        """Poll on `last_seen` every `poll_interval` seconds for `duration` seconds."""
+        until = time.monotonic() + duration
+        while True:
+            cursor = self.collection.find(
+                {"last_seen": {"$gt": self._poll_cursor - POLL_OVERLAP_SECONDS}},
+                AGENT_CARD_PROJECTION,
+            ).sort("last_seen", 1)
+            async for agent_data in cursor:
+                self._apply_document(agent_data, on_upsert)
+            self._expire_stale(on_expire)
+            if time.monotonic() + poll_interval > until:
+                return
+            await asyncio.sleep(poll_interval)
+
+    def _apply_change(
+        self,
+        change: dict,
+        on_upsert: CardCallback,
+        on_expire: ExpireCallback,
+    ):
+        operation = change.get('operationType')
+        if operation in ('insert', 'update', 'replace'):
+            agent_data = change.get('fullDocument')
+            if agent_data:
+                self._apply_document(
+                    agent_data, on_upsert, change['documentKey']['_id']
+                )
+        elif operation == 'delete':
+            name = self._names_by_id.pop(change['documentKey']['_id'], None)
+            if name:
+                self._forget(name, on_expire)
+
+    def _apply_document(
+        self,
+        agent_data: dict,
+        on_upsert: CardCallback,
+        agent_id=None,
+    ):
+        """Apply a stored agent document; `agent_id` defaults to its `_id`."""
+        name = agent_data.get("name")
+        if not name:
+            return
+        last_seen = agent_data.get("last_seen", 0.0)
+        self._poll_cursor = max(self._poll_cursor, last_seen)
+        if last_seen <= time.time() - ACTIVE_WINDOW_SECONDS:
+            return
+        if agent_id is None:
+            agent_id = agent_data.get("_id")
+        # Change events carry the id in `documentKey`, deletes only there
+        self._names_by_id[agent_id] = name
+        self._last_seen[name] = last_seen
+
+        fingerprint = self._fingerprint(agent_data)
+        if self._fingerprints.get(name) == fingerprint:
+            return
+        try:
+            card = self.card_from_document(agent_data)
+        except Exception as e:
+            logger.error(f"Error building card for agent {name}: {e}")
+            return
+        self._fingerprints[name] = fingerprint
+        on_upsert(card)
+
+    def _expire_stale(self, on_expire: ExpireCallback):
+        cutoff = time.time() - ACTIVE_WINDOW_SECONDS
+        for name, last_seen in list(self._last_seen.items()):
+            if last_seen <= cutoff:
+                self._forget(name, on_expire)
+
+    def _forget(self, name: str, on_expire: ExpireCallback):
+        self._last_seen.pop(name, None)
+        if self._fingerprints.pop(name, None) is not None:
+            logger.info(f"Agent expired: {name}")
+            on_expire(name)
+
+    @staticmethod
+    def _fingerprint(agent_data: dict) -> str:
+        return json.dumps(
+            [
+                agent_data.get("url"),
+                agent_data.get("version"),
+                agent_data.get("description"),
+                agent_data.get("capabilities"),
+                agent_data.get("skills"),
+            ],
+            sort_keys=True,
+            default=str,
+        )
+
+    def _load_resume_token(self) -> dict | None:
+        if not self.resume_token_path or not os.path.exists(self.resume_token_path):
+            return None
+        try:
+            with open(self.resume_token_path) as token_file:
+                return json.load(token_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f'Ignoring unreadable resume token: {e}')
+            return None
+
+    def _save_resume_token(self, resume_token: dict | None):
+        if not self.resume_token_path:
+            return
+        try:
+            if resume_token is None:
+                if os.path.exists(self.resume_token_path):
+                    os.remove(self.resume_token_path)
+                return
+            tmp_path = f'{self.resume_token_path}.tmp'
+            with open(tmp_path, 'w') as token_file:
+                json.dump(resume_token, token_file, default=str)
+            os.replace(tmp_path, self.resume_token_path)
+        except OSError as e:
+            logger.warning(f'Could not persist resume token: {e}')
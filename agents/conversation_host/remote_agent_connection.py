@@ -0,0 +1,411 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+import uuid
+
+from collections.abc import Callable
+from contextlib import aclosing
+
+from common.types import (
+    AgentCard,
+    Task,
+    TaskArtifactUpdateEvent,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+)
+
+from .health import CircuitOpenError, PartnerHealth
+from .push_receiver import PushNotificationReceiver
+from .transport import (
+    HTTPConnectionPool,
+    PooledA2AClient,
+    is_connect_error,
+    shared_pool,
+    slot_acquired,
+)
+
+
+logger = logging.getLogger(__name__)
+
+TaskCallbackArg = Task | TaskStatusUpdateEvent | TaskArtifactUpdateEvent
+TaskUpdateCallback = Callable[[TaskCallbackArg, AgentCard], Task]
+
+# Log one in this many streamed events (final events are always logged)
+STREAM_LOG_EVERY = int(os.getenv('A2A_STREAM_LOG_EVERY', '100'))
+# Resends of a request that never reached the partner
+SEND_RETRIES = int(os.getenv('A2A_SEND_RETRIES', '2'))
+RETRY_BACKOFF = 0.5
+# Outstanding tasks per partner, and what to do with more: 'wait' or 'reject'
+MAX_OUTSTANDING_TASKS = int(os.getenv('A2A_MAX_OUTSTANDING_TASKS', '4'))
+WHEN_FULL = os.getenv('A2A_WHEN_FULL', 'wait')
+FULL_WAIT_TIMEOUT = float(os.getenv('A2A_FULL_WAIT_TIMEOUT', '30'))
+# Longest a call may queue for a host slot in the connection pool, on top
+# of the partner's timeout, before it times out
+SLOT_WAIT_TIMEOUT = float(os.getenv('A2A_SLOT_WAIT_TIMEOUT', '30'))
+
+# Message ids are a per-process random prefix plus a counter, which is unique
+# without drawing a uuid4 per event
+_MESSAGE_ID_PREFIX = uuid.uuid4().hex
+_message_counter = itertools.count()
+
+
+def next_message_id() -> str:
+    return f'{_MESSAGE_ID_PREFIX}-{next(_message_counter)}'
+
+
+class TooManyTasksError(Exception):
+    """Raised when a partner already has its maximum of outstanding tasks."""
+
+    def __init__(self, agent_name: str, limit: int):
+        super().__init__(
+            f'Agent {agent_name} already has {limit} outstanding tasks'
+        )
+        self.agent_name = agent_name
+        self.limit = limit
+
+
+class RemoteAgentConnections:
+    """A class to hold the connections to the remote agents.
+
+    Every call is tracked in `health`. While the partner's circuit is open
+    `send_task` fails fast with `CircuitOpenError`, calls time out after the
+    partner's adaptive timeout (counted from when the request gets its host
+    slot in the connection pool, not while it queues for one, which may take
+    at most `slot_wait_timeout` seconds), and requests that never reached
+    the partner are resent up to `retries` times.
+
+    At most `max_outstanding` tasks run against the partner at once; they
+    are listed in `pending_tasks`. When the limit is reached, further calls
+    wait up to `wait_timeout` seconds for a slot (`when_full='wait'`) or
+    fail right away (`when_full='reject'`) with `TooManyTasksError`. If the
+    caller gives up on a task (it is cancelled or times out) the partner
+    is sent `tasks/cancel`.
+
+    With a `push_receiver`, partners whose card advertises
+    `pushNotifications` answer through it: the task is sent with
+    `tasks/send` and a push config, and its updates arrive on the host's
+    webhook instead of an SSE stream held open for the whole turn.
+    """
+
+    def __init__(
+        self,
+        agent_card: AgentCard,
+        pool: HTTPConnectionPool | None = None,
+        health: PartnerHealth | None = None,
+        retries: int = SEND_RETRIES,
+        max_outstanding: int = MAX_OUTSTANDING_TASKS,
+        when_full: str = WHEN_FULL,
+        wait_timeout: float = FULL_WAIT_TIMEOUT,
+        push_receiver: PushNotificationReceiver | None = None,
+        slot_wait_timeout: float = SLOT_WAIT_TIMEOUT,
+    ):
+        if when_full not in ('wait', 'reject'):
+            raise ValueError(f'when_full must be "wait" or "reject", not {when_full!r}')
+        # Requests go through a keep-alive pool shared by all remote agents
+        self.agent_client = PooledA2AClient(agent_card, pool or shared_pool())
+        self.card = agent_card
+
+        self.conversation_name = None
+        self.conversation = None
+        # Outstanding tasks: call number -> task id, session id and start time
+        self.pending_tasks: dict[int, dict] = {}
+        self._events = 0
+        self.health = health or PartnerHealth()
+        self.retries = retries
+        self.max_outstanding = max_outstanding
+        self.when_full = when_full
+        self.wait_timeout = wait_timeout
+        self._slots = asyncio.Semaphore(max_outstanding)
+        self._calls = itertools.count()
+        self._cancellations: set[asyncio.Task] = set()
+        self.push_receiver = push_receiver
+        self.slot_wait_timeout = slot_wait_timeout
+
+    def get_agent(self) -> AgentCard:
+        return self.card
+
+    def outstanding(self) -> list[dict]:
+        """The tasks currently in flight with this partner, oldest first."""
+        now = time.monotonic()
+        return [
+            {
+                'task_id': pending['task_id'],
+                'session_id': pending['session_id'],
+                'seconds': round(now - pending['started'], 1),
+            }
+            for pending in self.pending_tasks.values()
+        ]
+
+    async def send_task(
+        self,
+        request: TaskSendParams,
+        task_callback: TaskUpdateCallback | None,
+    ) -> Task | None:
+        if not self.health.acquire():
+            raise CircuitOpenError(self.card.name, self.health.retry_after())
+        try:
+            await self._reserve_slot()
+        except BaseException:
+            self.health.release()
+            raise
+
+        call = next(self._calls)
+        self.pending_tasks[call] = {
+            'task_id': request.id,
+            'session_id': request.sessionId,
+            'started': time.monotonic(),
+        }
+        try:
+            return await self._send_with_retries(request, task_callback)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            self.health.release()
+            self._cancel_remote_task(request.id)
+            raise
+        finally:
+            del self.pending_tasks[call]
+            self._slots.release()
+
+    async def _reserve_slot(self):
+        if self.when_full == 'reject' and self._slots.locked():
+            raise TooManyTasksError(self.card.name, self.max_outstanding)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.wait_timeout)
+        except asyncio.TimeoutError:
+            raise TooManyTasksError(self.card.name, self.max_outstanding) from None
+
+    def _cancel_remote_task(self, task_id: str):
+        # Runs on its own, the caller's task may be being cancelled
+        cancellation = asyncio.create_task(self._send_cancel(task_id))
+        self._cancellations.add(cancellation)
+        cancellation.add_done_callback(self._cancellations.discard)
+
+    async def _send_cancel(self, task_id: str):
+        try:
+            await asyncio.wait_for(
+                self.agent_client.cancel_task({'id': task_id}),
+                timeout=self.health.min_timeout,
+            )
+        except Exception as e:
+            logger.warning(f'Could not cancel task {task_id} on {self.card.name}: {e!r}')
+
+    async def _send_with_retries(
+        self,
+        request: TaskSendParams,
+        task_callback: TaskUpdateCallback | None,
+    ) -> Task | None:
+        attempt = 0
+        while True:
+            try:
+                result, latency = await self._send_timed(request, task_callback)
+            except Exception as e:
+                if attempt < self.retries and is_connect_error(e):
+                    attempt += 1
+                    await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+                    continue
+                self.health.record_failure()
+                raise
+            self.health.record_success(latency)
+            return result
+
+    async def _send_timed(
+        self,
+        request: TaskSendParams,
+        task_callback: TaskUpdateCallback | None,
+    ) -> tuple[Task | None, float]:
+        """Send once within the partner's timeout; returns the result and latency.
+
+        Time spent queueing for a host slot in the connection pool is not
+        the partner's latency, so the timeout and the latency both restart
+        when the first request of the call gets its slot. Until then the
+        call may take the timeout plus `slot_wait_timeout`, so it ends even
+        if it never gets a slot.
+        """
+        loop = asyncio.get_running_loop()
+        timeout = self.health.timeout()
+        start = time.monotonic()
+        acquired = False
+        async with asyncio.timeout(timeout + self.slot_wait_timeout) as deadline:
+
+            def on_slot_acquired():
+                nonlocal start, acquired
+                if not acquired:
+                    acquired = True
+                    start = time.monotonic()
+                    deadline.reschedule(loop.time() + timeout)
+
+            token = slot_acquired.set(on_slot_acquired)
+            try:
+                result = await self._send_task(request, task_callback)
+            finally:
+                slot_acquired.reset(token)
+        return result, time.monotonic() - start
+
+    async def _send_task(
+        self,
+        request: TaskSendParams,
+        task_callback: TaskUpdateCallback | None,
+    ) -> Task | None:
+        if self.push_receiver is not None and self.card.capabilities.pushNotifications:
+            return await self._send_task_push(request, task_callback)
+        if self.card.capabilities.streaming:
+            task = Task(
+                id=request.id,
+                sessionId=request.sessionId,
+                status=TaskStatus(
+                    state=TaskState.SUBMITTED,
+                    message=request.message,
+                ),
+                history=[request.message],
+            )
+            if task_callback:
+                task_callback(task, self.card)
+            # Closed on the way out, so leaving at the final event releases the stream
+            async with aclosing(
+                self.agent_client.send_task_streaming(request)
+            ) as responses:
+                async for response in responses:
+                    result = response.result
+                    final = getattr(result, 'final', False)
+                    self._log_event('Streaming', result, final)
+                    stamp_result(result, request)
+                    if task_callback:
+                        task = task_callback(result, self.card)
+                    else:
+                        # Without a callback to fold the updates in, do it here
+                        task = fold_update(task, result)
+                    if final:
+                        break
+            return task
+        # Non-streaming
+        response = await self.agent_client.send_task(request)
+        result = response.result
+        self._log_event('Non-streaming', result, True)
+        stamp_result(result, request)
+        if task_callback:
+            task_callback(result, self.card)
+        return result
+
+    async def _send_task_push(
+        self,
+        request: TaskSendParams,
+        task_callback: TaskUpdateCallback | None,
+    ) -> Task | None:
+        config, updates = self.push_receiver.subscribe(request.id)
+        try:
+            response = await self.agent_client.send_task(
+                request.model_copy(update={'pushNotification': config})
+            )
+            result = response.result
+            final = result is None or result.status.state not in (
+                TaskState.SUBMITTED,
+                TaskState.WORKING,
+            )
+            self._log_event('Push', result, final)
+            stamp_result(result, request)
+            task = result
+            if task_callback and result is not None:
+                task = task_callback(result, self.card)
+            while not final:
+                result = await updates.get()
+                final = getattr(result, 'final', False)
+                self._log_event('Push', result, final)
+                stamp_result(result, request)
+                if task_callback:
+                    task = task_callback(result, self.card)
+            if task_callback is None and task is not None and task.status.state in (
+                TaskState.SUBMITTED,
+                TaskState.WORKING,
+            ):
+                # Without a callback to fold the updates in, fetch the finished task
+                response = await self.agent_client.get_task({'id': request.id})
+                task = response.result or task
+            return task
+        finally:
+            self.push_receiver.unsubscribe(request.id)
+
+    def _log_event(self, kind: str, result, final: bool):
+        self._events += 1
+        if not final and self._events % STREAM_LOG_EVERY:
+            return
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        status = getattr(result, 'status', None)
+        logger.info(
+            '%s response agent=%s task=%s type=%s state=%s final=%s events=%d',
+            kind,
+            self.card.name,
+            getattr(result, 'id', None),
+            type(result).__name__,
+            status.state if status else None,
+            final,
+            self._events,
+        )
+
+
+def fold_update(task: Task, update: TaskCallbackArg | None) -> Task:
+    """Apply a streamed update to `task` and return the updated task."""
+    if update is None:
+        return task
+    if isinstance(update, Task):
+        return update
+    merge_metadata(task, update)
+    if isinstance(update, TaskStatusUpdateEvent):
+        task.status = update.status
+        if update.status.message:
+            task.history = (task.history or []) + [update.status.message]
+        return task
+    artifact = update.artifact
+    artifacts = list(task.artifacts or [])
+    for i, existing in enumerate(artifacts):
+        if existing.index != artifact.index:
+            continue
+        if artifact.append:
+            # Later chunks of a streamed artifact add to its parts
+            artifacts[i] = existing.model_copy(
+                update={
+                    'parts': existing.parts + artifact.parts,
+                    'lastChunk': artifact.lastChunk,
+                }
+            )
+        else:
+            artifacts[i] = artifact
+        break
+    else:
+        artifacts.append(artifact)
+    task.artifacts = artifacts
+    return task
+
+
+def stamp_result(result, request: TaskSendParams):
+    """Propagate the request metadata and give the status message a fresh id."""
+    if result is None:
+        return
+    merge_metadata(result, request)
+    # For task status updates, we need to propagate metadata and provide
+    # a unique message id.
+    status = getattr(result, 'status', None)
+    m = status.message if status is not None else None
+    if not m:
+        return
+    if m.metadata is None:
+        m.metadata = {}
+    if request.message.metadata:
+        m.metadata.update(request.message.metadata)
+    if 'message_id' in m.metadata:
+        m.metadata['last_message_id'] = m.metadata['message_id']
+    m.metadata['message_id'] = next_message_id()
+
+
+def merge_metadata(target, source):
+    if not hasattr(target, 'metadata') or not hasattr(source, 'metadata'):
+        return
+    if not source.metadata:
+        return
+    if target.metadata:
+        target.metadata.update(source.metadata)
+    else:
+        target.metadata = source.metadata.copy()
@@ -0,0 +1,23 @@
+# Replies are tasks or task events from `common.types`. Only their attributes
+# are read, so this module does not import the A2A types.
+
+
+def response_text(response) -> str | None:
+    """The text of a reply: its status message, or else its artifacts."""
+    if response is None:
+        return None
+    status = getattr(response, 'status', None)
+    message = status.message if status is not None else None
+    parts = list(message.parts) if message else []
+    if not _text_of(parts):
+        # Streamed replies carry the text in artifacts and end on a bare status
+        parts = [
+            part
+            for artifact in getattr(response, 'artifacts', None) or []
+            for part in artifact.parts
+        ]
+    return _text_of(parts) or None
+
+
+def _text_of(parts) -> str:
+    return ''.join(getattr(part, 'text', None) or '' for part in parts)
@@ -0,0 +1,90 @@
+import asyncio
+import inspect
+import logging
+import random
+import time
+
+from collections.abc import Awaitable, Callable
+
+import uvicorn
+
+
+logger = logging.getLogger(__name__)
+
+ServiceFactory = Callable[[], Awaitable[None]]
+ShutdownHook = Callable[[], Awaitable[None] | None]
+
+
+class AgentRuntime:
+    """Runs the A2A server and the agent's background services on one event loop.
+
+    Each service is a coroutine factory supervised by the runtime: if the
+    coroutine raises or returns it is restarted after an exponential backoff
+    with full jitter. The backoff resets once a service has stayed up for
+    `healthy_after` seconds. When the server stops, every service is
+    cancelled and the shutdown hooks run.
+    """
+
+    def __init__(
+        self,
+        base_backoff: float = 1,
+        max_backoff: float = 60,
+        healthy_after: float = 60,
+    ):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.healthy_after = healthy_after
+        self._services: list[tuple[str, ServiceFactory]] = []
+        self._shutdown_hooks: list[ShutdownHook] = []
+
+    def add_service(self, name: str, factory: ServiceFactory):
+        """Run `factory()` for the lifetime of the runtime, restarting it on failure."""
+        self._services.append((name, factory))
+
+    def add_shutdown_hook(self, hook: ShutdownHook):
+        """Call `hook` after the services have been cancelled."""
+        self._shutdown_hooks.append(hook)
+
+    async def serve(self, app, host: str, port: int):
+        """Serve `app` and run the services until the server shuts down."""
+        server = uvicorn.Server(uvicorn.Config(app, host=host, port=port))
+        tasks = [
+            asyncio.create_task(self._supervise(name, factory), name=name)
+            for name, factory in self._services
+        ]
+        try:
+            await server.serve()
+        finally:
+            await self._shutdown(tasks)
+
+    async def _supervise(self, name: str, factory: ServiceFactory):
+        failures = 0
+        while True:
+            started = time.monotonic()
+            try:
+                logger.info(f'Starting service {name}')
+                await factory()
+                logger.warning(f'Service {name} exited, restarting')
+            except Exception as e:
+                logger.error(f'Service {name} failed: {e}')
+            if time.monotonic() - started >= self.healthy_after:
+                failures = 0
+            failures += 1
+            delay = random.uniform(
+                0, min(self.max_backoff, self.base_backoff * 2 ** (failures - 1))
+            )
+            logger.info(f'Restarting service {name} in {delay:.1f}s')
+            await asyncio.sleep(delay)
+
+    async def _shutdown(self, tasks: list[asyncio.Task]):
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for hook in self._shutdown_hooks:
+            try:
+                result = hook()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f'Error during shutdown: {e}')
+        logger.info('Agent runtime stopped')
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+
+from .conversation_store import ConversationStore
+from .health import CircuitOpenError
+
+
+logger = logging.getLogger(__name__)
+
+# Task metadata telling partners' LLM gateways that a turn is background
+# traffic, to be answered after their interactive requests
+PRIORITY_KEY = 'priority'
+AUTONOMOUS = 'autonomous'
+
+
+class ConversationToolContext:
+    """Stand-in for the ADK ToolContext when talking to agents outside a model call."""
+
+    def __init__(self, state: dict | None = None):
+        self.state = state if state is not None else {}
+        self.actions = None
+
+
+def conversation_stage(message_count: int) -> str:
+    """Pick the conversation stage for the next message to a partner."""
+    if message_count == 0:
+        return "greeting"
+    if message_count <= 3:
+        return f"followup_{message_count}"
+    # For messages beyond the 4th, cycle through followup stages
+    # This creates a more natural ongoing conversation
+    return f"followup_{(message_count - 4) % 3 + 1}"
+
+
+class ConversationScheduler:
+    """Runs the autonomous conversations of a host agent.
+
+    Every partner gets its own task, so one slow partner no longer holds up the
+    others. At most `max_concurrency` turns are in flight at once, a partner is
+    never sent a new message while its previous turn is still running, and each
+    partner is contacted at most once per `partner_interval` seconds. A turn
+    that takes longer than `turn_timeout` is abandoned.
+
+    Partners whose circuit breaker is open are skipped until it lets calls
+    through again, so an unresponsive agent does not tie up a turn slot.
+
+    The partner list is rebuilt from `agent.list_remote_agents()` only when
+    `agent.directory_version` changes, which the agent bumps whenever a
+    partner is added or removed; partners that left are forgotten then.
+    """
+
+    def __init__(
+        self,
+        agent,
+        self_name: str,
+        store: ConversationStore,
+        max_concurrency: int = 8,
+        partner_interval: float = 30,
+        turn_timeout: float = 120,
+        tick_interval: float = 1,
+        initial_delay: float = 30,
+    ):
+        self.agent = agent
+        self.self_name = self_name
+        self.partner_interval = partner_interval
+        self.turn_timeout = turn_timeout
+        self.tick_interval = tick_interval
+        self.initial_delay = initial_delay
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._next_due: dict[str, float] = {}
+        self._partners: list[str] = []
+        self._directory_version: int | None = None
+        self._idle = False
+        # Conversation state and history per partner, persisted across restarts
+        self.store = store
+
+    async def run(self):
+        """Schedule conversation turns until cancelled."""
+        # Initial delay to let the system stabilize
+        await asyncio.sleep(self.initial_delay)
+        try:
+            while True:
+                try:
+                    self._schedule_due_partners()
+                except Exception as e:
+                    logger.error(f"Error in periodic conversation: {e}")
+                await asyncio.sleep(self.tick_interval)
+        finally:
+            for task in list(self._in_flight.values()):
+                task.cancel()
+
+    def _schedule_due_partners(self):
+        partners = self._current_partners()
+        if not partners:
+            if not self._idle:
+                logger.info("No remote agents available for conversation. Waiting...")
+            self._idle = True
+            return
+        self._idle = False
+
+        now = time.monotonic()
+        for agent_name in partners:
+            if agent_name in self._in_flight:
+                continue
+            if self._next_due.get(agent_name, 0) > now:
+                continue
+            retry_after = self._retry_after(agent_name)
+            if retry_after:
+                logger.info(f"Skipping {agent_name} for {retry_after:.0f}s, it is unhealthy")
+                self._next_due[agent_name] = now + retry_after
+                continue
+            task = asyncio.create_task(self._run_turn(agent_name))
+            self._in_flight[agent_name] = task
+            task.add_done_callback(
+                lambda _, name=agent_name: self._in_flight.pop(name, None)
+            )
+
+    def _current_partners(self) -> list[str]:
+        version = self.agent.directory_version
+        if version == self._directory_version:
+            return self._partners
+        self._directory_version = version
+        self._partners = [
+            agent_info['name']
+            for agent_info in self.agent.list_remote_agents()
+            if self.self_name not in agent_info['name']
+        ]
+        for agent_name in self._next_due.keys() - set(self._partners):
+            del self._next_due[agent_name]
+        return self._partners
+
+    def _retry_after(self, agent_name: str) -> float:
+        connection = self.agent.remote_agent_connections.get(agent_name)
+        if connection is None:
+            return 0.0
+        return connection.health.retry_after()
+
+    async def _run_turn(self, agent_name: str):
+        try:
+            async with self._semaphore:
+                await asyncio.wait_for(
+                    self._converse(agent_name), timeout=self.turn_timeout
+                )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Conversation turn with {agent_name} timed out after {self.turn_timeout}s"
+            )
+        except CircuitOpenError as e:
+            logger.info(str(e))
+        except Exception as e:
+            logger.error(f"Error in conversation with {agent_name}: {e}")
+        finally:
+            # Unless the partner left the registry while its turn was running
+            if agent_name in self._partners:
+                self._next_due[agent_name] = time.monotonic() + self.partner_interval
+
+    async def _converse(self, agent_name: str):
+        state, message_count = await asyncio.to_thread(self.store.load, agent_name)
+        # The history is a window of recent turns, for the prompt; the count is all of them
+        history = await asyncio.to_thread(self.store.history, agent_name)
+        history_length = await asyncio.to_thread(self.store.turn_count, agent_name)
+        stage = conversation_stage(message_count)
+
+        # Resume the conversation state (task and session ids) if we have one
+        tool_context = ConversationToolContext(dict(state))
+        tool_context.state[PRIORITY_KEY] = AUTONOMOUS
+
+        # Generate a contextually relevant message based on conversation history
+        message = await self.agent.generate_message(
+            partner_name=agent_name,
+            conversation_history=history,
+            conversation_stage=stage,
+            history_length=history_length,
+        )
+        logger.info(f"{stage.capitalize()} with {agent_name}: {message}")
+
+        if message_count == 0:
+            response = await self.agent.send_message(agent_name, message, tool_context)
+        else:
+            response = await self.agent.reply_message(agent_name, message, tool_context)
+
+        # Add messages to conversation history
+        turns = [{
+            "speaker": self.self_name,
+            "message": message,
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+        }]
+        response_text = self.agent._extract_response_text(response)
+        if response_text:
+            turns.append({
+                "speaker": agent_name,
+                "message": response_text,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            })
+
+        await asyncio.to_thread(
+            self.store.record_turn,
+            agent_name,
+            tool_context.state,
+            message_count + 1,
+            turns,
+        )
@@ -0,0 +1,225 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+
+from collections.abc import AsyncIterator, Callable
+from contextvars import ContextVar
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from common.client import A2AClient
+from common.types import (
+    A2AClientHTTPError,
+    A2AClientJSONError,
+    AgentCard,
+    JSONRPCRequest,
+    SendTaskResponse,
+    SendTaskStreamingResponse,
+    TaskSendParams,
+)
+from httpx_sse import aconnect_sse
+
+
+logger = logging.getLogger(__name__)
+
+# Pool settings, overridable from the environment
+HTTP_MAX_CONNECTIONS = int(os.getenv('A2A_HTTP_MAX_CONNECTIONS', '100'))
+HTTP_MAX_KEEPALIVE = int(os.getenv('A2A_HTTP_MAX_KEEPALIVE', '20'))
+HTTP_MAX_PER_HOST = int(os.getenv('A2A_HTTP_MAX_PER_HOST', '8'))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('A2A_HTTP_KEEPALIVE_EXPIRY', '30'))
+HTTP_TIMEOUT = float(os.getenv('A2A_HTTP_TIMEOUT', '60'))
+HTTP2 = os.getenv('A2A_HTTP2', '').lower() in ('1', 'true', 'yes')
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Set by a caller to be told when its request gets a host slot, so it can
+# keep the time spent queueing for one out of its timeout
+slot_acquired: ContextVar[Callable[[], None] | None] = ContextVar(
+    'slot_acquired', default=None
+)
+
+
+class HTTPConnectionPool:
+    """A bounded pool of keep-alive connections shared by all remote agents.
+
+    Wraps a single `httpx.AsyncClient`, so requests to the same host reuse
+    open connections instead of paying a TCP (and TLS) handshake per turn.
+    At most `max_connections` are open overall and `max_per_host` requests
+    to any one host wait for a response at a time (a stream holds its slot
+    only until the response headers arrive, so co-hosted agents streaming
+    long turns do not share the limit); connections idle for longer than
+    `keepalive_expiry` seconds are closed. With `http2=True` (and the `h2`
+    package installed) requests to HTTP/2 servers share one multiplexed
+    connection.
+
+    The client is created on first use, inside the running event loop.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = HTTP_MAX_KEEPALIVE,
+        max_per_host: int = HTTP_MAX_PER_HOST,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        timeout: float = HTTP_TIMEOUT,
+        http2: bool = HTTP2,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.http2 = http2 and _h2_available()
+        self._client: httpx.AsyncClient | None = None
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+            )
+        return self._client
+
+    def host_slot(self, url: str) -> asyncio.Semaphore:
+        """The semaphore bounding concurrent requests to the host of `url`."""
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_per_host)
+            self._host_slots[host] = slot
+        return slot
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._host_slots.clear()
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+        return False
+    return True
+
+
+def is_connect_error(error: BaseException) -> bool:
+    """Whether `error` means the request never reached the server, so it is safe to resend."""
+    cause = error.__cause__ if isinstance(error, A2AClientHTTPError) else error
+    if isinstance(error, A2AClientHTTPError) and error.status_code == 503:
+        return True
+    return isinstance(cause, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+_shared_pool: HTTPConnectionPool | None = None
+
+
+def shared_pool() -> HTTPConnectionPool:
+    """The process-wide pool used by `RemoteAgentConnections` by default."""
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = HTTPConnectionPool()
+    return _shared_pool
+
+
+async def close_shared_pool():
+    global _shared_pool
+    if _shared_pool is not None:
+        await _shared_pool.close()
+        _shared_pool = None
+
+
+class PooledA2AClient(A2AClient):
+    """An `A2AClient` that sends its requests through an `HTTPConnectionPool`.
+
+    Unlike the base client, streaming reads the SSE response asynchronously,
+    so a long stream no longer blocks the event loop. Task requests accept a
+    `TaskSendParams` as well as a dict; it is serialized straight to JSON
+    once, without a `model_dump` and re-validation round trip.
+    """
+
+    def __init__(self, agent_card: AgentCard, pool: HTTPConnectionPool):
+        super().__init__(agent_card)
+        self.pool = pool
+
+    async def send_task(
+        self, payload: dict[str, Any] | TaskSendParams
+    ) -> SendTaskResponse:
+        body = self._request_body('tasks/send', payload)
+        return SendTaskResponse(**await self._post(body))
+
+    async def send_task_streaming(
+        self, payload: dict[str, Any] | TaskSendParams
+    ) -> AsyncIterator[SendTaskStreamingResponse]:
+        body = self._request_body('tasks/sendSubscribe', payload)
+        slot = await self._acquire_slot()
+        holding = True
+        try:
+            async with aconnect_sse(
+                self.pool.client,
+                'POST',
+                self.url,
+                content=body,
+                headers=_JSON_HEADERS,
+                timeout=None,
+            ) as event_source:
+                # The headers are in; the rest of the turn streams without the slot
+                slot.release()
+                holding = False
+                async for sse in event_source.aiter_sse():
+                    yield SendTaskStreamingResponse(**json.loads(sse.data))
+        except json.JSONDecodeError as e:
+            raise A2AClientJSONError(str(e)) from e
+        except httpx.RequestError as e:
+            raise A2AClientHTTPError(400, str(e)) from e
+        finally:
+            if holding:
+                slot.release()
+
+    async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
+        return await self._post(request.model_dump_json())
+
+    async def _post(self, body: str) -> dict[str, Any]:
+        slot = await self._acquire_slot()
+        try:
+            response = await self.pool.client.post(
+                self.url, content=body, headers=_JSON_HEADERS
+            )
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPStatusError as e:
+            raise A2AClientHTTPError(e.response.status_code, str(e)) from e
+        except json.JSONDecodeError as e:
+            raise A2AClientJSONError(str(e)) from e
+        finally:
+            slot.release()
+
+    async def _acquire_slot(self) -> asyncio.Semaphore:
+        slot = self.pool.host_slot(self.url)
+        await slot.acquire()
+        callback = slot_acquired.get()
+        if callback is not None:
+            callback()
+        return slot
+
+    @staticmethod
+    def _request_body(method: str, payload: dict[str, Any] | TaskSendParams) -> str:
+        if isinstance(payload, TaskSendParams):
+            params = payload.model_dump_json()
+        else:
+            params = json.dumps(payload)
+        return (
+            f'{{"jsonrpc": "2.0", "id": "{uuid.uuid4().hex}", '
+            f'"method": "{method}", "params": {params}}}'
+        )
@@ -0,0 +1 @@
+# Shared A2A server pieces for the conversational persona agents
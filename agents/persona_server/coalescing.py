@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+from collections.abc import Awaitable, Callable
+
+from common.types import (
+    Artifact,
+    TaskArtifactUpdateEvent,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+
+
+# How long a streamed update may wait to be merged with the next ones, and
+# how much text may pile up before it is sent anyway
+STREAM_COALESCE_WINDOW = float(os.getenv('STREAM_COALESCE_WINDOW', '0.05'))
+STREAM_COALESCE_BYTES = int(os.getenv('STREAM_COALESCE_BYTES', '512'))
+
+TaskEvent = TaskStatusUpdateEvent | TaskArtifactUpdateEvent
+
+
+class EventCoalescer:
+    """Merges a task's intermediate WORKING updates before they are sent.
+
+    Pieces of the reply added with `add_text` are joined into one chunk of
+    artifact 0 and WORKING status updates added with `add_status` replace
+    each other, so a client gets one artifact event and at most one status
+    event per flush instead of one per piece. The first piece is sent right
+    away, so the first token is not held back.
+
+    Everything buffered is flushed `window` seconds after the first pending
+    update, as soon as `max_bytes` of text are waiting, or on `close()`,
+    which the caller must await before sending the task's final events.
+    With `max_bytes=0` every update is sent on its own.
+    """
+
+    def __init__(
+        self,
+        task_id: str,
+        publish: Callable[[TaskEvent], Awaitable[None]],
+        window: float = STREAM_COALESCE_WINDOW,
+        max_bytes: int = STREAM_COALESCE_BYTES,
+    ):
+        self.task_id = task_id
+        self.publish = publish
+        self.window = window
+        self.max_bytes = max_bytes
+        self.chunks = 0
+        self.received = 0
+        self.sent = 0
+        self._text: list[str] = []
+        self._bytes = 0
+        self._status: TaskStatus | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushes: set[asyncio.Task] = set()
+        # Flushes run one at a time, so events go out in order
+        self._lock = asyncio.Lock()
+
+    @property
+    def streamed(self) -> bool:
+        """Whether any chunk of the reply has been sent."""
+        return self.chunks > 0
+
+    async def add_text(self, text: str):
+        self.received += 1
+        self._text.append(text)
+        self._bytes += len(text)
+        if not self.streamed or self._bytes >= self.max_bytes:
+            await self.flush()
+        else:
+            self._schedule()
+
+    async def add_status(self, status: TaskStatus):
+        self.received += 1
+        self._status = status
+        if self.max_bytes <= 0:
+            await self.flush()
+        else:
+            self._schedule()
+
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        async with self._lock:
+            text, self._text, self._bytes = ''.join(self._text), [], 0
+            status, self._status = self._status, None
+            if text:
+                artifact = Artifact(
+                    parts=[TextPart(type='text', text=text)],
+                    index=0,
+                    append=self.streamed,
+                    lastChunk=False,
+                )
+                self.chunks += 1
+                self.sent += 1
+                await self.publish(
+                    TaskArtifactUpdateEvent(id=self.task_id, artifact=artifact)
+                )
+            if status is not None:
+                self.sent += 1
+                await self.publish(
+                    TaskStatusUpdateEvent(id=self.task_id, status=status, final=False)
+                )
+
+    async def close(self):
+        """Send everything still buffered."""
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes)
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.window, self._flush_later
+            )
+
+    def _flush_later(self):
+        self._timer = None
+        flush = asyncio.create_task(self.flush())
+        self._flushes.add(flush)
+        flush.add_done_callback(self._flushes.discard)
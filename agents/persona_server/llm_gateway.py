@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+# Model calls started per second (0 for no limit), how many may start at
+# once after a quiet spell, and how many may run at the same time
+LLM_RATE = float(os.getenv('LLM_RATE', '5'))
+LLM_BURST = int(os.getenv('LLM_BURST', '10'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+
+# Priority classes, most urgent first
+INTERACTIVE = 'interactive'
+AUTONOMOUS = 'autonomous'
+PRIORITIES = (INTERACTIVE, AUTONOMOUS)
+# Task metadata key a client sets to AUTONOMOUS for background traffic
+PRIORITY_KEY = 'priority'
+
+
+class LLMGateway:
+    """Admits the model calls of a process, most urgent first.
+
+    Every call takes a slot with `async with gateway.slot(priority)` and
+    keeps it until the model has answered. A slot needs a token from a
+    bucket refilled at `rate` per second and holding up to `burst`, and at
+    most `max_concurrency` slots are held at once, so the process stays
+    under the provider's rate limit however many personas or sessions it
+    serves. Waiting calls are admitted strictly by priority class, then in
+    arrival order: an INTERACTIVE call never waits behind AUTONOMOUS ones.
+    """
+
+    def __init__(
+        self,
+        rate: float = LLM_RATE,
+        burst: int = LLM_BURST,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._in_flight = 0
+        # (priority rank, arrival number, queued at, priority, future)
+        self._waiting: list[tuple[int, int, float, str, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self._granted = {priority: 0 for priority in PRIORITIES}
+        # Recent waits per class, in seconds
+        self._waits = {priority: deque(maxlen=1000) for priority in PRIORITIES}
+
+    @asynccontextmanager
+    async def slot(self, priority: str = INTERACTIVE) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: str = INTERACTIVE):
+        if priority not in PRIORITIES:
+            raise ValueError(f'Unknown priority {priority!r}, expected one of {PRIORITIES}')
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiting,
+            (PRIORITIES.index(priority), next(self._arrivals), time.monotonic(), priority, future),
+        )
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Admitted just as the caller gave up, hand the slot on
+                self.release()
+            raise
+
+    def release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def stats(self) -> dict:
+        self._refill()
+        queued = {priority: 0 for priority in PRIORITIES}
+        for _, _, _, priority, future in self._waiting:
+            if not future.done():
+                queued[priority] += 1
+        waits = {}
+        for priority, recent in self._waits.items():
+            ordered = sorted(recent)
+            waits[priority] = {
+                'mean_ms': round(1000 * sum(ordered) / len(ordered), 1) if ordered else 0.0,
+                'p95_ms': round(1000 * ordered[int(len(ordered) * 0.95) - 1], 1) if ordered else 0.0,
+            }
+        return {
+            'in_flight': self._in_flight,
+            'tokens': round(self._tokens, 2),
+            'queued': queued,
+            'granted': dict(self._granted),
+            'wait': waits,
+        }
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _dispatch(self):
+        self._refill()
+        while self._waiting and self._in_flight < self.max_concurrency:
+            _, _, queued_at, priority, future = self._waiting[0]
+            if future.done():
+                # The caller gave up waiting
+                heapq.heappop(self._waiting)
+                continue
+            if self.rate > 0 and self._tokens < 1:
+                self._wait_for_token()
+                return
+            heapq.heappop(self._waiting)
+            if self.rate > 0:
+                self._tokens -= 1
+            self._in_flight += 1
+            self._granted[priority] += 1
+            self._waits[priority].append(time.monotonic() - queued_at)
+            future.set_result(None)
+
+    def _wait_for_token(self):
+        if self._timer is None:
+            delay = (1 - self._tokens) / self.rate
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_token)
+
+    def _on_token(self):
+        self._timer = None
+        self._dispatch()
@@ -0,0 +1,140 @@
+import logging
+import os
+import uuid
+
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import httpx
+
+from common.types import (
+    PushNotificationConfig,
+    TaskArtifactUpdateEvent,
+    TaskStatusUpdateEvent,
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Header carrying the token the client put in its PushNotificationConfig
+TOKEN_HEADER = 'X-A2A-Notification-Token'
+# Comma-separated hosts (host or host:port) webhooks may point at; empty
+# allows any host that answers the validation challenge
+PUSH_ALLOWED_HOSTS = os.getenv('PUSH_ALLOWED_HOSTS', '')
+# Webhook URLs remembered as verified, so a client is challenged once
+VERIFIED_URLS_SIZE = 1024
+
+
+class PushNotificationSender:
+    """POSTs task updates to the webhooks clients registered with their tasks.
+
+    Notifications to the same client reuse one keep-alive connection. The
+    body is the JSON of the `TaskStatusUpdateEvent` or
+    `TaskArtifactUpdateEvent`, the same events a streaming client gets over
+    SSE. The config's token is sent in the `X-A2A-Notification-Token`
+    header. A failed delivery is retried `retries` times, then dropped.
+
+    A webhook is only accepted after `verify`: its host must be in
+    `allowed_hosts` when one is configured, and it must answer the A2A
+    validation challenge, a GET with a `validationToken` query parameter
+    that it echoes back, so the server cannot be pointed at arbitrary URLs.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10,
+        retries: int = 1,
+        allowed_hosts: str | list[str] = PUSH_ALLOWED_HOSTS,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        if isinstance(allowed_hosts, str):
+            allowed_hosts = allowed_hosts.split(',')
+        self.allowed_hosts = {
+            host.strip().lower() for host in allowed_hosts if host.strip()
+        }
+        self._verified: OrderedDict[str, None] = OrderedDict()
+        self._client: httpx.AsyncClient | None = None
+
+    def is_allowed(self, url: str) -> bool:
+        """Whether `url` is an http(s) URL on an allowed host."""
+        try:
+            parts = urlsplit(url)
+            hostname = parts.hostname
+            port = parts.port
+        except ValueError:
+            return False
+        if parts.scheme not in ('http', 'https') or not hostname:
+            return False
+        if not self.allowed_hosts:
+            return True
+        return (
+            hostname in self.allowed_hosts
+            or f'{hostname}:{port}' in self.allowed_hosts
+        )
+
+    async def verify(self, config: PushNotificationConfig) -> bool:
+        """Whether updates may be sent to the webhook in `config`."""
+        url = config.url
+        if not self.is_allowed(url):
+            logger.warning(f'Push notification URL {url} is not allowed')
+            return False
+        if url in self._verified:
+            self._verified.move_to_end(url)
+            return True
+
+        validation_token = uuid.uuid4().hex
+        try:
+            response = await self._http().get(
+                url, params={'validationToken': validation_token}
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f'Push notification URL {url} failed validation: {e}')
+            return False
+        if response.text != validation_token:
+            logger.warning(
+                f'Push notification URL {url} did not echo the validation token'
+            )
+            return False
+
+        self._verified[url] = None
+        if len(self._verified) > VERIFIED_URLS_SIZE:
+            self._verified.popitem(last=False)
+        return True
+
+    async def send(
+        self,
+        config: PushNotificationConfig,
+        event: TaskStatusUpdateEvent | TaskArtifactUpdateEvent,
+    ) -> bool:
+        headers = {'Content-Type': 'application/json'}
+        if config.token:
+            headers[TOKEN_HEADER] = config.token
+        body = event.model_dump_json(exclude_none=True)
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._http().post(
+                    config.url, content=body, headers=headers
+                )
+                response.raise_for_status()
+                return True
+            except httpx.HTTPError as e:
+                logger.warning(
+                    f'Push notification for task {event.id} to {config.url} '
+                    f'failed (attempt {attempt + 1}): {e}'
+                )
+        return False
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            # Redirects are not followed, a verified URL must not lead elsewhere
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, follow_redirects=False
+            )
+        return self._client
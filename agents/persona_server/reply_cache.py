@@ -0,0 +1,100 @@
+import hashlib
+import os
+import re
+import time
+
+from collections import OrderedDict
+from collections.abc import Iterable
+
+
+# Replies kept (0 turns the cache off), how long for, and how many of the
+# session's last turns a reply depends on
+REPLY_CACHE_SIZE = int(os.getenv('REPLY_CACHE_SIZE', '0'))
+REPLY_CACHE_TTL = float(os.getenv('REPLY_CACHE_TTL', '600'))
+REPLY_CACHE_CONTEXT_TURNS = int(os.getenv('REPLY_CACHE_CONTEXT_TURNS', '1'))
+# Task metadata key that makes a request skip the cache
+BYPASS_KEY = 'no_cache'
+
+
+def normalize(text: str) -> str:
+    """Case, runs of whitespace and trailing punctuation do not change a reply."""
+    return re.sub(r'\s+', ' ', text.casefold()).strip(' .!?')
+
+
+class ReplyCache:
+    """Recent model replies, so repeated openers are not generated again.
+
+    A reply is looked up by persona, normalized query and the last
+    `context_turns` turns of the session, so the same greeting to a new
+    session is a hit while a question in the middle of a conversation only
+    hits after the same exchange. Up to `max_entries` replies are kept, in
+    least recently used order, each for `ttl` seconds.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = REPLY_CACHE_SIZE,
+        ttl: float = REPLY_CACHE_TTL,
+        context_turns: int = REPLY_CACHE_CONTEXT_TURNS,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.context_turns = context_turns
+        # key -> (reply, expiry time)
+        self._replies: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def key(self, persona: str, query: str, history: Iterable[tuple[str, str]]) -> str:
+        context = list(history)[-2 * self.context_turns:] if self.context_turns else []
+        digest = hashlib.sha256(persona.encode())
+        for role, text in context:
+            digest.update(f'\0{role}\0{normalize(text)}'.encode())
+        digest.update(f'\0query\0{normalize(query)}'.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        entry = self._replies.get(key)
+        if entry is not None and entry[1] <= time.monotonic():
+            del self._replies[key]
+            self.expired += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._replies.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, reply: str):
+        if not reply:
+            return
+        self._replies[key] = (reply, time.monotonic() + self.ttl)
+        self._replies.move_to_end(key)
+        while len(self._replies) > self.max_entries:
+            self._replies.popitem(last=False)
+            self.evicted += 1
+
+    def bypass(self):
+        """Count a request that skipped the cache."""
+        self.bypassed += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._replies),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'bypassed': self.bypassed,
+            'expired': self.expired,
+            'evicted': self.evicted,
+        }
+
+
+def default_reply_cache() -> ReplyCache | None:
+    """The cache configured in the environment, or None when it is off."""
+    return ReplyCache() if REPLY_CACHE_SIZE > 0 else None
@@ -0,0 +1,81 @@
+import asyncio
+import os
+
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+
+# Sessions kept in memory, and the turns of history each one remembers
+SESSION_POOL_SIZE = int(os.getenv('SESSION_POOL_SIZE', '1000'))
+SESSION_MAX_TURNS = int(os.getenv('SESSION_MAX_TURNS', '10'))
+
+
+class SessionContext:
+    """The conversation so far in one session, up to `max_turns` turns.
+
+    `history` holds `(role, text)` pairs, role being 'user' or 'model',
+    oldest first. Requests for the same session take `lock`, so the session's
+    turns are answered one at a time and in order.
+    """
+
+    def __init__(self, max_turns: int):
+        self.history: deque[tuple[str, str]] = deque(maxlen=2 * max_turns)
+        self.lock = asyncio.Lock()
+
+    def add_turn(self, query: str, reply: str):
+        self.history.append(('user', query))
+        self.history.append(('model', reply))
+
+
+class SessionPool:
+    """Per-session conversation state, keyed by the task's `sessionId`.
+
+    Different sessions share nothing, so their requests run concurrently;
+    requests within a session are serialized by its lock. At most
+    `max_sessions` sessions are kept: the least recently used idle session
+    is dropped when a new one starts.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_POOL_SIZE,
+        max_turns: int = SESSION_MAX_TURNS,
+    ):
+        self.max_sessions = max_sessions
+        self.max_turns = max_turns
+        self._sessions: OrderedDict[str, SessionContext] = OrderedDict()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> SessionContext:
+        context = self._sessions.get(session_id)
+        if context is not None:
+            self._sessions.move_to_end(session_id)
+            return context
+        context = SessionContext(self.max_turns)
+        self._sessions[session_id] = context
+        self._evict()
+        return context
+
+    @asynccontextmanager
+    async def session(self, session_id: str) -> AsyncIterator[SessionContext]:
+        """The session's context, held for one request."""
+        context = self.get(session_id)
+        async with context.lock:
+            yield context
+
+    def _evict(self):
+        if len(self._sessions) <= self.max_sessions:
+            return
+        # The newest session is the one being started
+        for session_id in list(self._sessions)[:-1]:
+            if len(self._sessions) <= self.max_sessions:
+                break
+            # A session answering a request keeps its history
+            if self._sessions[session_id].lock.locked():
+                continue
+            del self._sessions[session_id]
+            self.evicted += 1
@@ -0,0 +1,396 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping
+
+from common.types import Task
+
+from .task_store import ACTIVE_STATES, TERMINAL_STATES
+
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    session_id TEXT,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    task TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_session ON tasks (session_id, updated_at);
+CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (state, updated_at);
+CREATE TABLE IF NOT EXISTS task_history (
+    task_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    PRIMARY KEY (task_id, seq)
+) WITHOUT ROWID;
+"""
+
+
+class SqliteTaskStore(MutableMapping):
+    """Durable task store for `InMemoryTaskManager.tasks`, backed by SQLite in WAL mode.
+
+    Tasks survive a restart, so clients can continue their sessions instead
+    of starting over. A bounded cache of up to `max_cached` tasks stays in
+    memory; the task manager changes those in place and calls
+    `touch(task_id)` afterwards, like with `BoundedTaskStore`.
+
+    Writes are batched. `touch` serializes the task on the calling thread
+    and queues it. A background thread writes the queue in one transaction
+    every `flush_interval` seconds, or as soon as `batch_size` tasks are
+    waiting. A task updated several times in one batch is written once.
+    History is append-only in its own table, so an update writes only the
+    messages added since the last write, not the whole history.
+
+    The ids of all stored tasks are indexed in memory, so membership,
+    `len` and iteration never touch the database. Tasks with writes still
+    queued are never evicted from the cache, so reads need not flush. A
+    task that is not cached is read from disk; from the event loop use
+    `prefetch` and `fetch_task`, which do that read in a worker thread.
+
+    `get_task` truncates to `historyLength` in SQL at read time. Every
+    `compact_interval` seconds, terminal tasks older than `retention`
+    seconds are deleted and the WAL is checkpointed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_cached: int = 1000,
+        flush_interval: float = 0.05,
+        batch_size: int = 256,
+        retention: float = 7 * 24 * 3600,
+        compact_interval: float = 3600,
+    ):
+        self.path = path
+        self.max_cached = max_cached
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.retention = retention
+        self.compact_interval = compact_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._db_lock = threading.Lock()
+        self._ids: set[str] = {
+            row[0] for row in self._conn.execute('SELECT id FROM tasks')
+        }
+        self._cache: OrderedDict[str, Task] = OrderedDict()
+        # History messages already queued or written, per cached task
+        self._history_counts: dict[str, int] = {}
+        # Compaction drops tasks from the cache on the writer thread
+        self._cache_lock = threading.RLock()
+        # Writes waiting for the next batch
+        self._pending_lock = threading.Lock()
+        self._pending: dict[str, tuple] = {}
+        self._pending_history: list[tuple[str, int, str]] = []
+        self._rewrite_history: set[str] = set()
+        self._deleted: set[str] = set()
+        self._wakeup = threading.Event()
+        self._running = True
+        self._writes = 0
+        self._batches = 0
+        self._thread = threading.Thread(target=self._run, name='task-store', daemon=True)
+        self._thread.start()
+
+    def __getitem__(self, task_id: str) -> Task:
+        with self._cache_lock:
+            task = self._cache.get(task_id)
+            if task is not None:
+                self._cache.move_to_end(task_id)
+                return task
+        if task_id not in self._ids:
+            raise KeyError(task_id)
+        # Blocks on SQLite; the task manager prefetches tasks before using them
+        task = self._load(task_id, None)
+        if task is None:
+            raise KeyError(task_id)
+        self._cache_loaded(task)
+        return task
+
+    def __setitem__(self, task_id: str, task: Task):
+        with self._cache_lock:
+            self._cache[task_id] = task
+            self._history_counts.pop(task_id, None)
+        self._ids.add(task_id)
+        with self._pending_lock:
+            self._deleted.discard(task_id)
+            self._rewrite_history.add(task_id)
+            self._pending_history = [
+                entry for entry in self._pending_history if entry[0] != task_id
+            ]
+        self.touch(task_id)
+
+    def __delitem__(self, task_id: str):
+        if task_id not in self:
+            raise KeyError(task_id)
+        with self._cache_lock:
+            self._cache.pop(task_id, None)
+            self._history_counts.pop(task_id, None)
+        self._ids.discard(task_id)
+        with self._pending_lock:
+            self._pending.pop(task_id, None)
+            self._rewrite_history.discard(task_id)
+            self._pending_history = [
+                entry for entry in self._pending_history if entry[0] != task_id
+            ]
+            self._deleted.add(task_id)
+        self._wakeup.set()
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._cache or task_id in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._ids))
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    async def prefetch(self, task_id: str):
+        """Bring a stored task into the cache without blocking the event loop."""
+        if task_id in self._cache or task_id not in self._ids:
+            return
+        task = await asyncio.to_thread(self._load, task_id, None)
+        # It may have been replaced or deleted while we were reading
+        if task is not None and task_id not in self._cache and task_id in self._ids:
+            self._cache_loaded(task)
+
+    def touch(self, task_id: str):
+        """Queue the current state of a cached task for the next batch."""
+        with self._cache_lock:
+            task = self._cache.get(task_id)
+            if task is None:
+                return
+            self._cache.move_to_end(task_id)
+            written = self._history_counts.get(task_id, 0)
+        history = task.history or []
+        rewrite = len(history) < written
+        start = 0 if rewrite else written
+        messages = [
+            (task_id, seq, history[seq].model_dump_json())
+            for seq in range(start, len(history))
+        ]
+        row = (
+            task_id,
+            task.sessionId,
+            task.status.state.value,
+            time.time(),
+            task.model_dump_json(exclude={'history'}),
+        )
+        with self._pending_lock:
+            self._pending[task_id] = row
+            if rewrite:
+                self._rewrite_history.add(task_id)
+                self._pending_history = [
+                    entry for entry in self._pending_history if entry[0] != task_id
+                ]
+            self._pending_history.extend(messages)
+            waiting = len(self._pending)
+        with self._cache_lock:
+            if task_id in self._cache:
+                self._history_counts[task_id] = len(history)
+        if waiting >= self.batch_size:
+            self._wakeup.set()
+        self._evict()
+
+    def get_task(self, task_id: str, history_length: int | None = None) -> Task | None:
+        """A copy of the task with only its last `history_length` messages."""
+        task = self._cache.get(task_id)
+        if task is None:
+            if task_id not in self._ids:
+                return None
+            return self._load(task_id, history_length or 0)
+        copy = task.model_copy()
+        copy.history = task.history[-history_length:] if history_length else []
+        return copy
+
+    async def fetch_task(self, task_id: str, history_length: int | None = None) -> Task | None:
+        """`get_task`, reading a task that is not cached in a worker thread."""
+        if task_id in self._cache or task_id not in self._ids:
+            return self.get_task(task_id, history_length)
+        return await asyncio.to_thread(self._load, task_id, history_length or 0)
+
+    def tasks_for_session(self, session_id: str, history_length: int | None = None) -> list[Task]:
+        """The tasks of a session, most recently updated first."""
+        # Tasks whose first write is still queued are not on disk yet
+        with self._pending_lock:
+            updated = {
+                row[0]: row[3] for row in self._pending.values() if row[1] == session_id
+            }
+        with self._db_lock:
+            rows = self._conn.execute(
+                'SELECT id, updated_at FROM tasks WHERE session_id = ?',
+                (session_id,),
+            ).fetchall()
+        for task_id, updated_at in rows:
+            updated.setdefault(task_id, updated_at)
+        task_ids = sorted(updated, key=updated.get, reverse=True)
+        tasks = (self.get_task(task_id, history_length) for task_id in task_ids)
+        return [task for task in tasks if task is not None]
+
+    def flush(self):
+        """Write everything queued so far."""
+        # Held across taking the batch and writing it, so batches land in order
+        with self._db_lock:
+            with self._pending_lock:
+                pending = list(self._pending.values())
+                history = self._pending_history
+                rewrite = self._rewrite_history
+                deleted = self._deleted
+                self._pending = {}
+                self._pending_history = []
+                self._rewrite_history = set()
+                self._deleted = set()
+            if not (pending or history or rewrite or deleted):
+                return
+            with self._conn:
+                self._conn.execute('BEGIN')
+                if deleted:
+                    ids = [(task_id,) for task_id in deleted]
+                    self._conn.executemany('DELETE FROM tasks WHERE id = ?', ids)
+                    self._conn.executemany('DELETE FROM task_history WHERE task_id = ?', ids)
+                if rewrite:
+                    self._conn.executemany(
+                        'DELETE FROM task_history WHERE task_id = ?',
+                        [(task_id,) for task_id in rewrite],
+                    )
+                self._conn.executemany(
+                    'INSERT INTO tasks (id, session_id, state, updated_at, task) '
+                    'VALUES (?, ?, ?, ?, ?) '
+                    'ON CONFLICT (id) DO UPDATE SET '
+                    'session_id = excluded.session_id, state = excluded.state, '
+                    'updated_at = excluded.updated_at, task = excluded.task',
+                    pending,
+                )
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO task_history (task_id, seq, message) '
+                    'VALUES (?, ?, ?)',
+                    history,
+                )
+            self._writes += len(pending)
+            self._batches += 1
+
+    def compact(self):
+        """Delete old terminal tasks and checkpoint the WAL."""
+        self.flush()
+        cutoff = time.time() - self.retention
+        states = [state.value for state in TERMINAL_STATES]
+        placeholders = ', '.join('?' * len(states))
+        with self._db_lock:
+            with self._conn:
+                self._conn.execute('BEGIN')
+                with self._pending_lock:
+                    # Updated since the flush above, so no longer old
+                    queued = set(self._pending)
+                removed = [
+                    row[0]
+                    for row in self._conn.execute(
+                        f'SELECT id FROM tasks WHERE state IN ({placeholders}) AND updated_at < ?',
+                        (*states, cutoff),
+                    )
+                    if row[0] not in queued
+                ]
+                ids = [(task_id,) for task_id in removed]
+                self._conn.executemany('DELETE FROM task_history WHERE task_id = ?', ids)
+                self._conn.executemany('DELETE FROM tasks WHERE id = ?', ids)
+            self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self._ids.difference_update(removed)
+        with self._cache_lock:
+            for task_id in removed:
+                self._cache.pop(task_id, None)
+                self._history_counts.pop(task_id, None)
+        if removed:
+            logger.info(f'Compacted task store, removed {len(removed)} old tasks')
+
+    def stats(self) -> dict:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {
+            'cached': len(self._cache),
+            'pending': pending,
+            'writes': self._writes,
+            'batches': self._batches,
+            'db_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+        }
+
+    def close(self):
+        """Write everything queued and close the database."""
+        if not self._running:
+            return
+        self._running = False
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+    def _run(self):
+        last_compaction = time.monotonic()
+        while self._running:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                if time.monotonic() - last_compaction >= self.compact_interval:
+                    self.compact()
+                    last_compaction = time.monotonic()
+            except sqlite3.Error as e:
+                logger.error(f'Error writing task store: {e}')
+
+    def _load(self, task_id: str, history_length: int | None) -> Task | None:
+        """Read a task from disk; `history_length` None means the full history.
+
+        Tasks with queued writes stay cached, so what is on disk is current.
+        """
+        with self._db_lock:
+            row = self._conn.execute('SELECT task FROM tasks WHERE id = ?', (task_id,)).fetchone()
+            if row is None:
+                return None
+            if history_length is None:
+                messages = self._conn.execute(
+                    'SELECT message FROM task_history WHERE task_id = ? ORDER BY seq',
+                    (task_id,),
+                ).fetchall()
+            elif history_length > 0:
+                messages = self._conn.execute(
+                    'SELECT message FROM task_history WHERE task_id = ? '
+                    'ORDER BY seq DESC LIMIT ?',
+                    (task_id, history_length),
+                ).fetchall()[::-1]
+            else:
+                messages = []
+        data = json.loads(row[0])
+        data['history'] = [json.loads(message[0]) for message in messages]
+        return Task(**data)
+
+    def _cache_loaded(self, task: Task):
+        with self._cache_lock:
+            self._cache[task.id] = task
+            self._history_counts[task.id] = len(task.history or [])
+        self._evict()
+
+    def _evict(self):
+        if len(self._cache) <= self.max_cached:
+            return
+        with self._pending_lock:
+            queued = set(self._pending)
+        with self._cache_lock:
+            for task_id in list(self._cache):
+                if len(self._cache) <= self.max_cached:
+                    break
+                if self._cache[task_id].status.state in ACTIVE_STATES:
+                    continue
+                # Its latest state is not on disk yet
+                if task_id in queued:
+                    continue
+                del self._cache[task_id]
+                self._history_counts.pop(task_id, None)
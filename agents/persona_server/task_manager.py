@@ -0,0 +1,515 @@
+import asyncio
+import functools
+import logging
+import traceback
+
+from collections import deque
+from collections.abc import AsyncIterable
+from typing import Any, Protocol
+
+from common.server import utils
+from common.server.task_manager import InMemoryTaskManager
+from common.types import (
+    Artifact,
+    GetTaskRequest,
+    GetTaskResponse,
+    InternalError,
+    InvalidParamsError,
+    JSONRPCResponse,
+    Message,
+    SendTaskRequest,
+    SendTaskResponse,
+    SendTaskStreamingRequest,
+    SendTaskStreamingResponse,
+    SetTaskPushNotificationRequest,
+    SetTaskPushNotificationResponse,
+    Task,
+    TaskArtifactUpdateEvent,
+    TaskNotFoundError,
+    TaskQueryParams,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+
+from .coalescing import (
+    STREAM_COALESCE_BYTES,
+    STREAM_COALESCE_WINDOW,
+    EventCoalescer,
+)
+from .llm_gateway import INTERACTIVE, PRIORITIES, PRIORITY_KEY
+from .push_notifications import PushNotificationSender
+from .reply_cache import BYPASS_KEY
+from .sqlite_task_store import SqliteTaskStore
+from .task_store import BoundedTaskStore
+
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationalAgent(Protocol):
+    """What the task manager needs from an agent, e.g. `TomAgent` or `PersonaAgent`."""
+
+    SUPPORTED_CONTENT_TYPES: list[str]
+
+    def stream(
+        self, query: str, sessionId: str, use_cache: bool = True, priority: str = ...
+    ) -> AsyncIterable[dict[str, Any]]: ...
+
+    async def invoke(
+        self, query: str, sessionId: str, use_cache: bool = True, priority: str = ...
+    ) -> dict[str, Any]: ...
+
+
+class AgentTaskManager(InMemoryTaskManager):
+    """Task manager for the conversational persona agents."""
+
+    def __init__(
+        self,
+        agent: ConversationalAgent,
+        task_store: BoundedTaskStore | SqliteTaskStore | None = None,
+        coalesce_window: float = STREAM_COALESCE_WINDOW,
+        coalesce_bytes: int = STREAM_COALESCE_BYTES,
+        notification_sender: PushNotificationSender | None = None,
+    ):
+        super().__init__()
+        self.agent = agent
+        # Evicts idle and finished tasks instead of keeping every task forever
+        self.tasks = task_store if task_store is not None else BoundedTaskStore()
+        self.notification_sender = notification_sender or PushNotificationSender()
+        # Merging of intermediate streamed updates, see EventCoalescer
+        self.coalesce_window = coalesce_window
+        self.coalesce_bytes = coalesce_bytes
+        # Tasks answering through push notifications and tasks sending the
+        # notifications, kept until they finish
+        self._background_tasks: set[asyncio.Task] = set()
+        # Push notifications waiting to be sent, per task; a task has an
+        # entry while its notifications are being sent
+        self._push_queues: dict[str, deque] = {}
+
+    # -------------------------------------------------------------
+    # Public API methods
+    # -------------------------------------------------------------
+
+    async def on_send_task(self, request: SendTaskRequest) -> SendTaskResponse:
+        """Handle synchronous task requests.
+
+        This method processes one-time task requests and returns a complete response.
+        Unlike streaming tasks, this waits for the full agent response before returning.
+        """
+        validation_error = self._validate_request(request)
+        if validation_error:
+            return SendTaskResponse(id=request.id, error=validation_error.error)
+
+        if request.params.pushNotification:
+            return await self._start_push_task(request)
+
+        await self.upsert_task(request.params)
+        # Update task store to WORKING state (return value not used)
+        await self.update_store(
+            request.params.id, TaskStatus(state=TaskState.WORKING), None
+        )
+
+        task_send_params: TaskSendParams = request.params
+        query = self._extract_user_query(task_send_params)
+
+        try:
+            agent_response = await self.agent.invoke(
+                query,
+                task_send_params.sessionId,
+                use_cache=self._use_cache(task_send_params),
+                priority=self._priority(task_send_params),
+            )
+            return await self._handle_send_task(request, agent_response)
+        except Exception as e:
+            logger.error(f'Error invoking agent: {e}')
+            return SendTaskResponse(
+                id=request.id,
+                error=InternalError(
+                    message=f'Error during on_send_task: {e!s}'
+                ),
+            )
+
+    async def on_send_task_subscribe(
+        self, request: SendTaskStreamingRequest
+    ) -> AsyncIterable[SendTaskStreamingResponse] | JSONRPCResponse:
+        """Handle streaming task requests with SSE subscription.
+
+        This method initiates a streaming task and returns incremental updates
+        to the client as they become available. It uses Server-Sent Events (SSE)
+        to push updates to the client as the agent generates them.
+        """
+        try:
+            error = self._validate_request(request)
+            if error:
+                return error
+
+            await self.upsert_task(request.params)
+
+            task_send_params: TaskSendParams = request.params
+            sse_event_queue = await self.setup_sse_consumer(
+                task_send_params.id, False
+            )
+
+            asyncio.create_task(self._handle_send_task_streaming(request))
+
+            return self.dequeue_events_for_sse(
+                request.id, task_send_params.id, sse_event_queue
+            )
+        except Exception as e:
+            logger.error(f'Error in SSE stream: {e}')
+            print(traceback.format_exc())
+            return JSONRPCResponse(
+                id=request.id,
+                error=InternalError(
+                    message='An error occurred while streaming the response'
+                ),
+            )
+
+    async def _start_push_task(self, request: SendTaskRequest) -> SendTaskResponse:
+        """Accept a task whose updates go to the client's webhook.
+
+        Returns right away with the task in WORKING state; the agent's response
+        is then produced as for a streaming task, and every update is POSTed
+        to the client instead of being held on an open SSE connection.
+        """
+        task_send_params: TaskSendParams = request.params
+        if not await self.notification_sender.verify(task_send_params.pushNotification):
+            return SendTaskResponse(
+                id=request.id,
+                error=InvalidParamsError(message='Push notification URL is invalid'),
+            )
+
+        await self.upsert_task(task_send_params)
+        await self.set_push_notification_info(
+            task_send_params.id, task_send_params.pushNotification
+        )
+        task = await self.update_store(
+            task_send_params.id, TaskStatus(state=TaskState.WORKING), None
+        )
+
+        background_task = asyncio.create_task(
+            self._handle_send_task_streaming(request)
+        )
+        self._background_tasks.add(background_task)
+        background_task.add_done_callback(self._background_tasks.discard)
+
+        task_result = self.append_task_history(task, task_send_params.historyLength)
+        return SendTaskResponse(id=request.id, result=task_result)
+
+    async def on_set_task_push_notification(
+        self, request: SetTaskPushNotificationRequest
+    ) -> SetTaskPushNotificationResponse:
+        """Register a webhook for a task, once it passes verification."""
+        config = request.params.pushNotificationConfig
+        if not await self.notification_sender.verify(config):
+            return SetTaskPushNotificationResponse(
+                id=request.id,
+                error=InvalidParamsError(message='Push notification URL is invalid'),
+            )
+        return await super().on_set_task_push_notification(request)
+
+    # -------------------------------------------------------------
+    # Task store
+    # -------------------------------------------------------------
+
+    async def on_get_task(self, request: GetTaskRequest) -> GetTaskResponse:
+        # The store truncates the history itself instead of copying all of it,
+        # and reads a task that is not in memory off the event loop
+        task_query_params: TaskQueryParams = request.params
+        task_result = await self.tasks.fetch_task(
+            task_query_params.id, task_query_params.historyLength
+        )
+        if task_result is None:
+            return GetTaskResponse(id=request.id, error=TaskNotFoundError())
+        return GetTaskResponse(id=request.id, result=task_result)
+
+    async def upsert_task(self, task_send_params: TaskSendParams) -> Task:
+        # Load a stored task first, so the base class finds it in memory
+        await self.tasks.prefetch(task_send_params.id)
+        task = await super().upsert_task(task_send_params)
+        async with self.lock:
+            self.tasks.touch(task_send_params.id)
+        return task
+
+    async def update_store(
+        self, task_id: str, status: TaskStatus, artifacts: list[Artifact] | None
+    ) -> Task:
+        await self.tasks.prefetch(task_id)
+        task = await super().update_store(task_id, status, artifacts)
+        async with self.lock:
+            self.tasks.touch(task_id)
+        return task
+
+    # -------------------------------------------------------------
+    # Agent response handlers
+    # -------------------------------------------------------------
+
+    async def _handle_send_task(
+        self, request: SendTaskRequest, agent_response: dict
+    ) -> SendTaskResponse:
+        """Handle the 'tasks/send' JSON-RPC method by processing agent response.
+
+        This method processes the synchronous (one-time) response from the agent,
+        transforms it into the appropriate task status and artifacts, and
+        returns a complete SendTaskResponse.
+        """
+        task_send_params: TaskSendParams = request.params
+        task_id = task_send_params.id
+        history_length = task_send_params.historyLength
+        task_status = None
+
+        parts = [TextPart(type='text', text=agent_response['content'])]
+        artifact = None
+        if agent_response['require_user_input']:
+            task_status = TaskStatus(
+                state=TaskState.INPUT_REQUIRED,
+                message=Message(role='agent', parts=parts),
+            )
+        else:
+            task_status = TaskStatus(state=TaskState.COMPLETED)
+            artifact = Artifact(parts=parts)
+        # Update task store and get result for response
+        updated_task = await self.update_store(
+            task_id, task_status, None if artifact is None else [artifact]
+        )
+        # Use the updated task to create a response with correct history
+        task_result = self.append_task_history(updated_task, history_length)
+        return SendTaskResponse(id=request.id, result=task_result)
+
+    async def _handle_send_task_streaming(
+        self, request: SendTaskStreamingRequest
+    ):
+        """Handle the 'tasks/sendSubscribe' JSON-RPC method for streaming responses.
+
+        This method processes streaming responses from the agent incrementally,
+        converting each chunk into appropriate SSE events for real-time client updates.
+        It handles different agent response states (working, input required, completed)
+        and generates both status update and artifact events.
+
+        Pieces of the reply (items with `is_delta`) are sent as chunks of
+        artifact 0, and intermediate WORKING updates are merged by an
+        `EventCoalescer`. The store is only written on state changes: when
+        the task starts WORKING and when it ends. The whole artifact is
+        stored at the end, and the chunks are closed with `lastChunk`.
+        """
+        task_send_params: TaskSendParams = request.params
+        task_id = task_send_params.id
+        query = self._extract_user_query(task_send_params)
+        coalescer = EventCoalescer(
+            task_id,
+            functools.partial(self._publish, task_id),
+            window=self.coalesce_window,
+            max_bytes=self.coalesce_bytes,
+        )
+        working = False
+
+        try:
+            async for item in self.agent.stream(
+                query,
+                task_send_params.sessionId,
+                use_cache=self._use_cache(task_send_params),
+                priority=self._priority(task_send_params),
+            ):
+                is_task_complete = item['is_task_complete']
+                require_user_input = item['require_user_input']
+                content = item['content']
+                parts = [TextPart(type='text', text=content)]
+
+                if not is_task_complete and not require_user_input:
+                    # Processing message - working state
+                    message = None
+                    if not item.get('is_delta'):
+                        message = Message(role='agent', parts=parts)
+                    task_status = TaskStatus(state=TaskState.WORKING, message=message)
+                    if not working:
+                        working = True
+                        logger.info(f'Task {task_id} is WORKING')
+                        await self.update_store(task_id, task_status, None)
+                        await self._publish(
+                            task_id,
+                            TaskStatusUpdateEvent(
+                                id=task_id, status=task_status, final=False
+                            ),
+                        )
+                        if message is not None:
+                            continue
+                    elif message is not None:
+                        await coalescer.add_status(task_status)
+                        continue
+                    await coalescer.add_text(content)
+                    continue
+
+                # Everything buffered goes out before the final events
+                await coalescer.close()
+                artifact = None
+                message = None
+                if require_user_input:
+                    # Requires user input - input required state
+                    task_state = TaskState.INPUT_REQUIRED
+                    message = Message(role='agent', parts=parts)
+                    logger.info('Sending INPUT_REQUIRED status update (final)')
+                else:
+                    # Task completed - completed state with artifact
+                    task_state = TaskState.COMPLETED
+                    artifact = Artifact(parts=parts, index=0, append=False)
+                    logger.info(
+                        'Sending COMPLETED status with artifact (final)'
+                    )
+
+                # Update task store (return value not used)
+                task_status = TaskStatus(state=task_state, message=message)
+                await self.update_store(
+                    task_id,
+                    task_status,
+                    None if artifact is None else [artifact],
+                )
+
+                # First send artifact if we have one
+                if artifact:
+                    if coalescer.streamed:
+                        # The client has the text already, only close the chunks
+                        artifact = Artifact(
+                            parts=[], index=0, append=True, lastChunk=True
+                        )
+                    await self._publish(
+                        task_id,
+                        TaskArtifactUpdateEvent(id=task_id, artifact=artifact),
+                    )
+
+                # Then send status update
+                logger.info(
+                    f'Sending status update for task {task_id}, state={task_state}, '
+                    f'final=True, updates={coalescer.received}, events={coalescer.sent}'
+                )
+                await self._publish(
+                    task_id,
+                    TaskStatusUpdateEvent(id=task_id, status=task_status, final=True),
+                )
+                break
+
+        except Exception as e:
+            logger.error(f'An error occurred while streaming the response: {e}')
+            logger.error(traceback.format_exc())
+            await self.enqueue_events_for_sse(
+                task_id,
+                InternalError(
+                    message=f'An error occurred while streaming the response: {e}'
+                ),
+            )
+            # Push clients get a final FAILED update instead
+            if await self.has_push_notification_info(task_id):
+                await self._publish(
+                    task_id,
+                    TaskStatusUpdateEvent(
+                        id=task_id,
+                        status=TaskStatus(state=TaskState.FAILED),
+                        final=True,
+                    ),
+                )
+
+    async def _publish(
+        self,
+        task_id: str,
+        event: TaskStatusUpdateEvent | TaskArtifactUpdateEvent,
+    ):
+        """Deliver a task update to SSE subscribers and to the task's webhook, if any.
+
+        Webhook calls are queued and made in order by a background task, so
+        a slow webhook does not hold up the stream.
+        """
+        await self.enqueue_events_for_sse(task_id, event)
+        if not await self.has_push_notification_info(task_id):
+            return
+        config = await self.get_push_notification_info(task_id)
+        if getattr(event, 'final', False):
+            async with self.lock:
+                self.push_notification_infos.pop(task_id, None)
+        queue = self._push_queues.get(task_id)
+        if queue is not None:
+            queue.append((config, event))
+            return
+        self._push_queues[task_id] = deque([(config, event)])
+        sender = asyncio.create_task(self._send_push_notifications(task_id))
+        self._background_tasks.add(sender)
+        sender.add_done_callback(self._background_tasks.discard)
+
+    async def _send_push_notifications(self, task_id: str):
+        queue = self._push_queues[task_id]
+        try:
+            while queue:
+                config, event = queue.popleft()
+                try:
+                    delivered = await self.notification_sender.send(config, event)
+                except Exception:
+                    logger.exception(f'Error sending push notification for task {task_id}')
+                    delivered = False
+                if not delivered:
+                    logger.error(
+                        f'Dropped {type(event).__name__} for task {task_id}, '
+                        f'webhook {config.url} could not be reached'
+                    )
+        finally:
+            del self._push_queues[task_id]
+
+    # -------------------------------------------------------------
+    # Utility methods
+    # -------------------------------------------------------------
+
+    def _validate_request(
+        self, request: SendTaskRequest | SendTaskStreamingRequest
+    ) -> JSONRPCResponse | None:
+        """Validate task request parameters for compatibility with agent capabilities.
+
+        Ensures that the client's requested output modalities are compatible with
+        what the agent can provide.
+
+        Returns:
+            JSONRPCResponse with an error if validation fails, None otherwise.
+        """
+        task_send_params: TaskSendParams = request.params
+        if not utils.are_modalities_compatible(
+            task_send_params.acceptedOutputModes,
+            self.agent.SUPPORTED_CONTENT_TYPES,
+        ):
+            logger.warning(
+                'Unsupported output mode. Received %s, Support %s',
+                task_send_params.acceptedOutputModes,
+                self.agent.SUPPORTED_CONTENT_TYPES,
+            )
+            return utils.new_incompatible_types_error(request.id)
+        return None
+
+    def _use_cache(self, task_send_params: TaskSendParams) -> bool:
+        """Whether the agent may answer from its reply cache.
+
+        A client asks for a fresh reply with `no_cache` in the task metadata.
+        """
+        return not (task_send_params.metadata or {}).get(BYPASS_KEY)
+
+    def _priority(self, task_send_params: TaskSendParams) -> str:
+        """The LLM gateway priority class of the task, interactive unless it says otherwise."""
+        priority = (task_send_params.metadata or {}).get(PRIORITY_KEY)
+        return priority if priority in PRIORITIES else INTERACTIVE
+
+    def _extract_user_query(self, task_send_params: TaskSendParams) -> str:
+        """Extract the user's text query from the task parameters.
+
+        Extracts and returns the text content from the first part of the user's message.
+        Currently only supports text parts.
+
+        Args:
+            task_send_params: The parameters of the task containing the user's message.
+
+        Returns:
+            str: The extracted text query.
+
+        Raises:
+            ValueError: If the message part is not a TextPart.
+        """
+        part = task_send_params.message.parts[0]
+        if not isinstance(part, TextPart):
+            raise ValueError('Only text parts are supported')
+        return part.text
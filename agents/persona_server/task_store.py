@@ -0,0 +1,254 @@
+import dbm
+import logging
+import os
+import time
+
+from collections import OrderedDict
+from collections.abc import Iterator, MutableMapping
+
+from common.types import Task, TaskState
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+logger = logging.getLogger(__name__)
+
+# Store settings, overridable from the environment
+TASK_STORE_MAX_TASKS = int(os.getenv('TASK_STORE_MAX_TASKS', '1000'))
+TASK_STORE_MAX_BYTES = int(os.getenv('TASK_STORE_MAX_BYTES', str(64 * 1024 * 1024)))
+TASK_STORE_TTL = float(os.getenv('TASK_STORE_TTL', '3600'))
+TASK_STORE_SPILL_PATH = os.getenv('TASK_STORE_SPILL_PATH') or None
+# 'memory' (BoundedTaskStore) or 'sqlite' (SqliteTaskStore at TASK_STORE_PATH)
+TASK_STORE_KIND = os.getenv('TASK_STORE', 'memory')
+TASK_STORE_PATH = os.getenv('TASK_STORE_PATH', 'tasks.db')
+
+TERMINAL_STATES = frozenset({TaskState.COMPLETED, TaskState.CANCELED, TaskState.FAILED})
+# Tasks in these states are being worked on and are never evicted
+ACTIVE_STATES = frozenset({TaskState.SUBMITTED, TaskState.WORKING})
+
+
+class BoundedTaskStore(MutableMapping):
+    """Task store for `InMemoryTaskManager.tasks` that does not grow without bound.
+
+    Tasks are kept in least recently used order, with their approximate
+    size (the length of their JSON). The size is kept up to date
+    incrementally: a task's history only grows, so `touch` measures just
+    the messages added since the last call, plus the task without its
+    history. Whenever the store holds more than
+    `max_tasks` tasks or `max_bytes` bytes, the least recently used tasks
+    that are not being worked on are evicted. Terminal tasks are dropped
+    once they have been finished for `ttl` seconds.
+
+    With a `spill_path`, evicted tasks are written to a dbm file instead of
+    being dropped. A conversation can continue a completed task, so the
+    task is brought back into memory the next time it is looked up. Spilled
+    tasks, including ones still waiting for input, are removed from the
+    file once they have not been used for `ttl` seconds. The ids of spilled
+    tasks are kept in memory, so lookups and `len` never scan the file.
+
+    The task manager changes tasks in place, so it must call `touch(task_id)`
+    after each change. That marks the task as recently used and refreshes
+    its size and TTL.
+    """
+
+    def __init__(
+        self,
+        max_tasks: int = TASK_STORE_MAX_TASKS,
+        max_bytes: int = TASK_STORE_MAX_BYTES,
+        ttl: float = TASK_STORE_TTL,
+        spill_path: str | None = TASK_STORE_SPILL_PATH,
+    ):
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._tasks: OrderedDict[str, Task] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        # Task id -> (messages measured, their total size)
+        self._history_sizes: dict[str, tuple[int, int]] = {}
+        self._bytes = 0
+        # Task id -> when it was last looked up or changed
+        self._used_at: dict[str, float] = {}
+        # Terminal tasks in the order they finished: task id -> finish time
+        self._finished: OrderedDict[str, float] = OrderedDict()
+        self._spill = dbm.open(spill_path, 'c') if spill_path else None
+        # Spilled tasks in the order they were last used: task id -> last use.
+        # Tasks left in the file by an earlier run count as used now.
+        self._spilled: OrderedDict[str, float] = OrderedDict()
+        if self._spill is not None:
+            now = time.monotonic()
+            for key in self._spill.keys():
+                self._spilled[key.decode()] = now
+        self._evicted = 0
+        self._expired = 0
+        self._spill_hits = 0
+
+    def __getitem__(self, task_id: str) -> Task:
+        task = self._tasks.get(task_id)
+        if task is not None:
+            self._tasks.move_to_end(task_id)
+            self._used_at[task_id] = time.monotonic()
+            return task
+        task = self._unspill(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def __setitem__(self, task_id: str, task: Task):
+        # A new task object, its history has to be measured from the start
+        self._history_sizes.pop(task_id, None)
+        self._unspill_entry(task_id)
+        self._tasks[task_id] = task
+        self._tasks.move_to_end(task_id)
+        self.touch(task_id)
+
+    def __delitem__(self, task_id: str):
+        found = self._drop(task_id)
+        if self._unspill_entry(task_id):
+            found = True
+        if not found:
+            raise KeyError(task_id)
+
+    def __contains__(self, task_id) -> bool:
+        return task_id in self._tasks or task_id in self._spilled
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._tasks)
+        yield from list(self._spilled)
+
+    def __len__(self) -> int:
+        return len(self._tasks) + len(self._spilled)
+
+    def touch(self, task_id: str):
+        """Record that `task_id` was changed in place."""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return
+        self._tasks.move_to_end(task_id)
+        self._used_at[task_id] = time.monotonic()
+        size = self._measure(task_id, task)
+        self._bytes += size - self._sizes.get(task_id, 0)
+        self._sizes[task_id] = size
+        if task.status.state in TERMINAL_STATES:
+            self._finished[task_id] = time.monotonic()
+            self._finished.move_to_end(task_id)
+        else:
+            self._finished.pop(task_id, None)
+        self._expire()
+        self._evict()
+
+    def get_task(self, task_id: str, history_length: int | None = None) -> Task | None:
+        """A copy of the task with only its last `history_length` messages."""
+        task = self.get(task_id)
+        if task is None:
+            return None
+        copy = task.model_copy()
+        copy.history = task.history[-history_length:] if history_length else []
+        return copy
+
+    async def prefetch(self, task_id: str):
+        """Nothing to do, every task is in memory or in the local spill file."""
+
+    async def fetch_task(self, task_id: str, history_length: int | None = None) -> Task | None:
+        return self.get_task(task_id, history_length)
+
+    def stats(self) -> dict:
+        return {
+            'tasks': len(self._tasks),
+            'bytes': self._bytes,
+            'spilled': len(self._spilled),
+            'evicted': self._evicted,
+            'expired': self._expired,
+            'spill_hits': self._spill_hits,
+        }
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl
+        while self._finished:
+            task_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > deadline:
+                break
+            self._drop(task_id)
+            self._expired += 1
+        while self._spilled:
+            task_id, used_at = next(iter(self._spilled.items()))
+            if used_at > deadline:
+                break
+            self._unspill_entry(task_id)
+            self._expired += 1
+
+    def _evict(self):
+        if len(self._tasks) <= self.max_tasks and self._bytes <= self.max_bytes:
+            return
+        for task_id in list(self._tasks):
+            if len(self._tasks) <= self.max_tasks and self._bytes <= self.max_bytes:
+                break
+            task = self._tasks[task_id]
+            if task.status.state in ACTIVE_STATES:
+                continue
+            if self._spill is not None:
+                self._spill[task_id] = task.model_dump_json()
+                self._spilled[task_id] = self._used_at.get(task_id, time.monotonic())
+            self._drop(task_id)
+            self._evicted += 1
+        logger.debug(f'Task store after eviction: {self.stats()}')
+
+    def _measure(self, task_id: str, task: Task) -> int:
+        history = task.history or []
+        measured, history_bytes = self._history_sizes.get(task_id, (0, 0))
+        if len(history) < measured:
+            # The history was replaced or trimmed, measure it again
+            measured, history_bytes = 0, 0
+        for message in history[measured:]:
+            history_bytes += len(message.model_dump_json())
+        self._history_sizes[task_id] = (len(history), history_bytes)
+        return len(task.model_dump_json(exclude={'history'})) + history_bytes
+
+    def _drop(self, task_id: str) -> bool:
+        task = self._tasks.pop(task_id, None)
+        self._bytes -= self._sizes.pop(task_id, 0)
+        self._history_sizes.pop(task_id, None)
+        self._used_at.pop(task_id, None)
+        self._finished.pop(task_id, None)
+        return task is not None
+
+    def _unspill_entry(self, task_id: str) -> bool:
+        """Remove `task_id` from the spill file, if it is there."""
+        if self._spilled.pop(task_id, None) is None:
+            return False
+        del self._spill[task_id]
+        return True
+
+    def _unspill(self, task_id: str) -> Task | None:
+        if task_id not in self._spilled:
+            return None
+        task = Task.model_validate_json(self._spill[task_id])
+        self._unspill_entry(task_id)
+        self._spill_hits += 1
+        self._tasks[task_id] = task
+        self.touch(task_id)
+        return task
+
+
+def open_task_store(kind: str = TASK_STORE_KIND, path: str = TASK_STORE_PATH):
+    """The task store selected at startup: 'memory' or 'sqlite'."""
+    if kind == 'sqlite':
+        from .sqlite_task_store import SqliteTaskStore
+
+        return SqliteTaskStore(path)
+    if kind != 'memory':
+        raise ValueError(f'Unknown task store {kind!r}, expected "memory" or "sqlite"')
+    return BoundedTaskStore()
+
+
+def stats_route(store, path: str = '/metrics/task-store') -> Route:
+    """A GET route reporting the metrics of `store` (anything with `stats()`) as JSON."""
+    async def stats(request: Request) -> JSONResponse:
+        return JSONResponse(store.stats())
+
+    return Route(path, stats, methods=['GET'])
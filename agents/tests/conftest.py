@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the agent packages importable as `agents.<name>` from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
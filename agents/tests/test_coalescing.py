@@ -0,0 +1,111 @@
+"""`EventCoalescer` merging of streamed WORKING updates."""
+import asyncio
+
+import pytest
+
+pytest.importorskip('common.types')
+
+from common.types import (
+    Message,
+    TaskArtifactUpdateEvent,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+
+from agents.persona_server.coalescing import EventCoalescer
+
+
+class Published(list):
+    async def __call__(self, event):
+        self.append(event)
+
+    def texts(self) -> list[str]:
+        return [
+            event.artifact.parts[0].text
+            for event in self
+            if isinstance(event, TaskArtifactUpdateEvent)
+        ]
+
+
+def working(text: str) -> TaskStatus:
+    return TaskStatus(
+        state=TaskState.WORKING,
+        message=Message(role='agent', parts=[TextPart(text=text)]),
+    )
+
+
+def test_first_piece_goes_out_at_once_and_the_rest_is_merged():
+    async def scenario():
+        published = Published()
+        coalescer = EventCoalescer('task-1', published, window=60, max_bytes=1024)
+        await coalescer.add_text('Hel')
+        first = list(published)
+        for piece in ('lo', ' wor', 'ld'):
+            await coalescer.add_text(piece)
+        waiting = len(published)
+        await coalescer.close()
+        return published, first, waiting, coalescer
+
+    published, first, waiting, coalescer = asyncio.run(scenario())
+
+    assert [event.artifact.parts[0].text for event in first] == ['Hel']
+    assert waiting == 1
+    assert published.texts() == ['Hel', 'lo world']
+    assert [event.artifact.append for event in published] == [False, True]
+    assert (coalescer.received, coalescer.sent, coalescer.chunks) == (4, 2, 2)
+
+
+def test_pieces_are_flushed_once_max_bytes_are_waiting():
+    async def scenario():
+        published = Published()
+        coalescer = EventCoalescer('task-1', published, window=60, max_bytes=4)
+        for piece in ('a', 'bb', 'cc', 'd'):
+            await coalescer.add_text(piece)
+        before_close = published.texts()
+        await coalescer.close()
+        return before_close, published.texts()
+
+    before_close, after_close = asyncio.run(scenario())
+
+    assert before_close == ['a', 'bbcc']
+    assert after_close == ['a', 'bbcc', 'd']
+
+
+def test_buffered_updates_are_flushed_after_the_window():
+    async def scenario():
+        published = Published()
+        coalescer = EventCoalescer('task-1', published, window=0.01, max_bytes=1024)
+        await coalescer.add_text('first')
+        await coalescer.add_text(' second')
+        await coalescer.add_status(working('thinking'))
+        await coalescer.add_status(working('still thinking'))
+        await asyncio.sleep(0.1)
+        flushed = list(published)
+        await coalescer.close()
+        return flushed
+
+    flushed = asyncio.run(scenario())
+
+    assert [type(event) for event in flushed] == [
+        TaskArtifactUpdateEvent,
+        TaskArtifactUpdateEvent,
+        TaskStatusUpdateEvent,
+    ]
+    assert flushed[1].artifact.parts[0].text == ' second'
+    # Only the latest status survives, and it is never final
+    assert flushed[2].status.message.parts[0].text == 'still thinking'
+    assert flushed[2].final is False
+
+
+def test_without_max_bytes_every_update_is_sent_on_its_own():
+    async def scenario():
+        published = Published()
+        coalescer = EventCoalescer('task-1', published, window=60, max_bytes=0)
+        await coalescer.add_text('a')
+        await coalescer.add_text('b')
+        await coalescer.add_status(working('c'))
+        return len(published)
+
+    assert asyncio.run(scenario()) == 3
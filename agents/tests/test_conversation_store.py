@@ -0,0 +1,49 @@
+"""`ConversationStore` persistence and its bounded in-memory cache."""
+import pytest
+
+from agents.conversation_host.conversation_store import ConversationStore
+
+
+def turn(speaker: str, message: str) -> dict:
+    return {'speaker': speaker, 'message': message, 'timestamp': '2025-01-01 00:00:00'}
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'conversations.db')
+
+
+def test_only_the_most_recently_used_partners_stay_in_memory(path):
+    store = ConversationStore(path, 'Host', max_partners=2)
+    try:
+        for partner in ('A', 'B', 'C'):
+            store.record_turn(partner, {'session_id': partner}, 1, [turn('Host', f'Hi {partner}')])
+        assert list(store._sessions) == ['B', 'C']
+        assert set(store._windows) == set(store._last_seq) == {'B', 'C'}
+
+        # A dropped partner is read back from disk, evicting the oldest again
+        assert [t['message'] for t in store.history('A')] == ['Hi A']
+        assert store.turn_count('A') == 1
+        assert list(store._sessions) == ['C', 'A']
+
+        store.record_turn('A', {'session_id': 'A'}, 2, [turn('A', 'Hello')])
+        assert store.turn_count('A') == 2
+        assert [t['seq'] for t in store.history('A')] == [1, 2]
+    finally:
+        store.close()
+
+
+def test_conversations_survive_a_restart(path):
+    store = ConversationStore(path, 'Host')
+    store.record_turn('A', {'session_id': 's1', 'task_id': 't'}, 1, [turn('Host', 'Hi')])
+    store.record_turn('A', {'session_id': 's2'}, 1, [turn('Host', 'Hi again')])
+    store.close()
+
+    reopened = ConversationStore(path, 'Host')
+    try:
+        assert reopened.load('A') == ({'session_id': 's2'}, 1)
+        # The window holds the latest session, seq counts across sessions
+        assert [(t['seq'], t['message']) for t in reopened.history('A')] == [(2, 'Hi again')]
+        assert [t['message'] for t in reopened.last_turns('A', 5)] == ['Hi', 'Hi again']
+    finally:
+        reopened.close()
@@ -0,0 +1,90 @@
+"""A partner's reply is recorded as a conversation turn."""
+import asyncio
+
+from types import SimpleNamespace
+
+from agents.conversation_host import conversation_store as stores
+from agents.conversation_host import scheduler
+from agents.conversation_host.replies import response_text
+
+
+def text_part(text: str):
+    return SimpleNamespace(text=text)
+
+
+def reply(status_text: str | None = None, chunks: tuple[str, ...] = ()):
+    """A finished task shaped like `common.types.Task`, for the attributes read from it."""
+    message = SimpleNamespace(parts=[text_part(status_text)]) if status_text else None
+    return SimpleNamespace(
+        status=SimpleNamespace(state='completed', message=message),
+        artifacts=[SimpleNamespace(parts=[text_part(chunk) for chunk in chunks])],
+    )
+
+
+class FakeHost:
+    """The parts of a host agent `ConversationScheduler` uses, without the ADK or A2A."""
+
+    def __init__(self, answer):
+        self.remote_agent_connections = {'Partner': object()}
+        self.answer = answer
+        self.generated = []
+        self.sent = []
+
+    async def generate_message(
+        self, partner_name, conversation_history, conversation_stage, history_length=None
+    ):
+        self.generated.append((len(conversation_history), history_length))
+        return f'Hello {partner_name}'
+
+    async def send_message(self, agent_name, message, tool_context):
+        self.sent.append(message)
+        tool_context.state['session_id'] = 'session-1'
+        return self.answer
+
+    reply_message = send_message
+
+    def _extract_response_text(self, response):
+        return response_text(response)
+
+
+def converse(tmp_path, host: FakeHost, turns: int = 1, **options):
+    store = stores.ConversationStore(str(tmp_path / 'conversations.db'), 'Host', **options)
+    try:
+        conversations = scheduler.ConversationScheduler(host, 'Host', store)
+        for _ in range(turns):
+            asyncio.run(conversations._converse('Partner'))
+        return [(turn['speaker'], turn['message']) for turn in store.history('Partner')]
+    finally:
+        store.close()
+
+
+def test_streamed_reply_is_recorded(tmp_path):
+    # A streamed reply ends on a bare status, its text is in the artifacts
+    host = FakeHost(reply(chunks=('Nice to ', 'meet you!')))
+
+    assert converse(tmp_path, host) == [
+        ('Host', 'Hello Partner'),
+        ('Partner', 'Nice to meet you!'),
+    ]
+
+
+def test_a_turn_without_a_reply_records_only_the_host(tmp_path):
+    host = FakeHost(None)
+
+    assert converse(tmp_path, host) == [('Host', 'Hello Partner')]
+
+
+def test_response_text_prefers_status_message():
+    assert response_text(reply('Hi there', chunks=('ignored',))) == 'Hi there'
+    assert response_text(reply(chunks=('Hi', ' again'))) == 'Hi again'
+    assert response_text(reply()) is None
+    assert response_text(None) is None
+
+
+def test_history_length_counts_turns_beyond_the_window(tmp_path):
+    host = FakeHost(reply('Hi!'))
+
+    converse(tmp_path, host, turns=4, window=4)
+
+    # Each turn records two messages; the prompt sees at most the window
+    assert host.generated == [(0, 0), (2, 2), (4, 4), (4, 6)]
@@ -0,0 +1,48 @@
+"""Interest tables loaded from the shared interests file, and what they find."""
+import json
+
+import pytest
+
+from agents.conversation_host.interests import (
+    InterestProfile,
+    KeywordMatcher,
+    load_interest_table,
+)
+
+
+def test_keywords_contained_in_longer_ones_are_found_with_them():
+    matcher = KeywordMatcher(['law', 'lawyer', 'yoga'])
+
+    assert matcher.keywords('My LAWYER does yoga') == {'law', 'lawyer', 'yoga'}
+    assert matcher.keywords('nothing here') == set()
+
+
+def test_each_persona_gets_its_own_table_read_once():
+    ana = load_interest_table('ana')
+
+    assert load_interest_table('ana') is ana
+    assert ana.labels('I love animals') == {('topic', 'animal welfare')}
+    assert load_interest_table('robert').labels('I love animals') == {
+        ('interest', 'animal welfare')
+    }
+    with pytest.raises(ValueError):
+        load_interest_table('nobody')
+
+
+def test_profile_only_reads_new_partner_messages(tmp_path):
+    path = tmp_path / 'interests.json'
+    path.write_text(json.dumps({
+        'host': {'chef': ['interest', 'cooking'], 'travel': ['topic', 'travel']},
+    }))
+    profile = InterestProfile(load_interest_table('host', path))
+    history = [
+        {'seq': 0, 'speaker': 'Host', 'message': 'Do you travel?'},
+        {'seq': 1, 'speaker': 'Tom', 'message': 'I am a chef'},
+    ]
+
+    profile.update('Tom', history)
+    history.append({'seq': 2, 'speaker': 'Tom', 'message': 'I travel a lot'})
+    profile.update('Tom', history)
+
+    assert profile.interests == {'cooking'}
+    assert profile.topics == {'travel'}
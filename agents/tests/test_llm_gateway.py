@@ -0,0 +1,161 @@
+"""`LLMGateway` admission order, rate limiting and cancellation, against a fake model."""
+import asyncio
+import time
+
+import pytest
+
+from agents.persona_server.llm_gateway import AUTONOMOUS, INTERACTIVE, LLMGateway
+
+
+class FakeModel:
+    """Answers after `latency` seconds, recording which calls it served and when."""
+
+    def __init__(self, gateway: LLMGateway, latency: float = 0):
+        self.gateway = gateway
+        self.latency = latency
+        self.calls: list[tuple[str, float]] = []
+
+    async def generate(self, name: str, priority: str = INTERACTIVE) -> str:
+        async with self.gateway.slot(priority):
+            self.calls.append((name, time.monotonic()))
+            await asyncio.sleep(self.latency)
+            return f'reply to {name}'
+
+    @property
+    def order(self) -> list[str]:
+        return [name for name, _ in self.calls]
+
+
+async def wait_queued(gateway: LLMGateway, count: int):
+    """Let the event loop run until `count` calls are waiting for a slot."""
+    for _ in range(100):
+        if sum(gateway.stats()['queued'].values()) >= count:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError(f'expected {count} queued calls, got {gateway.stats()["queued"]}')
+
+
+def test_interactive_calls_are_admitted_before_autonomous_ones():
+    async def scenario():
+        gateway = LLMGateway(rate=0, max_concurrency=1)
+        model = FakeModel(gateway)
+        await gateway.acquire(AUTONOMOUS)
+
+        calls = [
+            asyncio.create_task(model.generate('background 1', AUTONOMOUS)),
+            asyncio.create_task(model.generate('background 2', AUTONOMOUS)),
+        ]
+        await wait_queued(gateway, 2)
+        calls += [
+            asyncio.create_task(model.generate('user 1', INTERACTIVE)),
+            asyncio.create_task(model.generate('user 2', INTERACTIVE)),
+        ]
+        await wait_queued(gateway, 4)
+
+        gateway.release()
+        await asyncio.gather(*calls)
+        return model.order, gateway.stats()
+
+    order, stats = asyncio.run(scenario())
+
+    assert order == ['user 1', 'user 2', 'background 1', 'background 2']
+    assert stats['granted'] == {INTERACTIVE: 2, AUTONOMOUS: 3}
+    assert stats['in_flight'] == 0
+
+
+def test_unknown_priority_is_rejected():
+    async def scenario():
+        async with LLMGateway().slot('urgent'):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+
+
+def test_calls_beyond_the_burst_wait_for_the_bucket_to_refill():
+    rate = 20
+
+    async def scenario():
+        gateway = LLMGateway(rate=rate, burst=2, max_concurrency=10)
+        model = FakeModel(gateway)
+        start = time.monotonic()
+        await asyncio.gather(*(model.generate(f'call {i}') for i in range(5)))
+        return [at - start for _, at in model.calls]
+
+    started = asyncio.run(scenario())
+
+    # The burst goes out at once, then one call per 1/rate seconds
+    interval = 1 / rate
+    assert started[1] < interval / 2
+    for earlier, later in zip(started[1:], started[2:]):
+        assert later - earlier >= interval * 0.8
+    assert started[-1] >= 3 * interval * 0.8
+
+
+def test_the_bucket_refills_to_the_burst_while_idle():
+    async def scenario():
+        gateway = LLMGateway(rate=50, burst=3, max_concurrency=10)
+        for _ in range(3):
+            async with gateway.slot():
+                pass
+        empty = gateway.stats()['tokens']
+        await asyncio.sleep(0.2)
+        return empty, gateway.stats()['tokens']
+
+    empty, refilled = asyncio.run(scenario())
+
+    assert empty < 1
+    # Never more than the burst, however long it was idle
+    assert refilled == 3
+
+
+def test_cancelled_queued_calls_never_reach_the_model():
+    async def scenario():
+        gateway = LLMGateway(rate=0, max_concurrency=1)
+        model = FakeModel(gateway)
+        await gateway.acquire()
+
+        abandoned = asyncio.create_task(model.generate('abandoned'))
+        kept = asyncio.create_task(model.generate('kept'))
+        await wait_queued(gateway, 2)
+        abandoned.cancel()
+        await asyncio.sleep(0)
+        queued = gateway.stats()['queued']
+
+        gateway.release()
+        await kept
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned
+        return model.order, queued, gateway.stats()
+
+    order, queued, stats = asyncio.run(scenario())
+
+    assert order == ['kept']
+    assert queued == {INTERACTIVE: 1, AUTONOMOUS: 0}
+    assert stats['in_flight'] == 0
+    assert stats['granted'][INTERACTIVE] == 2
+
+
+def test_a_call_cancelled_as_it_is_admitted_hands_its_slot_on():
+    async def scenario():
+        gateway = LLMGateway(rate=0, max_concurrency=1)
+        model = FakeModel(gateway)
+        await gateway.acquire()
+
+        abandoned = asyncio.create_task(model.generate('abandoned'))
+        await wait_queued(gateway, 1)
+        kept = asyncio.create_task(model.generate('kept'))
+        await wait_queued(gateway, 2)
+        # Admit the first waiter, then cancel it before it gets to run
+        gateway.release()
+        abandoned.cancel()
+
+        await asyncio.wait_for(kept, timeout=1)
+        with pytest.raises(asyncio.CancelledError):
+            await abandoned
+        return model.order, gateway.stats()
+
+    order, stats = asyncio.run(scenario())
+
+    assert order == ['kept']
+    assert stats['in_flight'] == 0
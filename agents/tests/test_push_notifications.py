@@ -0,0 +1,115 @@
+"""Webhook verification and delivery between `PushNotificationSender` and `PushNotificationReceiver`."""
+import asyncio
+
+import pytest
+
+pytest.importorskip('common.types')
+httpx = pytest.importorskip('httpx')
+pytest.importorskip('starlette')
+
+from common.types import (
+    PushNotificationConfig,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+)
+from starlette.applications import Starlette
+
+from agents.conversation_host.push_receiver import PushNotificationReceiver
+from agents.persona_server.push_notifications import PushNotificationSender
+
+
+class Webhook(httpx.AsyncBaseTransport):
+    """A webhook server, answered in process; counts the requests it gets."""
+
+    def __init__(self, app=None, echo: bool = True):
+        self.requests = []
+        self.echo = echo
+        self.transport = (
+            httpx.ASGITransport(app=app) if app is not None else httpx.MockTransport(self.answer)
+        )
+
+    def answer(self, request: httpx.Request) -> httpx.Response:
+        token = request.url.params.get('validationToken', '')
+        return httpx.Response(200, text=token if self.echo else 'hello')
+
+    def sender(self, **options) -> PushNotificationSender:
+        sender = PushNotificationSender(**options)
+        sender._client = httpx.AsyncClient(transport=self)
+        return sender
+
+    async def handle_async_request(self, request):
+        self.requests.append(request)
+        return await self.transport.handle_async_request(request)
+
+
+def verify(sender: PushNotificationSender, *urls: str) -> list[bool]:
+    async def scenario():
+        try:
+            return [await sender.verify(PushNotificationConfig(url=url)) for url in urls]
+        finally:
+            await sender.close()
+
+    return asyncio.run(scenario())
+
+
+def test_a_webhook_that_echoes_the_token_is_verified_once():
+    webhook = Webhook()
+
+    assert verify(webhook.sender(), 'http://host.test/hook', 'http://host.test/hook') == [True, True]
+    assert len(webhook.requests) == 1
+    assert webhook.requests[0].method == 'GET'
+
+
+def test_a_url_that_does_not_echo_the_token_is_rejected():
+    webhook = Webhook(echo=False)
+
+    assert verify(webhook.sender(), 'http://host.test/hook') == [False]
+
+
+@pytest.mark.parametrize('url', ['file:///etc/passwd', 'ftp://host.test/hook', 'http://[bad/'])
+def test_non_http_urls_are_rejected_without_a_request(url):
+    webhook = Webhook()
+
+    assert verify(webhook.sender(), url) == [False]
+    assert webhook.requests == []
+
+
+def test_only_allowed_hosts_are_contacted():
+    webhook = Webhook()
+    sender = webhook.sender(allowed_hosts='ok.test, host.test:8080')
+
+    assert verify(
+        sender,
+        'http://ok.test/hook',
+        'http://host.test:8080/hook',
+        'http://host.test/hook',
+        'http://elsewhere.test/hook',
+    ) == [True, True, False, False]
+    assert [request.url.host for request in webhook.requests] == ['ok.test', 'host.test']
+
+
+def test_the_receiver_passes_verification_and_gets_updates():
+    receiver = PushNotificationReceiver('http://host.test')
+    webhook = Webhook(app=Starlette(routes=[receiver.route()]))
+    sender = webhook.sender()
+
+    async def scenario():
+        config, updates = receiver.subscribe('task-1')
+        try:
+            verified = await sender.verify(config)
+            event = TaskStatusUpdateEvent(
+                id='task-1', status=TaskStatus(state=TaskState.COMPLETED), final=True
+            )
+            delivered = await sender.send(config, event)
+            # A config without the task's token is turned away
+            forged = await sender.send(PushNotificationConfig(url=config.url), event)
+            return verified, delivered, forged, updates.get_nowait()
+        finally:
+            await sender.close()
+
+    verified, delivered, forged, update = asyncio.run(scenario())
+
+    assert verified and delivered
+    assert not forged
+    assert update.status.state == TaskState.COMPLETED
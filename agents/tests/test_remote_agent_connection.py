@@ -0,0 +1,182 @@
+"""`RemoteAgentConnections` streaming and timeouts around queueing for a host slot."""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip('common.types')
+pytest.importorskip('httpx')
+
+from common.types import (
+    AgentCapabilities,
+    AgentCard,
+    Artifact,
+    Message,
+    SendTaskResponse,
+    SendTaskStreamingResponse,
+    Task,
+    TaskArtifactUpdateEvent,
+    TaskSendParams,
+    TaskState,
+    TaskStatus,
+    TaskStatusUpdateEvent,
+    TextPart,
+)
+
+from agents.conversation_host.health import PartnerHealth
+from agents.conversation_host.remote_agent_connection import RemoteAgentConnections
+from agents.conversation_host.replies import response_text
+from agents.conversation_host.transport import slot_acquired
+
+
+class StreamingClient:
+    """Answers every task with a reply streamed in artifact chunks."""
+
+    def __init__(self, chunks: list[str]):
+        self.chunks = chunks
+        self.open_streams = 0
+
+    async def send_task_streaming(self, request: TaskSendParams):
+        self.open_streams += 1
+        try:
+            async for response in self._stream(request):
+                yield response
+        finally:
+            self.open_streams -= 1
+
+    async def _stream(self, request: TaskSendParams):
+        yield SendTaskStreamingResponse(
+            result=TaskStatusUpdateEvent(
+                id=request.id, status=TaskStatus(state=TaskState.WORKING)
+            )
+        )
+        for i, chunk in enumerate(self.chunks):
+            yield SendTaskStreamingResponse(
+                result=TaskArtifactUpdateEvent(
+                    id=request.id,
+                    artifact=Artifact(
+                        parts=[TextPart(text=chunk)],
+                        index=0,
+                        append=i > 0,
+                        lastChunk=False,
+                    ),
+                )
+            )
+        yield SendTaskStreamingResponse(
+            result=TaskArtifactUpdateEvent(
+                id=request.id,
+                artifact=Artifact(parts=[], index=0, append=True, lastChunk=True),
+            )
+        )
+        yield SendTaskStreamingResponse(
+            result=TaskStatusUpdateEvent(
+                id=request.id,
+                status=TaskStatus(state=TaskState.COMPLETED),
+                final=True,
+            )
+        )
+        # A server may keep the stream open after the final event
+        await asyncio.sleep(3600)
+
+
+class QueueingClient:
+    """Waits `queued` seconds for a host slot (forever if None), then `busy` seconds."""
+
+    def __init__(self, queued: float | None, busy: float):
+        self.queued = queued
+        self.busy = busy
+        self.cancelled = []
+
+    async def send_task(self, request: TaskSendParams):
+        if self.queued is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.queued)
+        callback = slot_acquired.get()
+        if callback is not None:
+            callback()
+        await asyncio.sleep(self.busy)
+        return SendTaskResponse(
+            result=Task(id=request.id, status=TaskStatus(state=TaskState.COMPLETED))
+        )
+
+    async def cancel_task(self, payload):
+        self.cancelled.append(payload['id'])
+
+
+def connection(
+    client, slot_wait_timeout: float = 30, streaming: bool = False
+) -> RemoteAgentConnections:
+    card = AgentCard(
+        name='Partner',
+        url='http://partner.test/',
+        capabilities=AgentCapabilities(streaming=streaming),
+    )
+    health = PartnerHealth(min_samples=1, min_timeout=0.2, max_timeout=0.2)
+    remote = RemoteAgentConnections(
+        card, health=health, retries=0, slot_wait_timeout=slot_wait_timeout
+    )
+    remote.agent_client = client
+    return remote
+
+
+def request() -> TaskSendParams:
+    return TaskSendParams(
+        id='task-1',
+        sessionId='session-1',
+        message=Message(role='user', parts=[TextPart(text='Hello')]),
+    )
+
+
+def test_streamed_chunks_are_folded_into_the_task():
+    remote = connection(StreamingClient(['Nice to ', 'meet you!']), streaming=True)
+
+    # Without a task callback the connection folds the updates itself
+    task = asyncio.run(remote.send_task(request(), None))
+
+    assert task.status.state == TaskState.COMPLETED
+    assert response_text(task) == 'Nice to meet you!'
+
+
+def test_stream_is_closed_at_the_final_event():
+    client = StreamingClient(['Hi!'])
+    remote = connection(client, streaming=True)
+
+    async def scenario():
+        task = await remote.send_task(request(), None)
+        # Checked before the event loop runs again, so a stream left for the
+        # garbage collector to close still counts as open
+        return task, client.open_streams
+
+    task, open_streams = asyncio.run(scenario())
+
+    assert task.status.state == TaskState.COMPLETED
+    assert open_streams == 0
+
+
+def test_time_queued_for_a_slot_is_not_counted_against_the_partner():
+    remote = connection(QueueingClient(queued=0.3, busy=0.1), slot_wait_timeout=1)
+
+    task = asyncio.run(remote.send_task(request(), None))
+
+    assert task.status.state == TaskState.COMPLETED
+    # The recorded latency starts when the slot was acquired
+    assert remote.health.p95 < 0.2
+
+
+def test_a_call_that_never_gets_a_slot_still_times_out():
+    client = QueueingClient(queued=None, busy=0)
+    remote = connection(client, slot_wait_timeout=0.1)
+
+    async def scenario():
+        start = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await remote.send_task(request(), None)
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0)
+        return elapsed
+
+    elapsed = asyncio.run(scenario())
+
+    assert 0.25 <= elapsed < 1
+    assert client.cancelled == ['task-1']
+    assert remote.pending_tasks == {}
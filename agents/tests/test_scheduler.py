@@ -0,0 +1,52 @@
+"""`ConversationScheduler` bookkeeping as partners join and leave the registry."""
+import asyncio
+
+from agents.conversation_host import scheduler
+
+
+class FakeAgent:
+    """A host agent's directory, counting how often the scheduler lists it."""
+
+    def __init__(self, names: list[str]):
+        self.names = list(names)
+        self.remote_agent_connections = {}
+        self.directory_version = 0
+        self.listed = 0
+
+    def list_remote_agents(self):
+        self.listed += 1
+        return [{'name': name} for name in self.names]
+
+    def remove(self, name: str):
+        self.names.remove(name)
+        self.directory_version += 1
+
+
+def test_partner_list_is_rebuilt_only_when_the_directory_changes():
+    agent = FakeAgent(['Host', 'Tom', 'Jake'])
+    conversations = scheduler.ConversationScheduler(
+        agent, 'Host', store=None, partner_interval=3600
+    )
+    turns = []
+
+    async def converse(agent_name):
+        turns.append(agent_name)
+
+    conversations._converse = converse
+
+    async def scenario():
+        for _ in range(3):
+            conversations._schedule_due_partners()
+            await asyncio.sleep(0)
+        listed_before = agent.listed
+        agent.remove('Jake')
+        conversations._schedule_due_partners()
+        return listed_before
+
+    listed_before = asyncio.run(scenario())
+
+    assert sorted(turns) == ['Jake', 'Tom']
+    assert listed_before == 1
+    assert agent.listed == 2
+    # The partner that left is no longer scheduled
+    assert list(conversations._next_due) == ['Tom']
@@ -0,0 +1,136 @@
+"""`SqliteTaskStore` batching, caching, deletion and compaction."""
+import sqlite3
+
+import pytest
+
+pytest.importorskip('common.types')
+
+from common.types import Message, Task, TaskState, TaskStatus, TextPart
+
+from agents.persona_server.sqlite_task_store import SqliteTaskStore
+
+
+def message(text: str) -> Message:
+    return Message(role='agent', parts=[TextPart(text=text)])
+
+
+def make_task(task_id: str, state: TaskState = TaskState.COMPLETED, messages: int = 1) -> Task:
+    return Task(
+        id=task_id,
+        sessionId='session',
+        status=TaskStatus(state=state),
+        history=[message(f'{task_id} {i}') for i in range(messages)],
+    )
+
+
+def rows(path, table: str, task_id: str) -> int:
+    column = 'id' if table == 'tasks' else 'task_id'
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            f'SELECT COUNT(*) FROM {table} WHERE {column} = ?', (task_id,)
+        ).fetchone()[0]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'tasks.db')
+
+
+@pytest.fixture
+def store(path):
+    # A long flush interval, so the tests decide when batches are written
+    store = SqliteTaskStore(path, max_cached=2, flush_interval=60)
+    yield store
+    store.close()
+
+
+def test_tasks_survive_a_restart(path, store):
+    store['a'] = make_task('a', messages=3)
+    store['a'].history.append(message('later'))
+    store.touch('a')
+    store.close()
+
+    reopened = SqliteTaskStore(path)
+    try:
+        assert 'a' in reopened
+        assert len(reopened) == 1
+        assert [part.text for m in reopened['a'].history for part in m.parts][-1] == 'later'
+        assert len(reopened.get_task('a', 2).history) == 2
+    finally:
+        reopened.close()
+
+
+def test_tasks_with_queued_writes_are_not_evicted(store):
+    for task_id in 'abcd':
+        store[task_id] = make_task(task_id)
+    # Nothing is on disk yet, so nothing may leave the cache
+    assert store.stats()['cached'] == 4
+
+    store.flush()
+    store.touch('d')
+    assert store.stats()['cached'] == 2
+    # Evicted tasks are read back from disk
+    assert store['a'].history[0].parts[0].text == 'a 0'
+
+
+def test_active_tasks_are_not_evicted(store):
+    store['working'] = make_task('working', TaskState.WORKING)
+    for task_id in 'abc':
+        store[task_id] = make_task(task_id)
+    store.flush()
+    store.touch('c')
+
+    assert 'working' in store._cache
+
+
+def test_deleting_a_queued_task_leaves_nothing_on_disk(path, store):
+    store['a'] = make_task('a', messages=3)
+    del store['a']
+    store.flush()
+
+    assert 'a' not in store
+    assert store.get_task('a') is None
+    assert rows(path, 'tasks', 'a') == 0
+    assert rows(path, 'task_history', 'a') == 0
+
+
+def test_deleting_a_written_task_removes_its_history(path, store):
+    store['a'] = make_task('a', messages=3)
+    store.flush()
+    store['a'].history.append(message('more'))
+    store.touch('a')
+    del store['a']
+    store.flush()
+
+    assert rows(path, 'tasks', 'a') == 0
+    assert rows(path, 'task_history', 'a') == 0
+    with pytest.raises(KeyError):
+        del store['a']
+
+
+def test_compact_removes_old_terminal_tasks_everywhere(path, store):
+    store['done'] = make_task('done')
+    store['working'] = make_task('working', TaskState.WORKING)
+    store.flush()
+
+    store.retention = -1
+    store.compact()
+
+    assert 'done' not in store
+    assert 'done' not in store._cache
+    assert rows(path, 'tasks', 'done') == 0
+    assert rows(path, 'task_history', 'done') == 0
+    # Touching a compacted task does not write it back
+    store.touch('done')
+    store.flush()
+    assert rows(path, 'tasks', 'done') == 0
+    assert 'working' in store
+    assert len(store) == 1
+
+
+def test_tasks_for_session_includes_queued_tasks(store):
+    store['a'] = make_task('a')
+    store.flush()
+    store['b'] = make_task('b')
+
+    assert {task.id for task in store.tasks_for_session('session')} == {'a', 'b'}
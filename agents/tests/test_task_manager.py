@@ -0,0 +1,110 @@
+"""`AgentTaskManager` delivery of task updates to push notification webhooks."""
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip('common.server.task_manager')
+
+from common.types import (
+    Message,
+    PushNotificationConfig,
+    SendTaskRequest,
+    TaskSendParams,
+    TaskState,
+    TextPart,
+)
+
+from agents.persona_server.task_manager import AgentTaskManager
+from agents.persona_server.task_store import BoundedTaskStore
+
+
+class StreamingAgent:
+    SUPPORTED_CONTENT_TYPES = ['text', 'text/plain']
+
+    def __init__(self, pieces: list[str]):
+        self.pieces = pieces
+
+    async def stream(self, query, sessionId, use_cache=True, priority=None):
+        for piece in self.pieces:
+            yield {
+                'is_task_complete': False,
+                'require_user_input': False,
+                'content': piece,
+                'is_delta': True,
+            }
+        yield {
+            'is_task_complete': True,
+            'require_user_input': False,
+            'content': ''.join(self.pieces),
+        }
+
+
+class SlowWebhook:
+    """Takes `latency` seconds per notification and fails those in `failing`."""
+
+    def __init__(self, latency: float, failing: tuple[int, ...] = ()):
+        self.latency = latency
+        self.failing = failing
+        self.received = []
+
+    async def verify(self, config):
+        return True
+
+    async def send(self, config, event):
+        await asyncio.sleep(self.latency)
+        self.received.append(event)
+        return len(self.received) - 1 not in self.failing
+
+
+def push_request() -> SendTaskRequest:
+    return SendTaskRequest(
+        id='request-1',
+        params=TaskSendParams(
+            id='task-1',
+            sessionId='session-1',
+            message=Message(role='user', parts=[TextPart(text='Hello')]),
+            pushNotification=PushNotificationConfig(url='http://client.test/hook'),
+        ),
+    )
+
+
+def test_a_slow_webhook_does_not_hold_up_the_task(caplog):
+    webhook = SlowWebhook(latency=0.05, failing=(1,))
+    manager = AgentTaskManager(
+        StreamingAgent(['Hi', ' there']),
+        task_store=BoundedTaskStore(spill_path=None),
+        coalesce_bytes=0,
+        notification_sender=webhook,
+    )
+
+    async def scenario():
+        response = await manager.on_send_task(push_request())
+        # The reply is produced without waiting for the webhook
+        for _ in range(100):
+            if manager.tasks['task-1'].status.state == TaskState.COMPLETED:
+                break
+            await asyncio.sleep(0.001)
+        delivered_by_then = len(webhook.received)
+        while manager._background_tasks:
+            await asyncio.gather(*manager._background_tasks)
+        return response, delivered_by_then
+
+    with caplog.at_level(logging.ERROR):
+        response, delivered_by_then = asyncio.run(scenario())
+
+    assert response.error is None
+    assert delivered_by_then <= 1
+    # Every update reached the webhook, in order, ending with the final one
+    events = webhook.received
+    assert len(events) == 5
+    assert events[-1].final and events[-1].status.state == TaskState.COMPLETED
+    chunks = [
+        ''.join(part.text for part in event.artifact.parts)
+        for event in events
+        if hasattr(event, 'artifact')
+    ]
+    assert chunks == ['Hi', ' there', '']
+    assert manager._push_queues == {}
+    assert 'task-1' not in manager.push_notification_infos
+    assert 'Dropped TaskArtifactUpdateEvent for task task-1' in caplog.text
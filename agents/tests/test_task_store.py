@@ -0,0 +1,134 @@
+"""`BoundedTaskStore` sizing, eviction, spilling and expiry."""
+import pytest
+
+pytest.importorskip('common.types')
+
+from common.types import Message, Task, TaskState, TaskStatus, TextPart
+
+from agents.persona_server.task_store import BoundedTaskStore
+
+
+def message(text: str) -> Message:
+    return Message(role='agent', parts=[TextPart(text=text)])
+
+
+def make_task(task_id: str, state: TaskState = TaskState.COMPLETED, messages: int = 1) -> Task:
+    return Task(
+        id=task_id,
+        sessionId='session',
+        status=TaskStatus(state=state),
+        history=[message(f'{task_id} {i}') for i in range(messages)],
+    )
+
+
+def full_size(task: Task) -> int:
+    return len(task.model_dump_json(exclude={'history'})) + sum(
+        len(m.model_dump_json()) for m in task.history
+    )
+
+
+def test_size_follows_the_history_as_it_grows_and_shrinks():
+    store = BoundedTaskStore(spill_path=None)
+    task = make_task('a', TaskState.WORKING, messages=2)
+    store['a'] = task
+    assert store.stats()['bytes'] == full_size(task)
+
+    task.history.append(message('a much longer reply ' * 10))
+    task.status = TaskStatus(state=TaskState.COMPLETED)
+    store.touch('a')
+    assert store.stats()['bytes'] == full_size(task)
+
+    task.history = task.history[-1:]
+    store.touch('a')
+    assert store.stats()['bytes'] == full_size(task)
+
+    store['a'] = make_task('a')
+    assert store.stats()['bytes'] == full_size(store['a'])
+    del store['a']
+    assert store.stats()['bytes'] == 0
+
+
+@pytest.fixture
+def spill_path(tmp_path):
+    return str(tmp_path / 'spill')
+
+
+def test_least_recently_used_tasks_are_evicted_but_active_ones_stay():
+    store = BoundedTaskStore(max_tasks=2, spill_path=None)
+    store['working'] = make_task('working', TaskState.WORKING)
+    for task_id in 'abc':
+        store[task_id] = make_task(task_id)
+
+    assert set(store) == {'working', 'c'}
+    assert store.stats()['evicted'] == 2
+    assert store.stats()['bytes'] == sum(full_size(store[t]) for t in ('working', 'c'))
+
+
+def test_evicted_tasks_are_spilled_and_brought_back(spill_path):
+    store = BoundedTaskStore(max_tasks=1, spill_path=spill_path)
+    store['a'] = make_task('a', TaskState.INPUT_REQUIRED, messages=3)
+    store['b'] = make_task('b')
+
+    assert len(store) == 2
+    assert store.stats()['spilled'] == 1
+    assert 'a' in store
+    assert len(store['a'].history) == 3
+    assert store.stats()['spill_hits'] == 1
+    # Bringing 'a' back spilled 'b'
+    assert store.stats()['spilled'] == 1
+    assert sorted(store) == ['a', 'b']
+    store.close()
+
+
+def test_spilled_tasks_survive_a_restart(spill_path):
+    store = BoundedTaskStore(max_tasks=1, spill_path=spill_path)
+    store['a'] = make_task('a')
+    store['b'] = make_task('b')
+    store.close()
+
+    reopened = BoundedTaskStore(max_tasks=1, spill_path=spill_path)
+    assert len(reopened) == 1
+    assert reopened['a'].id == 'a'
+    reopened.close()
+
+
+def test_spilled_tasks_waiting_for_input_expire(spill_path):
+    store = BoundedTaskStore(max_tasks=1, ttl=60, spill_path=spill_path)
+    store['waiting'] = make_task('waiting', TaskState.INPUT_REQUIRED)
+    store['b'] = make_task('b', TaskState.WORKING)
+    assert store.stats()['spilled'] == 1
+
+    store.ttl = -1
+    store.touch('b')
+
+    assert 'waiting' not in store
+    assert len(store) == 1
+    assert store.stats()['spilled'] == 0
+    assert store.stats()['expired'] == 1
+    assert store.get('waiting') is None
+    store.close()
+
+
+def test_deleting_removes_tasks_from_memory_and_spill(spill_path):
+    store = BoundedTaskStore(max_tasks=1, spill_path=spill_path)
+    store['a'] = make_task('a')
+    store['b'] = make_task('b')
+    del store['a']
+    del store['b']
+
+    assert len(store) == 0
+    assert store.stats()['bytes'] == 0
+    with pytest.raises(KeyError):
+        del store['a']
+    store.close()
+
+
+def test_replacing_a_spilled_task_does_not_count_it_twice(spill_path):
+    store = BoundedTaskStore(max_tasks=1, spill_path=spill_path)
+    store['a'] = make_task('a')
+    store['b'] = make_task('b', TaskState.WORKING)
+    store['a'] = make_task('a', messages=2)
+
+    assert len(store) == 2
+    assert len(store['a'].history) == 2
+    store.close()